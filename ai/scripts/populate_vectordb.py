@@ -13,14 +13,14 @@ and populate a ChromaDB vector store.
 """
 import sys
 import os
+import argparse
 import psycopg2
-import time
 import chromadb
-from geopy.geocoders import Nominatim
 
 # Add the project root to the Python path to allow importing from 'src'
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.core.config import settings # <-- THIS LINE MUST START WITH 'src.'
+from scripts.reverse_geocoder import OfflineGeocoder
 
 # ... (the rest of the script is correct)
 # --- ChromaDB Setup ---
@@ -28,29 +28,123 @@ from src.core.config import settings # <-- THIS LINE MUST START WITH 'src.'
 client = chromadb.PersistentClient(path="./data/chroma_db")
 collection = client.get_or_create_collection(name="argo_profiles")
 
-# --- Geocoding with Caching ---
-geolocator = Nominatim(user_agent="argo_floatchat_app_v2")
-location_cache = {}
+# --- Offline Reverse Geocoding ---
+# Seas, ocean basins and coastal places from scripts/geodata/; no network access or rate limit.
+geocoder = OfflineGeocoder()
+
+MEASUREMENTS_TABLE = """
+        CREATE TABLE IF NOT EXISTS measurements (
+            measurement_id BIGSERIAL PRIMARY KEY,
+            profile_id BIGINT NOT NULL REFERENCES profiles(profile_id) ON DELETE CASCADE,
+            pressure DOUBLE PRECISION NOT NULL,
+            temperature DOUBLE PRECISION,
+            salinity DOUBLE PRECISION,
+            doxy DOUBLE PRECISION,
+            chla DOUBLE PRECISION,
+            nitrate DOUBLE PRECISION,
+            ph_in_situ_total DOUBLE PRECISION,
+            bbp700 DOUBLE PRECISION
+        );
+"""
+
+# Partitioned layout: measurements carries its profile's date as the range
+# partition key. Partitions are created on demand by the ingestion script through
+# ensure_measurements_partition(), which bakes in the chosen granularity.
+PARTITIONED_MEASUREMENTS_TABLE = """
+        CREATE TABLE IF NOT EXISTS measurements (
+            measurement_id BIGSERIAL,
+            profile_id BIGINT NOT NULL REFERENCES profiles(profile_id) ON DELETE CASCADE,
+            profile_date TIMESTAMP WITH TIME ZONE NOT NULL,
+            pressure DOUBLE PRECISION NOT NULL,
+            temperature DOUBLE PRECISION,
+            salinity DOUBLE PRECISION,
+            doxy DOUBLE PRECISION,
+            chla DOUBLE PRECISION,
+            nitrate DOUBLE PRECISION,
+            ph_in_situ_total DOUBLE PRECISION,
+            bbp700 DOUBLE PRECISION,
+            PRIMARY KEY (measurement_id, profile_date)
+        ) PARTITION BY RANGE (profile_date);
+"""
+
+PARTITION_FUNCTION = """
+        CREATE OR REPLACE FUNCTION ensure_measurements_partition(ts TIMESTAMP WITH TIME ZONE) RETURNS void AS $$
+        DECLARE
+            lo TIMESTAMP WITH TIME ZONE := date_trunc('{unit}', ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+            hi TIMESTAMP WITH TIME ZONE := lo + interval '1 {unit}';
+            name TEXT := 'measurements_' || to_char(lo AT TIME ZONE 'UTC', '{suffix}');
+        BEGIN
+            IF to_regclass(name) IS NULL THEN
+                EXECUTE format('CREATE TABLE %I PARTITION OF measurements FOR VALUES FROM (%L) TO (%L)', name, lo, hi);
+            END IF;
+        EXCEPTION WHEN duplicate_table THEN
+            NULL;  -- created concurrently by another ingestion worker
+        END;
+        $$ LANGUAGE plpgsql;
+"""
+
+PARTITION_SUFFIXES = {"year": '"y"YYYY', "month": '"y"YYYY"m"MM'}
+
+# Array layout: one row per profile with its levels as real[] arrays sorted by
+# pressure, and a measurements view that unnests them back into one row per level
+# so the generated SQL keeps working unchanged.
+PROFILE_LEVELS_TABLE = """
+        CREATE TABLE IF NOT EXISTS profile_levels (
+            profile_id BIGINT PRIMARY KEY REFERENCES profiles(profile_id) ON DELETE CASCADE,
+            pressure REAL[] NOT NULL,
+            temperature REAL[],
+            salinity REAL[],
+            doxy REAL[],
+            chla REAL[],
+            nitrate REAL[],
+            ph_in_situ_total REAL[],
+            bbp700 REAL[]
+        );
+"""
+
+MEASUREMENTS_VIEW = """
+        CREATE OR REPLACE VIEW measurements AS
+        SELECT
+            (l.profile_id << 16) + u.level AS measurement_id,
+            l.profile_id,
+            u.pressure::DOUBLE PRECISION AS pressure,
+            u.temperature::DOUBLE PRECISION AS temperature,
+            u.salinity::DOUBLE PRECISION AS salinity,
+            u.doxy::DOUBLE PRECISION AS doxy,
+            u.chla::DOUBLE PRECISION AS chla,
+            u.nitrate::DOUBLE PRECISION AS nitrate,
+            u.ph_in_situ_total::DOUBLE PRECISION AS ph_in_situ_total,
+            u.bbp700::DOUBLE PRECISION AS bbp700
+        FROM profile_levels l
+        CROSS JOIN LATERAL unnest(l.pressure, l.temperature, l.salinity, l.doxy, l.chla,
+                                  l.nitrate, l.ph_in_situ_total, l.bbp700)
+            WITH ORDINALITY AS u(pressure, temperature, salinity, doxy, chla, nitrate, ph_in_situ_total, bbp700, level);
+"""
+
+
+def create_tables(cursor, partition_by=None, array_storage=False):
+    """
+    Creates the database tables and their indexes based on the new schema if they don't already exist.
+    With `partition_by` ("year" or "month"), a new measurements table is range-partitioned on
+    profile_date with BRIN indexes instead; with `array_storage`, levels are kept in
+    profile_levels behind a measurements view. An existing measurements table is left as it is.
+    """
+    if array_storage:
+        measurements = (PROFILE_LEVELS_TABLE, MEASUREMENTS_VIEW)
+    elif partition_by:
+        measurements = (
+            PARTITIONED_MEASUREMENTS_TABLE,
+            PARTITION_FUNCTION.format(unit=partition_by, suffix=PARTITION_SUFFIXES[partition_by]),
+            "CREATE INDEX IF NOT EXISTS measurements_pressure_brin ON measurements USING BRIN (pressure);",
+            "CREATE INDEX IF NOT EXISTS measurements_profile_date_brin ON measurements USING BRIN (profile_date);",
+            "CREATE INDEX IF NOT EXISTS measurements_profile_id_idx ON measurements (profile_id);",
+        )
+    else:
+        measurements = (
+            MEASUREMENTS_TABLE,
+            "CREATE INDEX IF NOT EXISTS measurements_profile_id_idx ON measurements (profile_id);",
+        )
 
-def get_location_name(lat, lon):
-    """Performs reverse geocoding with an in-memory cache to reduce API calls."""
-    cache_key = (round(lat, 1), round(lon, 1))
-    if cache_key in location_cache:
-        return location_cache[cache_key]
-    try:
-        print(f"  [i] Geocoding coordinates: ({lat:.2f}, {lon:.2f})...")
-        location = geolocator.reverse(f"{lat}, {lon}", language='en', timeout=10)
-        time.sleep(1)  # Respect the Nominatim API usage policy (1 call/sec)
-        location_name = location.raw.get('display_name', "Open Ocean") if location else "Open Ocean"
-        location_cache[cache_key] = location_name
-        return location_name
-    except Exception as e:
-        print(f"  [!] Geocoding error: {e}")
-        location_cache[cache_key] = "Location unavailable"
-        return "Location unavailable"
-
-def create_tables(cursor):
-    """Creates the database tables based on the new schema if they don't already exist."""
     commands = (
         """
         CREATE TABLE IF NOT EXISTS floats (
@@ -73,20 +167,24 @@ def create_tables(cursor):
             location GEOGRAPHY(Point, 4326)
         );
         """,
+        # Indexes used by the generated chat SQL; kept in sync with the ingestion
+        # script (data_processing/netcdf-to-postgres.py), which defers and rebuilds them.
+        "CREATE UNIQUE INDEX IF NOT EXISTS profiles_platform_cycle_key ON profiles (platform_id, cycle_number);",
+        "CREATE INDEX IF NOT EXISTS profiles_location_gist ON profiles USING GIST (location);",
+        "CREATE INDEX IF NOT EXISTS profiles_profile_date_idx ON profiles (profile_date);",
+        *measurements,
+        # Per-profile metrics, filled by data_processing/create-vector-database.py.
         """
-        CREATE TABLE IF NOT EXISTS measurements (
-            measurement_id BIGSERIAL PRIMARY KEY,
-            profile_id BIGINT NOT NULL REFERENCES profiles(profile_id) ON DELETE CASCADE,
-            pressure DOUBLE PRECISION NOT NULL,
-            temperature DOUBLE PRECISION,
-            salinity DOUBLE PRECISION,
-            doxy DOUBLE PRECISION,
-            chla DOUBLE PRECISION,
-            nitrate DOUBLE PRECISION,
-            ph_in_situ_total DOUBLE PRECISION,
-            bbp700 DOUBLE PRECISION
+        CREATE TABLE IF NOT EXISTS profile_summary (
+            profile_id BIGINT PRIMARY KEY REFERENCES profiles(profile_id) ON DELETE CASCADE,
+            max_pressure DOUBLE PRECISION,
+            sea_surface_temp DOUBLE PRECISION,
+            thermocline_depth DOUBLE PRECISION,
+            mean_salinity DOUBLE PRECISION,
+            mean_oxygen DOUBLE PRECISION,
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
         );
-        """
+        """,
     )
     print("Creating database tables if they don't exist...")
     for command in commands:
@@ -95,6 +193,15 @@ def create_tables(cursor):
 
 def main():
     """Connects to Postgres, generates summaries, and populates ChromaDB."""
+    parser = argparse.ArgumentParser(description="Create the ARGO tables and populate ChromaDB")
+    parser.add_argument("--partition-by", choices=["year", "month"],
+                        help="Create measurements range-partitioned on profile_date (new databases only)")
+    parser.add_argument("--array-storage", action="store_true",
+                        help="Store levels as per-profile arrays behind a measurements view (new databases only)")
+    args = parser.parse_args()
+    if args.partition_by and args.array_storage:
+        parser.error("--partition-by and --array-storage are alternative layouts")
+
     print("--- Starting Data Ingestion and Vectorization Script ---")
     
     conn = None
@@ -104,7 +211,7 @@ def main():
         cursor = conn.cursor()
 
         # Step 1: Create tables if they don't exist
-        create_tables(cursor)
+        create_tables(cursor, args.partition_by, args.array_storage)
         conn.commit()
         
         # IMPORTANT: This script assumes you have a separate process to load
@@ -131,15 +238,15 @@ def main():
             return
 
         print(f"Found {len(profiles)} profiles in PostgreSQL to process for vectorization.")
+        location_names = geocoder.lookup([p[4] for p in profiles], [p[5] for p in profiles])
         
         documents_to_add = []
         metadatas_to_add = []
         ids_to_add = []
         batch_size = 200
 
-        for profile in profiles:
+        for profile, location_name in zip(profiles, location_names):
             (profile_id, platform_id, cycle_number, profile_date, lat, lon, float_type) = profile
-            location_name = get_location_name(lat, lon)
             
             description = (
                 f"An Argo float profile of type '{float_type}' from the {location_name.split(',')[0]}. "
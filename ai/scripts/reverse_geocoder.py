@@ -0,0 +1,161 @@
+"""
+Offline reverse geocoding of profile positions for populate_vectordb.py.
+
+Replaces Nominatim with two lookup grids built once from the datasets in
+geodata/: the ocean basin and sea or gulf containing each cell, rasterised from
+simplified polygons, and the nearest coastal place within NEAR_KM of the cell.
+Lookups are array indexing, so a whole batch of coordinates is named in one call.
+"""
+import csv
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+GEODATA_DIR = Path(__file__).resolve().parent / "geodata"
+# Grid cell size in degrees
+RESOLUTION = 0.25
+# A place is mentioned when it is within 200 nautical miles, roughly the extent of an EEZ
+NEAR_KM = 370.4
+EARTH_RADIUS_KM = 6371.0
+UNKNOWN_LOCATION = "Open Ocean"
+
+
+def _inside(lon, lat, polygon) -> np.ndarray:
+    """Even-odd point-in-polygon test of the points (lon, lat) against a list of vertices."""
+    inside = np.zeros(lon.shape, dtype=bool)
+    x0, y0 = polygon[-1]
+    for x1, y1 in polygon:
+        crosses = (y0 > lat) != (y1 > lat)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at = x0 + (lat - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= crosses & (lon < x_at)
+        x0, y0 = x1, y1
+    return inside
+
+
+class OfflineGeocoder:
+    """
+    Names positions as 'Sea, near Place, Country, Ocean' from the bundled datasets,
+    leaving out the parts that don't apply (e.g. 'North Atlantic Ocean, near Norfolk, United States'
+    or just 'Indian Ocean' far offshore).
+    """
+
+    def __init__(self, geodata_dir: Path = GEODATA_DIR, resolution: float = RESOLUTION,
+                 near_km: float = NEAR_KM):
+        self.resolution = resolution
+        self.rows = int(round(180 / resolution))
+        self.cols = int(round(360 / resolution))
+        lats = -90 + (np.arange(self.rows) + 0.5) * resolution
+        lons = -180 + (np.arange(self.cols) + 0.5) * resolution
+
+        with open(Path(geodata_dir) / "ocean_regions.json", encoding="utf-8") as f:
+            regions = json.load(f)["regions"]
+        with open(Path(geodata_dir) / "coastal_places.csv", encoding="utf-8", newline="") as f:
+            places = list(csv.DictReader(f))
+
+        basin = self._rasterize([r for r in regions if r["level"] == 0], lats)
+        sea = self._rasterize([r for r in regions if r["level"] > 0], lats)
+        place = self._nearest_places(places, lats, lons, near_km)
+
+        # One label per distinct (basin, sea, place) combination; cells store its index
+        n_regions, n_places = len(regions) + 1, len(places) + 1
+        keys = ((basin.astype(np.int64) + 1) * n_regions + sea + 1) * n_places + place + 1
+        combos, cell_labels = np.unique(keys.ravel(), return_inverse=True)
+        basins, rest = np.divmod(combos, n_regions * n_places)
+        seas, nearest = np.divmod(rest, n_places)
+        self.labels = np.array([self._label(regions, places, b - 1, s - 1, p - 1)
+                                for b, s, p in zip(basins, seas, nearest)] + [UNKNOWN_LOCATION], dtype=object)
+        self.grid = cell_labels.reshape(self.rows, self.cols).astype(np.int32)
+
+    def _rasterize(self, regions, lats) -> np.ndarray:
+        """Index into `regions` of the region covering each cell centre, -1 where there is none."""
+        grid = np.full((self.rows, self.cols), -1, dtype=np.int32)
+        outlines = [(i, r, self._outline(r)) for i, r in enumerate(regions)]
+        # Deeper levels override their parents; within a level, smaller regions override larger ones
+        outlines.sort(key=lambda item: (item[1]["level"], -self._area(item[2])))
+        for index, region, polygon in outlines:
+            xs, ys = zip(*polygon)
+            r0 = max(int((min(ys) + 90) // self.resolution), 0)
+            r1 = min(int(math.ceil((max(ys) + 90) / self.resolution)), self.rows)
+            c0 = int((min(xs) + 180) // self.resolution)
+            c1 = int(math.ceil((max(xs) + 180) / self.resolution))
+            cell_lons = -180 + (np.arange(c0, c1) + 0.5) * self.resolution
+            lon, lat = np.meshgrid(cell_lons, lats[r0:r1])
+            rows, cols = np.nonzero(_inside(lon, lat, polygon))
+            # Outlines may run past 180 degrees east; those cells wrap around to the west
+            grid[rows + r0, (cols + c0) % self.cols] = index
+        return grid
+
+    @staticmethod
+    def _outline(region):
+        if "box" in region:
+            west, south, east, north = region["box"]
+            return [(west, south), (east, south), (east, north), (west, north)]
+        return [tuple(p) for p in region["polygon"]]
+
+    @staticmethod
+    def _area(polygon) -> float:
+        xs, ys = np.array(polygon).T
+        return abs(np.dot(xs, np.roll(ys, 1)) - np.dot(ys, np.roll(xs, 1))) / 2
+
+    def _nearest_places(self, places, lats, lons, near_km) -> np.ndarray:
+        """Index of the nearest place within near_km of each cell centre, -1 where there is none."""
+        best = np.full((self.rows, self.cols), -1, dtype=np.int32)
+        best_km = np.full((self.rows, self.cols), near_km)
+        lat_rad, lon_rad = np.radians(lats), np.radians(lons)
+        reach = math.degrees(near_km / EARTH_RADIUS_KM)
+        for index, place in enumerate(places):
+            plat, plon = float(place["latitude"]), float(place["longitude"])
+            r0 = max(int((plat - reach + 90) // self.resolution), 0)
+            r1 = min(int(math.ceil((plat + reach + 90) / self.resolution)), self.rows)
+            cos_lat = math.cos(math.radians(min(abs(plat) + reach, 89.9)))
+            lon_reach = min(reach / cos_lat, 180)
+            c0 = int((plon - lon_reach + 180) // self.resolution)
+            c1 = int(math.ceil((plon + lon_reach + 180) / self.resolution))
+            cols = np.arange(c0, c1) % self.cols
+            cols = np.unique(cols) if c1 - c0 > self.cols else cols
+
+            # Haversine distance from the place to the cells of its window
+            dlat = lat_rad[r0:r1, None] - math.radians(plat)
+            dlon = lon_rad[None, cols] - math.radians(plon)
+            a = (np.sin(dlat / 2) ** 2
+                 + np.cos(lat_rad[r0:r1, None]) * math.cos(math.radians(plat)) * np.sin(dlon / 2) ** 2)
+            km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+            window = best_km[r0:r1][:, cols]
+            closer = km < window
+            best_km[r0:r1, cols] = np.where(closer, km, window)
+            best[r0:r1, cols] = np.where(closer, index, best[r0:r1][:, cols])
+        return best
+
+    @staticmethod
+    def _label(regions, places, basin, sea, place) -> str:
+        levels = [r for r in regions if r["level"] > 0]
+        basins = [r for r in regions if r["level"] == 0]
+        ocean = basins[basin]["name"] if basin >= 0 else ""
+        if sea >= 0:
+            water, ocean = levels[sea]["name"], levels[sea].get("ocean", ocean)
+        else:
+            water, ocean = ocean, ""
+        # The water body comes first: the summary text uses the first component on its own
+        parts = [water or UNKNOWN_LOCATION]
+        if place >= 0:
+            parts += [f"near {places[place]['name']}", places[place]["country"]]
+        if ocean:
+            parts.append(ocean)
+        return ", ".join(parts)
+
+    def lookup_indices(self, latitudes, longitudes) -> np.ndarray:
+        """Index into self.labels for each position; invalid positions map to UNKNOWN_LOCATION."""
+        lat = np.asarray(latitudes, dtype=float)
+        lon = np.asarray(longitudes, dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90)
+        rows = np.clip(((np.where(valid, lat, 0) + 90) / self.resolution).astype(np.int64), 0, self.rows - 1)
+        cols = np.floor((np.where(valid, lon, 0) + 180) / self.resolution).astype(np.int64) % self.cols
+        return np.where(valid, self.grid[rows, cols], len(self.labels) - 1)
+
+    def lookup(self, latitudes, longitudes) -> list:
+        """Location names for a batch of positions, in the shape populate_vectordb.py used from Nominatim."""
+        return self.labels[self.lookup_indices(latitudes, longitudes)].tolist()
@@ -0,0 +1,18 @@
+"""
+Dependencies shared by the API endpoints.
+"""
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException
+from src.core.config import settings
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Rejects requests without the ADMIN_TOKEN in their X-Admin-Token header;
+    while ADMIN_TOKEN is unset, every request is rejected.
+    """
+    token = settings.ADMIN_TOKEN
+    if not token or not x_admin_token or not secrets.compare_digest(x_admin_token, token):
+        raise HTTPException(status_code=403, detail="This endpoint requires a valid X-Admin-Token.")
@@ -16,8 +16,8 @@ async def handle_chat_message(request: ChatRequest):
     # Use the session_id from the request to maintain conversation history for each user
     config = {"configurable": {"session_id": request.session_id}}
     
-    # Invoke the agent
-    agent_result = agent_with_chat_history.invoke({"input": request.message}, config=config)
+    # Invoke the agent without blocking the event loop, so other requests are served meanwhile
+    agent_result = await agent_with_chat_history.ainvoke({"input": request.message}, config=config)
     
     agent_output = agent_result.get('output', {})
 
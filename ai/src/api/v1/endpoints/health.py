@@ -2,7 +2,8 @@
 Health check endpoint to verify that the API is running.
 """
 from fastapi import APIRouter
-from src.schemas.common import Message
+from src.database.pool import pool_metrics
+from src.schemas.common import Message, PoolStatus
 router = APIRouter()
 
 @router.get("/health", response_model=Message)
@@ -10,4 +11,11 @@ def get_health():
     """
     Simple health check endpoint.
     """
-    return Message(message="OK")
\ No newline at end of file
+    return Message(message="OK")
+
+@router.get("/health/db", response_model=PoolStatus)
+def get_database_pool_status():
+    """
+    Occupancy of the shared database connection pool and how long requests waited for a connection.
+    """
+    return PoolStatus(**pool_metrics())
\ No newline at end of file
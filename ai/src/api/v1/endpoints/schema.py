@@ -0,0 +1,21 @@
+"""
+Endpoint to rebuild the cached database schema used in the SQL generation prompt,
+e.g. from an ingestion job once it has changed the tables. Refreshing queries the
+database catalog, so it requires the X-Admin-Token like pinning cached SQL.
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends
+from src.api.deps import require_admin_token
+from src.llm.rag_pipeline import schema_cache
+from src.schemas.common import Message
+router = APIRouter()
+
+@router.post("/schema/refresh", response_model=Message, dependencies=[Depends(require_admin_token)])
+async def refresh_schema():
+    """
+    Rebuilds the schema text from the database now, instead of waiting for the next version check.
+    Requires the X-Admin-Token header.
+    """
+    await asyncio.to_thread(schema_cache.refresh)
+    return Message(message=f"Schema refreshed (version {schema_cache.version_seen})")
@@ -0,0 +1,33 @@
+"""
+Endpoints to inspect the semantic cache of generated SQL and pin known-good queries.
+Pinning is reserved to holders of ADMIN_TOKEN, since pinned SQL answers other
+users' questions.
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from src.api.deps import require_admin_token
+from src.llm.rag_pipeline import embeddings, schema_cache, sql_cache
+from src.llm.sql_cache import read_only_select
+from src.schemas.common import Message
+from src.schemas.sql_cache import PinRequest, SQLCacheStats
+router = APIRouter()
+
+@router.get("/sql-cache", response_model=SQLCacheStats)
+def get_sql_cache_stats():
+    """
+    Hit and miss counts and occupancy of the SQL cache.
+    """
+    return SQLCacheStats(**sql_cache.metrics())
+
+@router.post("/sql-cache/pin", response_model=Message, dependencies=[Depends(require_admin_token)])
+async def pin_sql(request: PinRequest):
+    """
+    Stores a single read-only SELECT for a question; it never expires or gets evicted,
+    but stops matching when the database schema changes. Requires the X-Admin-Token header.
+    """
+    sql = read_only_select(request.sql)
+    if sql is None:
+        raise HTTPException(status_code=422, detail="Only a single read-only SELECT query can be pinned.")
+    vector = await embeddings.aembed_query(request.question)
+    if not sql_cache.pin(request.question, vector, sql, schema_cache.version_seen):
+        raise HTTPException(status_code=409, detail="The SQL cache is disabled or full of pinned entries.")
+    return Message(message="Pinned.")
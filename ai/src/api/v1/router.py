@@ -2,8 +2,10 @@
 Aggregates all API routers for version 1.
 """
 from fastapi import APIRouter
-from src.api.v1.endpoints import chat, health # MODIFIED
+from src.api.v1.endpoints import chat, health, schema, sql_cache # MODIFIED
 
 router = APIRouter()
 router.include_router(health.router, tags=["Health"])
-router.include_router(chat.router, tags=["Chat"])
\ No newline at end of file
+router.include_router(chat.router, tags=["Chat"])
+router.include_router(schema.router, tags=["Schema"])
+router.include_router(sql_cache.router, tags=["SQL Cache"])
\ No newline at end of file
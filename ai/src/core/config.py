@@ -2,8 +2,14 @@
 Centralized application configuration.
 Loads settings from environment variables and .env files using Pydantic.
 """
+from pathlib import Path
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# ai/, so defaults below don't depend on the working directory
+AI_DIR = Path(__file__).resolve().parents[2]
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
@@ -14,9 +20,27 @@ class Settings(BaseSettings):
     DB_PORT: int
     DB_NAME: str
 
+    # Connection Pool (shared by the SQL tool and schema introspection)
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 10.0           # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800             # Seconds before a connection is replaced
+    DB_STATEMENT_TIMEOUT_MS: int = 30000    # Default per-statement limit on pooled connections
+    DB_SCHEMA_CHECK_INTERVAL: float = 60.0  # Seconds between schema version checks; 0 disables them
+
     # LLM API Keys
     GROQ_API_KEY: str
 
+    # Semantic cache of generated SQL (see src/llm/sql_cache.py)
+    SQL_CACHE_SIZE: int = 1000              # Entries kept; 0 disables the cache
+    SQL_CACHE_TTL: float = 86400.0          # Seconds before an unpinned entry expires
+    SQL_CACHE_THRESHOLD: float = 0.9        # Minimum cosine similarity between questions for a hit
+    ADMIN_TOKEN: Optional[str] = None  # X-Admin-Token of /sql-cache/pin and /schema/refresh; unset disables both
+
+    # Embedding cache shared with data_processing/create-vector-database.py (see src/llm/embedding_cache.py)
+    EMBEDDING_CACHE_DIR: str = str(AI_DIR / "data" / "embedding_cache")
+    EMBEDDING_CACHE_SIZE: int = 100_000     # Vectors kept before least recently used ones are evicted
+
     @property
     def DATABASE_URL(self) -> str:
         """Constructs the full database URL for SQLAlchemy."""
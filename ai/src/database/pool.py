@@ -0,0 +1,120 @@
+"""
+Shared, bounded PostgreSQL connection pool.
+
+One SQLAlchemy engine serves both the SQL tool (execute_sql_to_df) and the
+schema introspection of SQLDatabase, so chat requests reuse open connections
+instead of paying connect, auth and backend start-up on every query. Connections
+are checked with a ping before use and replaced after DB_POOL_RECYCLE seconds.
+Every pooled connection starts with DB_STATEMENT_TIMEOUT_MS as its statement
+timeout; connection() can lower it for one transaction and make it read-only.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import QueuePool
+
+from src.core.config import settings
+
+
+class PoolMetrics:
+    """Time spent obtaining connections from the pool, including opening new ones."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """A QueuePool that records how long each checkout waited in `metrics`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return entry
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; the counts carry over
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def create_pool_engine(url: str, pool_size: int = settings.DB_POOL_SIZE,
+                       max_overflow: int = settings.DB_POOL_MAX_OVERFLOW,
+                       pool_timeout: float = settings.DB_POOL_TIMEOUT,
+                       pool_recycle: int = settings.DB_POOL_RECYCLE,
+                       statement_timeout_ms: Optional[int] = settings.DB_STATEMENT_TIMEOUT_MS,
+                       **kwargs) -> Engine:
+    """An engine on a TimedQueuePool holding at most pool_size + max_overflow connections."""
+    if statement_timeout_ms and url.startswith("postgresql"):
+        kwargs.setdefault("connect_args", {})["options"] = f"-c statement_timeout={int(statement_timeout_ms)}"
+    return create_engine(url, poolclass=TimedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                         pool_timeout=pool_timeout, pool_recycle=pool_recycle, pool_pre_ping=True, **kwargs)
+
+
+engine = create_pool_engine(settings.DATABASE_URL)
+
+
+@contextmanager
+def connection(read_only: bool = True, statement_timeout_ms: Optional[int] = None) -> Iterator[Connection]:
+    """
+    A pooled connection inside one transaction, committed on success. read_only makes
+    PostgreSQL reject writes; statement_timeout_ms overrides the statement timeout
+    for this transaction only.
+    """
+    with engine.connect() as conn:
+        if read_only:
+            conn = conn.execution_options(postgresql_readonly=True)
+        with conn.begin():
+            if statement_timeout_ms is not None:
+                conn.exec_driver_sql("SELECT set_config('statement_timeout', %s, true)",
+                                     (str(int(statement_timeout_ms)),))
+            yield conn
+
+
+def pool_metrics() -> dict:
+    """Pool occupancy and checkout wait statistics, e.g. for the /health/db endpoint."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool counts overflow from -pool_size until the pool is full
+        "overflow": max(pool.overflow(), 0),
+        **pool.metrics.snapshot(),
+    }
@@ -0,0 +1,91 @@
+"""
+Cached schema description for the SQL generation prompt.
+
+SQLDatabase.get_table_info reflects the tables and runs a sample-rows SELECT
+against each one, which is too slow to repeat on every question. SchemaCache
+builds that text once (at startup, see src/main.py) and serves it from memory
+until it is refreshed: explicitly through refresh() (POST /api/v1/schema/refresh,
+e.g. after an ingest), or when refresh_if_changed() sees a new schema version.
+The version hashes only the table and view definitions, so DDL changes trigger
+a rebuild while ANALYZE and ordinary writes leave the prompt and the SQL cache
+entries generated for it alone.
+"""
+import asyncio
+import threading
+from typing import List, Optional
+
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+SCHEMA_VERSION_SQL = """
+SELECT md5(COALESCE(string_agg(part, ';' ORDER BY part), '')) FROM (
+    SELECT concat_ws('.', c.relname, c.relkind::text, a.attnum, a.attname,
+                     format_type(a.atttypid, a.atttypmod)) AS part
+    FROM pg_class c JOIN pg_attribute a ON a.attrelid = c.oid
+    WHERE c.relname = ANY(:tables) AND pg_table_is_visible(c.oid) AND a.attnum > 0 AND NOT a.attisdropped
+) parts
+"""
+
+
+class SchemaCache:
+    """The get_table_info text of `tables`, leaving out those that don't exist (yet)."""
+
+    def __init__(self, engine: Engine, tables: List[str], **db_kwargs):
+        self.engine = engine
+        self.tables = tables
+        self.db_kwargs = db_kwargs
+        self.version_seen: Optional[str] = None
+        self._text: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def prompt(self) -> str:
+        """The cached schema text, built on first use if startup didn't build it."""
+        if self._text is None:
+            with self._lock:
+                if self._text is None:
+                    self._build()
+        return self._text
+
+    def refresh(self) -> str:
+        """Rebuild the schema text now; requests keep getting the old text until it is ready."""
+        with self._lock:
+            return self._build()
+
+    def invalidate(self) -> None:
+        """Drop the cached text; the next prompt() rebuilds it."""
+        with self._lock:
+            self._text = None
+
+    def version(self) -> Optional[str]:
+        """A hash of the tables' and views' column definitions; None on databases other than PostgreSQL."""
+        if self.engine.dialect.name != "postgresql":
+            return None
+        with self.engine.connect() as conn:
+            return conn.execute(text(SCHEMA_VERSION_SQL), {"tables": self.tables}).scalar()
+
+    def refresh_if_changed(self) -> bool:
+        """Rebuild when the schema version differs from the one the cached text was built at."""
+        if self.version() == self.version_seen and self._text is not None:
+            return False
+        self.refresh()
+        return True
+
+    async def watch(self, interval: float) -> None:
+        """Check the schema version every `interval` seconds, off the event loop; runs until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self.refresh_if_changed):
+                    print("Database schema changed; SQL prompt schema rebuilt.")
+            except Exception as e:
+                print(f"Error checking the database schema version: {e}")
+
+    def _build(self) -> str:
+        version = self.version()
+        # A new SQLDatabase: the old one's usable tables and reflected columns are fixed at creation
+        db = SQLDatabase(self.engine, **self.db_kwargs)
+        usable = set(db.get_usable_table_names())
+        self._text = db.get_table_info(table_names=[t for t in self.tables if t in usable])
+        self.version_seen = version
+        return self._text
@@ -1,17 +1,39 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import pandas as pd
-import psycopg2
-from src.core.config import settings # <-- THIS LINE IS NOW CORRECTED
+from src.core.config import settings
+from src.database.pool import connection
+
+# One thread per connection the pool can hand out: queries don't queue behind other
+# asyncio.to_thread work in the default executor, and no more of them block on a
+# checkout than the pool can serve
+SQL_EXECUTOR = ThreadPoolExecutor(max_workers=settings.DB_POOL_SIZE + settings.DB_POOL_MAX_OVERFLOW,
+                                  thread_name_prefix="sql")
 
-def execute_sql_to_df(query: str) -> pd.DataFrame:
+def execute_sql_to_df(query: str, statement_timeout_ms: Optional[int] = None, read_only: bool = True) -> pd.DataFrame:
     """
     Executes a SQL query on the PostgreSQL database and returns the result as a Pandas DataFrame.
+    The query runs on a pooled connection, in a read-only transaction unless read_only is False;
+    statement_timeout_ms overrides the pool's default statement timeout for this query.
     """
     try:
-        # This function correctly uses the settings object passed to it
-        with psycopg2.connect(settings.PSYCOPG2_DATABASE_URL) as conn:
-            df = pd.read_sql_query(query, conn)
+        with connection(read_only=read_only, statement_timeout_ms=statement_timeout_ms) as conn:
+            # no_parameters: the query goes to psycopg2 as is, so a literal '%' needs no escaping
+            df = pd.read_sql_query(query, conn.execution_options(no_parameters=True))
             return df
     except Exception as e:
         print(f"Error executing query: {e}")
         # Return an empty DataFrame on error
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+
+async def aexecute_sql_to_df(query: str, statement_timeout_ms: Optional[int] = None,
+                             read_only: bool = True) -> pd.DataFrame:
+    """
+    Async execute_sql_to_df. This is a thread offload, not an async driver: the
+    blocking query runs on SQL_EXECUTOR, so the event loop keeps serving other
+    requests while Postgres works.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(SQL_EXECUTOR, execute_sql_to_df, query, statement_timeout_ms, read_only)
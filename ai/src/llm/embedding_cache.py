@@ -0,0 +1,176 @@
+"""
+Persistent embedding cache shared by the vector index build
+(data_processing/create-vector-database.py) and the chat retriever.
+
+Vectors live in a memory-mapped float32 matrix with one row per slot; a SQLite
+index maps each key -- a hash of the model name and the whitespace-normalized
+text -- to its slot and last use. When all slots are taken, the least recently
+used ones are reused. Every lookup and insert runs in one SQLite write
+transaction, so several processes can share a cache directory.
+
+This module only depends on numpy and the standard library, so the standalone
+data_processing scripts can import it too; callers pass in the cache directory
+and capacity (EMBEDDING_CACHE_DIR and EMBEDDING_CACHE_SIZE).
+"""
+import re
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+DEFAULT_CAPACITY = 100_000
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    slot INTEGER NOT NULL UNIQUE,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with runs of whitespace collapsed, so trivially different copies share an entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(model: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Embeddings of one model, keyed by (model, normalized text hash), capped at
+    `capacity` vectors with LRU eviction. Use embed() to fill the misses of a batch
+    through an encode function; hits and misses are counted in `stats`.
+    """
+
+    def __init__(self, model: str, dim: int, path: str, capacity: int = DEFAULT_CAPACITY):
+        self.model = model
+        self.dim = dim
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+        self._lock = threading.Lock()
+
+        root = Path(path)
+        root.mkdir(parents=True, exist_ok=True)
+        stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+        self.conn = sqlite3.connect(root / f"{stem}.sqlite", timeout=60, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.executescript(INDEX_SCHEMA)
+        self.capacity = self._setting("capacity", capacity)
+        if self._setting("dim", dim) != dim:
+            raise ValueError(f"Embedding cache {root / stem} holds {self._setting('dim', dim)}-d vectors, not {dim}-d")
+
+        vectors_path = root / f"{stem}.f32"
+        if not vectors_path.exists() or vectors_path.stat().st_size < self.capacity * dim * 4:
+            with open(vectors_path, "ab") as f:
+                f.truncate(self.capacity * dim * 4)
+        self.vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, dim))
+
+    def _setting(self, name: str, default: int) -> int:
+        """A size fixed when the cache was created; later values passed for it are ignored."""
+        self.conn.execute("INSERT OR IGNORE INTO settings VALUES (?, ?)", (name, str(default)))
+        return int(self.conn.execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()[0])
+
+    def get_many(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """The cached vector of each text, or None where there is none; hits are marked as used."""
+        keys = [cache_key(self.model, t) for t in texts]
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                slots = self._slots(keys)
+                if slots:
+                    tick = self._tick()
+                    self.conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                          [(tick, k) for k in slots])
+                found = [np.array(self.vectors[slots[k]]) if k in slots else None for k in keys]
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            hits = sum(v is not None for v in found)
+            self.stats["hits"] += hits
+            self.stats["misses"] += len(keys) - hits
+        return found
+
+    def put_many(self, texts: Sequence[str], vectors) -> None:
+        """Store vectors for texts, evicting the least recently used entries when the cache is full."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        new = {cache_key(self.model, t): v for t, v in zip(texts, vectors)}
+        if len(new) > self.capacity:
+            new = dict(list(new.items())[-self.capacity:])
+        if not new:
+            return
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._slots(new)
+                missing = [k for k in new if k not in existing]
+                slots = self._free_slots(len(missing), exclude=set(existing.values()))
+                tick = self._tick()
+                for key, slot in zip(missing, slots):
+                    existing[key] = slot
+                for key, slot in existing.items():
+                    self.vectors[slot] = new[key]
+                self.vectors.flush()
+                self.conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                                      [(k, s, tick) for k, s in existing.items()])
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _slots(self, keys) -> dict:
+        """Slot of each key that has an entry, looked up in chunks below SQLite's parameter limit."""
+        slots = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            slots.update(self.conn.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+        return slots
+
+    def _tick(self) -> int:
+        """A use counter shared by all processes; larger means more recently used."""
+        row = self.conn.execute("SELECT COALESCE(MAX(last_used), 0) + 1 FROM entries").fetchone()
+        return row[0]
+
+    def _free_slots(self, n: int, exclude: set) -> List[int]:
+        if not n:
+            return []
+        used = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        fresh = list(range(used, min(used + n, self.capacity)))
+        if len(fresh) == n:
+            return fresh
+        victims = [row for row in self.conn.execute(
+            "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (n - len(fresh) + len(exclude),))
+            if row[1] not in exclude][:n - len(fresh)]
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in victims])
+        self.stats["evicted"] += len(victims)
+        return fresh + [slot for _, slot in victims]
+
+    def embed(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Vectors for texts, calling encode() only for the ones not cached yet. Misses
+        are encoded once per distinct normalized text.
+        """
+        found = self.get_many(texts)
+        todo = list(dict.fromkeys(normalize_text(t) for t, v in zip(texts, found) if v is None))
+        if todo:
+            computed = dict(zip(todo, np.asarray(encode(todo), dtype=np.float32)))
+            self.put_many(todo, list(computed.values()))
+            found = [v if v is not None else computed[normalize_text(t)] for t, v in zip(texts, found)]
+        return np.stack(found) if found else np.empty((0, self.dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        self.vectors.flush()
+        self.conn.close()
@@ -1,16 +1,21 @@
 import re
 from operator import itemgetter
+from typing import Optional
 
 from src.core.config import settings
-from src.database.utils import execute_sql_to_df
+from src.database.pool import engine
+from src.database.schema import SchemaCache
+from src.database.utils import aexecute_sql_to_df
+from src.llm.embedding_cache import EmbeddingCache
+from src.llm.sql_cache import SemanticSQLCache
 
 # LangChain Imports
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain.tools import tool
 from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_community.utilities import SQLDatabase
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings # Using the recommended package
+from langchain_core.embeddings import Embeddings
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.output_parsers import StrOutputParser
@@ -29,21 +34,68 @@ llm = ChatGroq(
 
 # Initialize the Embedding Model to use a local, open-source model
 print("Initializing local embedding model. This may take a moment on first run...")
+# Same model name and dimension as data_processing/create-vector-database.py, so both share cache entries
+EMBED_MODEL = "all-MiniLM-L6-v2"
+EMBED_DIM = 384
 embeddings = HuggingFaceEmbeddings(
-    model_name="all-MiniLM-L6-v2",
+    model_name=EMBED_MODEL,
     model_kwargs={'device': 'cpu'},
     encode_kwargs={'normalize_embeddings': False}
 )
 print("Local embedding model loaded successfully.")
 
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so texts seen before, by this process or the index build, skip
+    inference. Without a cache (until open_embedding_cache() runs) texts go to the model.
+    """
+
+    def __init__(self, model: Embeddings, cache: Optional[EmbeddingCache] = None):
+        self.model = model
+        self.cache = cache
+
+    def embed_documents(self, texts):
+        if self.cache is None:
+            return self.model.embed_documents(texts)
+        return self.cache.embed(texts, self.model.embed_documents).tolist()
+
+    def embed_query(self, text):
+        if self.cache is None:
+            return self.model.embed_query(text)
+        return self.cache.embed([text], lambda texts: [self.model.embed_query(t) for t in texts])[0].tolist()
+
+
+embeddings = CachedEmbeddings(embeddings)
+
+
+def open_embedding_cache() -> None:
+    """Attach the shared embedding cache; called at app startup, so importing this module creates no files."""
+    if embeddings.cache is None:
+        embeddings.cache = EmbeddingCache(EMBED_MODEL, EMBED_DIM, settings.EMBEDDING_CACHE_DIR,
+                                          settings.EMBEDDING_CACHE_SIZE)
+
+
+def close_embedding_cache() -> None:
+    cache, embeddings.cache = embeddings.cache, None
+    if cache is not None:
+        cache.close()
+
 # Initialize Vector Store, Retriever, and DB Connection
 vectorstore = Chroma(persist_directory="./data/chroma_db", embedding_function=embeddings)
 retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-db = SQLDatabase.from_uri(settings.DATABASE_URL)
+# Only include the relevant tables for the LLM to prevent confusion;
+# profile_summary only exists once create-vector-database.py has run
+SCHEMA_TABLES = ["floats", "profiles", "measurements", "profile_summary"]
+# Built at startup and kept in memory; schema introspection shares the connection pool of the SQL tool.
+# view_support: measurements is a view over profile_levels in the array storage layout
+schema_cache = SchemaCache(engine, SCHEMA_TABLES, view_support=True)
 
 def get_schema(_):
-    # Only include the relevant tables for the LLM to prevent confusion
-    return db.get_table_info(table_names=["floats", "profiles", "measurements"])
+    return schema_cache.prompt()
+
+# Reuses the SQL of earlier questions worded alike, skipping the SQL generation call
+sql_cache = SemanticSQLCache(settings.SQL_CACHE_SIZE, settings.SQL_CACHE_TTL, settings.SQL_CACHE_THRESHOLD)
 
 # --- 2. Define the RAG Tool with Updated Schema Logic ---
 
@@ -62,7 +114,7 @@ class ArgoDataInput(BaseModel):
     question: str = Field(description="A detailed question about ARGO oceanographic data, including locations, dates, and specific parameters like salinity or chlorophyll if known.")
 
 @tool(args_schema=ArgoDataInput)
-def argo_ocean_data_retriever(question: str) -> dict:
+async def argo_ocean_data_retriever(question: str) -> dict:
     """
     Use this tool to answer questions about ARGO oceanographic data from a PostgreSQL/PostGIS database.
     This tool is ideal for querying physical and BioGeoChemical (BGC) data by joining the floats, profiles, and measurements tables.
@@ -88,6 +140,8 @@ You will be querying three main tables: `floats`, `profiles`, and `measurements`
     - Syntax: `ST_DWithin(p.location, ST_GeographyFromText('SRID=4326;POINT(longitude latitude)'), distance_in_meters)`
     - Example for "within 100km of Chennai (80.27 E, 13.08 N)":
       `WHERE ST_DWithin(p.location, ST_GeographyFromText('SRID=4326;POINT(80.27 13.08)'), 100000)`
+4.  **Date Filters:** Filter dates on `p.profile_date`. When `measurements` is time-partitioned, its definition in the Schema section below has a `profile_date` column; then apply the same date condition to `m.profile_date` too, so that only the matching partitions are scanned.
+5.  **Per-Profile Statistics:** If the Schema section below includes a `profile_summary` table, use it for per-profile maximum pressure, sea surface temperature, thermocline depth, mean salinity or mean oxygen instead of aggregating `measurements`: `FROM profile_summary s JOIN profiles p ON s.profile_id = p.profile_id`.
 
 **Parameter Units and Details:**
 - `pressure`: Decibar (db), equivalent to depth.
@@ -99,6 +153,9 @@ You will be querying three main tables: `floats`, `profiles`, and `measurements`
 
 Always limit your results to 100 rows unless the user specifies otherwise.
 
+**Schema:**
+{schema}
+
 **Context from relevant data profiles:**
 {context}
 
@@ -108,6 +165,7 @@ Always limit your results to 100 rows unless the user specifies otherwise.
 """
     sql_prompt = ChatPromptTemplate.from_template(SQL_PROMPT_TEMPLATE)
 
+    # The schema and retriever lookups run concurrently under ainvoke
     sql_generation_chain = (
         RunnablePassthrough.assign(
             schema=get_schema,
@@ -118,13 +176,29 @@ Always limit your results to 100 rows unless the user specifies otherwise.
         | StrOutputParser()
     )
 
-    llm_output = sql_generation_chain.invoke({"question": question})
-    print(f"LLM Output:\n{llm_output}")
+    schema_version = schema_cache.version_seen
+    question_vector = await embeddings.aembed_query(question) if sql_cache.enabled else None
+    cached = sql_cache.lookup(question, question_vector, schema_version)
+    if cached:
+        generated_sql = cached["sql"]
+        print(f"SQL cache hit ({cached['similarity']:.3f}) from: {cached['question']}")
+        result_df = await aexecute_sql_to_df(generated_sql)
+        if result_df.empty and not cached["pinned"]:
+            # The reused query may not fit this question after all; generate one for it instead
+            sql_cache.discard(cached)
+            cached = None
+
+    if not cached:
+        llm_output = await sql_generation_chain.ainvoke({"question": question})
+        print(f"LLM Output:\n{llm_output}")
+
+        generated_sql = extract_sql_from_response(llm_output)
+        print(f"Extracted SQL: {generated_sql}")
+
+        result_df = await aexecute_sql_to_df(generated_sql)
+        if not result_df.empty:
+            sql_cache.store(question, question_vector, generated_sql, schema_version)
 
-    generated_sql = extract_sql_from_response(llm_output)
-    print(f"Extracted SQL: {generated_sql}")
-    
-    result_df = execute_sql_to_df(generated_sql)
     if result_df.empty:
         return {"summary": "I couldn't find any data matching your query.", "table_data": None}
 
@@ -138,7 +212,7 @@ Response:
     response_prompt = ChatPromptTemplate.from_template(RESPONSE_PROMPT_TEMPLATE)
     final_response_chain = response_prompt | llm | StrOutputParser()
 
-    final_summary = final_response_chain.invoke({
+    final_summary = await final_response_chain.ainvoke({
         "question": question,
         "query": generated_sql,
         "result": result_df.to_string(index=False),
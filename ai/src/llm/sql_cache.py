@@ -0,0 +1,239 @@
+"""
+Semantic cache of generated SQL for argo_ocean_data_retriever.
+
+Questions are compared by the cosine similarity of their all-MiniLM-L6-v2
+embeddings; when a new question is close enough to one answered before, its SQL
+is reused and the SQL generation call to the LLM is skipped. Near-identical
+wording can still differ in what matters to the query, so a hit also requires
+the same key terms in both questions (see question_terms: numbers, parameters,
+months and place names), and the same schema version the SQL was generated for.
+
+Entries expire after `ttl` seconds and the least recently used ones are evicted
+beyond `max_entries`. Pinned entries, e.g. reviewed queries for common
+questions, never expire and are never evicted, but like the others only match
+at the schema version they were pinned at. Only a single read-only SELECT can
+be pinned (see read_only_select).
+"""
+import csv
+import json
+import re
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+WORD = re.compile(r"[^\W\d_]+")
+# Coastal places, countries and ocean regions of the offline reverse geocoder
+GEODATA_DIR = Path(__file__).resolve().parents[2] / "scripts" / "geodata"
+
+# Words naming what a question asks for, mapped to one term per measured quantity
+PARAMETER_WORDS = {
+    "temperature": ["temperature", "temperatures", "temp", "sst"],
+    "salinity": ["salinity", "salinities", "salt", "psu"],
+    "pressure": ["pressure", "pressures", "depth", "depths", "dbar", "decibar"],
+    "oxygen": ["oxygen", "doxy"],
+    "chlorophyll": ["chlorophyll", "chla", "chl"],
+    "nitrate": ["nitrate", "nitrates"],
+    "ph": ["ph"],
+    "backscatter": ["backscatter", "bbp"],
+    "bgc": ["bgc", "biogeochemical"],
+}
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+KEY_WORDS = {word: term for term, words in PARAMETER_WORDS.items() for word in words}
+KEY_WORDS.update((month, month) for month in MONTHS)
+
+# Pinned SQL is run for other users' questions, so it is checked before it is accepted
+# (it also runs in a read-only transaction, see src/database/utils.py)
+QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+READ_ONLY_START = re.compile(r"^\s*(?:select|with)\b", re.IGNORECASE)
+NOT_READ_ONLY = re.compile(
+    r";|--|/\*|\$|\b(?:insert|update|delete|merge|upsert|into|drop|alter|create|truncate|grant|revoke|"
+    r"copy|call|do|execute|prepare|lock|vacuum|analyze|cluster|reindex|refresh|comment|set|reset|"
+    r"listen|notify|set_config|dblink\w*|lo_\w+|pg_\w*(?:terminate|cancel|reload|sleep|advisory|read|ls_)\w*)\b",
+    re.IGNORECASE)
+
+
+def _fold(text: str) -> str:
+    """Lower case without accents, so 'Malé' and 'male' compare equal."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=None)
+def place_pattern(geodata_dir: Path = GEODATA_DIR) -> re.Pattern:
+    """Whole-word matches of the place, country and region names of the geodata, longest first."""
+    with open(geodata_dir / "coastal_places.csv", encoding="utf-8", newline="") as f:
+        names = {name for row in csv.DictReader(f) for name in (row["name"], row["country"])}
+    with open(geodata_dir / "ocean_regions.json", encoding="utf-8") as f:
+        for region in json.load(f)["regions"]:
+            names.add(region["name"])
+            if region["level"] == 0:
+                # 'Pacific' for 'North Pacific Ocean'
+                names.add(region["name"].split()[-2])
+    alternatives = sorted({_fold(name) for name in names}, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, alternatives)) + r")\b")
+
+
+def question_terms(question: str) -> tuple:
+    """
+    What two questions must share for one's SQL to answer the other: the numbers (years,
+    coordinates, float IDs, ...), the parameters and months asked about, and the places
+    named. Common words that are also place names ('Nice', 'Split') only make hits rarer.
+    """
+    text = _fold(question)
+    terms = set(NUMBER.findall(text))
+    terms.update(KEY_WORDS[word] for word in WORD.findall(text) if word in KEY_WORDS)
+    terms.update(place_pattern().findall(text))
+    return tuple(sorted(terms))
+
+
+def read_only_select(sql: str) -> Optional[str]:
+    """
+    The query without its trailing semicolon if it is one SELECT (or WITH ... SELECT)
+    statement with no comments, writes or side-effecting functions; None otherwise.
+    """
+    query = sql.strip().rstrip(";").strip()
+    if "\\" in query:
+        # E'...' strings would end elsewhere than QUOTED thinks
+        return None
+    unquoted = QUOTED.sub("''", query)
+    if re.search("['\"]", QUOTED.sub("", unquoted)):
+        return None  # an unterminated literal or identifier
+    if not READ_ONLY_START.match(unquoted) or NOT_READ_ONLY.search(unquoted):
+        return None
+    return query
+
+
+class SemanticSQLCache:
+    """
+    SQL keyed by question embedding, holding at most `max_entries` entries
+    (0 disables the cache). Hits, misses and evictions are counted in `stats`.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, threshold: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.clock = clock
+        self.entries: List[Optional[dict]] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "expired": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def lookup(self, question: str, vector, schema_version: Optional[str] = None) -> Optional[dict]:
+        """The entry most similar to the question if it passes the threshold, else None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._drop_expired()
+            entry = self._nearest(question, self._unit(vector), schema_version)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            entry["last_used"] = self.clock()
+            entry["hits"] += 1
+            self.stats["hits"] += 1
+            return dict(entry)
+
+    def store(self, question: str, vector, sql: str, schema_version: Optional[str] = None,
+              pinned: bool = False) -> bool:
+        """Add the SQL generated for a question; False when it is disabled, full of pinned entries or the question is pinned."""
+        if not self.enabled:
+            return False
+        vector = self._unit(vector)
+        with self._lock:
+            self._drop_expired()
+            slot = self._slot_for(question)
+            if slot is None or (self.entries[slot] and self.entries[slot]["pinned"] and not pinned):
+                return False
+            now = self.clock()
+            if self.vectors is None:
+                self.vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            self.vectors[slot] = vector
+            self.entries[slot] = {
+                "question": question, "sql": sql, "schema_version": schema_version,
+                "terms": question_terms(question), "pinned": pinned,
+                "created": now, "last_used": now, "hits": 0,
+            }
+            self.stats["stored"] += 1
+            return True
+
+    def pin(self, question: str, vector, sql: str, schema_version: Optional[str] = None) -> bool:
+        """Store a known-good query that is kept until it is replaced."""
+        return self.store(question, vector, sql, schema_version, pinned=True)
+
+    def discard(self, entry: dict) -> None:
+        """Drop an entry whose SQL turned out not to answer the question; pinned entries are kept."""
+        with self._lock:
+            for slot, current in enumerate(self.entries):
+                if current and current["question"] == entry["question"] and not current["pinned"]:
+                    self.entries[slot] = None
+                    self.stats["rejected"] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            live = [e for e in self.entries if e]
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(live),
+                "pinned": sum(e["pinned"] for e in live),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _nearest(self, question: str, vector: np.ndarray, schema_version: Optional[str]) -> Optional[dict]:
+        if self.vectors is None:
+            return None
+        terms = question_terms(question)
+        similarity = self.vectors[:len(self.entries)] @ vector
+        for slot in np.argsort(-similarity):
+            if similarity[slot] < self.threshold:
+                break
+            entry = self.entries[slot]
+            if entry is None or entry["terms"] != terms or entry["schema_version"] != schema_version:
+                continue
+            entry["similarity"] = float(similarity[slot])
+            return entry
+        return None
+
+    def _drop_expired(self) -> None:
+        cutoff = self.clock() - self.ttl
+        for slot, entry in enumerate(self.entries):
+            if entry and not entry["pinned"] and entry["created"] < cutoff:
+                self.entries[slot] = None
+                self.stats["expired"] += 1
+
+    def _slot_for(self, question: str) -> Optional[int]:
+        """The slot of an earlier entry for the same question, a free slot, or the least recently used one."""
+        for slot, entry in enumerate(self.entries):
+            if entry and entry["question"] == question:
+                return slot
+        for slot, entry in enumerate(self.entries):
+            if entry is None:
+                return slot
+        if len(self.entries) < self.max_entries:
+            self.entries.append(None)
+            return len(self.entries) - 1
+        unpinned = [(e["last_used"], slot) for slot, e in enumerate(self.entries) if not e["pinned"]]
+        if not unpinned:
+            return None
+        self.stats["evicted"] += 1
+        return min(unpinned)[1]
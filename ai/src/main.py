@@ -2,14 +2,39 @@
 Main application file.
 Initializes the FastAPI application, sets up CORS middleware, and includes API routers.
 """
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.api.v1 import router as api_v1_router
+from src.core.config import settings
+from src.llm.rag_pipeline import close_embedding_cache, open_embedding_cache, schema_cache
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await asyncio.to_thread(open_embedding_cache)
+    except Exception as e:
+        print(f"Error opening the embedding cache, embedding every text: {e}")
+    # Build the schema text for the SQL prompt before the first request, then watch for schema changes
+    try:
+        await asyncio.to_thread(schema_cache.refresh)
+    except Exception as e:
+        print(f"Error building the database schema cache, retrying on first use: {e}")
+    watcher = None
+    if settings.DB_SCHEMA_CHECK_INTERVAL > 0:
+        watcher = asyncio.create_task(schema_cache.watch(settings.DB_SCHEMA_CHECK_INTERVAL))
+    yield
+    if watcher:
+        watcher.cancel()
+    close_embedding_cache()
 
 app = FastAPI(
     title="FloatChat AI Backend API", 
     version="1.0.0",
-    description="AI-powered oceanographic data analysis service"
+    description="AI-powered oceanographic data analysis service",
+    lifespan=lifespan
 )
 
 # Configure CORS for frontend access
@@ -4,4 +4,15 @@ Common Pydantic schemas used across multiple endpoints.
 from pydantic import BaseModel
 
 class Message(BaseModel):
-    message: str
\ No newline at end of file
+    message: str
+
+class PoolStatus(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_avg: float
+    wait_seconds_max: float
\ No newline at end of file
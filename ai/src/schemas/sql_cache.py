@@ -0,0 +1,20 @@
+"""
+Pydantic schemas for the /sql-cache endpoints.
+"""
+from pydantic import BaseModel, Field
+
+class PinRequest(BaseModel):
+    question: str = Field(description="A question the SQL answers; similar questions reuse it.")
+    sql: str = Field(description="A reviewed, single read-only SELECT, kept in the cache until it is replaced.")
+
+class SQLCacheStats(BaseModel):
+    hits: int
+    misses: int
+    stored: int
+    evicted: int
+    expired: int
+    rejected: int
+    entries: int
+    pinned: int
+    max_entries: int
+    hit_rate: float
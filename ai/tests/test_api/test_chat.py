@@ -5,9 +5,12 @@ These tests use mocking to isolate the API endpoint logic from the
 LangChain agent and external services (LLM, databases). This ensures
 that the tests are fast, deterministic, and do not incur API costs.
 """
+import asyncio
+
+import httpx
 from fastapi.testclient import TestClient
-from unittest.mock import patch
-from app.main import app
+from unittest.mock import AsyncMock, patch
+from src.main import app
 
 # Create a TestClient instance to make requests to our FastAPI app
 client = TestClient(app)
@@ -29,10 +32,11 @@ def test_chat_endpoint_with_tool_call():
         }
     }
     
-    # 2. Use 'patch' to replace the actual agent's 'invoke' method.
-    # The string 'app.api.v1.endpoints.chat.agent_with_chat_history.invoke' is the
-    # path to the function we want to mock.
-    with patch('app.api.v1.endpoints.chat.agent_with_chat_history.invoke', return_value=mock_agent_response) as mock_invoke:
+    # 2. Use 'patch' to replace the agent with a mock whose 'ainvoke' coroutine we control.
+    # The string 'src.api.v1.endpoints.chat.agent_with_chat_history' is the
+    # path to the object we want to mock.
+    with patch('src.api.v1.endpoints.chat.agent_with_chat_history', ainvoke=AsyncMock(return_value=mock_agent_response)) as mock_agent:
+        mock_invoke = mock_agent.ainvoke
         # 3. Make a request to our API endpoint.
         request_body = {
             "message": "Show me BGC floats near Chennai",
@@ -65,8 +69,9 @@ def test_chat_endpoint_with_direct_answer():
         'output': 'Hello! As of September 16, 2025, I am ready to assist you. How can I help you with ARGO data today?'
     }
 
-    # 2. Patch the agent's invoke method.
-    with patch('app.api.v1.endpoints.chat.agent_with_chat_history.invoke', return_value=mock_agent_response) as mock_invoke:
+    # 2. Patch the agent's ainvoke method.
+    with patch('src.api.v1.endpoints.chat.agent_with_chat_history', ainvoke=AsyncMock(return_value=mock_agent_response)) as mock_agent:
+        mock_invoke = mock_agent.ainvoke
         # 3. Make the request to the API.
         request_body = {
             "message": "Hello",
@@ -97,8 +102,9 @@ def test_chat_endpoint_when_tool_finds_no_data():
         }
     }
     
-    # 2. Patch the agent's invoke method.
-    with patch('app.api.v1.endpoints.chat.agent_with_chat_history.invoke', return_value=mock_agent_response) as mock_invoke:
+    # 2. Patch the agent's ainvoke method.
+    with patch('src.api.v1.endpoints.chat.agent_with_chat_history', ainvoke=AsyncMock(return_value=mock_agent_response)) as mock_agent:
+        mock_invoke = mock_agent.ainvoke
         # 3. Make the request.
         request_body = {
             "message": "Find floats in the Sahara Desert",
@@ -113,4 +119,47 @@ def test_chat_endpoint_when_tool_finds_no_data():
         assert response.status_code == 200
         response_json = response.json()
         assert response_json['summary'] == "I searched for the data, but couldn't find any matching profiles."
-        assert response_json['data'] is None
\ No newline at end of file
+        assert response_json['data'] is None
+
+
+def test_concurrent_chat_requests_do_not_serialize():
+    """
+    Load test with a stubbed agent that only answers once every request is in flight
+    and the health check has responded: if requests queued behind each other, or the
+    agent blocked the event loop, the first request would time out instead.
+    """
+    n_requests = 20
+
+    async def run_load():
+        all_in_flight, released = asyncio.Event(), asyncio.Event()
+        in_flight = 0
+
+        async def blocking_agent(inputs, config):
+            nonlocal in_flight
+            in_flight += 1
+            if in_flight == n_requests:
+                all_in_flight.set()
+            await asyncio.wait_for(released.wait(), timeout=5)
+            return {'output': f"Answer to {inputs['input']}"}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as aclient:
+            async def health_during_load():
+                await asyncio.wait_for(all_in_flight.wait(), timeout=5)
+                response = await aclient.get("/api/v1/health")
+                released.set()
+                return response
+
+            with patch('src.api.v1.endpoints.chat.agent_with_chat_history', ainvoke=AsyncMock(side_effect=blocking_agent)):
+                *responses, health = await asyncio.gather(
+                    *[aclient.post("/api/v1/chat", json={"message": f"question {i}", "session_id": f"load-{i}"})
+                      for i in range(n_requests)],
+                    health_during_load(),
+                )
+            return responses, health
+
+    responses, health = asyncio.run(run_load())
+
+    assert [r.status_code for r in responses] == [200] * n_requests
+    assert responses[3].json()['summary'] == "Answer to question 3"
+    assert health.status_code == 200
@@ -0,0 +1,27 @@
+"""
+Tests for the /api/v1/schema/refresh endpoint, with the schema cache replaced
+so no database is queried.
+"""
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, patch
+from src.main import app
+
+client = TestClient(app)
+
+
+def refresh(headers=None, token="secret"):
+    cache = MagicMock(version_seen="abc123")
+    with patch('src.api.deps.settings.ADMIN_TOKEN', token), \
+            patch('src.api.v1.endpoints.schema.schema_cache', cache):
+        response = client.post("/api/v1/schema/refresh", headers=headers or {})
+    return response, cache.refresh.call_count
+
+
+def test_refresh_requires_the_admin_token():
+    for headers, token in [({}, "secret"), ({"X-Admin-Token": "wrong"}, "secret"), ({"X-Admin-Token": ""}, None)]:
+        response, calls = refresh(headers, token)
+        assert response.status_code == 403 and calls == 0
+
+    response, calls = refresh({"X-Admin-Token": "secret"})
+    assert response.status_code == 200 and calls == 1
+    assert response.json()["message"] == "Schema refreshed (version abc123)"
@@ -0,0 +1,36 @@
+"""
+Tests for the /api/v1/sql-cache endpoints, with the embedding model and the
+cache itself replaced so no model is loaded.
+"""
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+from src.llm.sql_cache import SemanticSQLCache
+from src.main import app
+
+client = TestClient(app)
+
+PIN = {"question": "BGC floats near Chennai", "sql": "SELECT platform_id FROM floats"}
+
+
+def pin(json, headers=None, token="secret"):
+    cache = SemanticSQLCache(max_entries=10, ttl=60, threshold=0.9)
+    with patch('src.api.deps.settings.ADMIN_TOKEN', token), \
+            patch('src.api.v1.endpoints.sql_cache.sql_cache', cache), \
+            patch('src.api.v1.endpoints.sql_cache.embeddings', aembed_query=AsyncMock(return_value=[1.0, 0.0])):
+        response = client.post("/api/v1/sql-cache/pin", json=json, headers=headers or {})
+    return response, cache.metrics()["pinned"]
+
+
+def test_pinning_requires_the_admin_token():
+    assert pin(PIN)[0].status_code == 403
+    assert pin(PIN, {"X-Admin-Token": "wrong"})[0].status_code == 403
+    # Unset, nobody can pin
+    assert pin(PIN, {"X-Admin-Token": ""}, token=None)[0].status_code == 403
+
+    response, pinned = pin(PIN, {"X-Admin-Token": "secret"})
+    assert response.status_code == 200 and pinned == 1
+
+
+def test_only_read_only_selects_are_pinned():
+    response, pinned = pin({**PIN, "sql": "SELECT 1; DELETE FROM floats"}, {"X-Admin-Token": "secret"})
+    assert response.status_code == 422 and pinned == 0
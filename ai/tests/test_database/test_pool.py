@@ -0,0 +1,55 @@
+"""
+Tests for the wait metrics of the shared connection pool. They run on SQLite, so
+no database server is needed; read-only mode and statement timeouts are PostgreSQL
+features and are not covered here.
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import exc, text
+
+from src.database.pool import create_pool_engine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_pool_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0,
+                                pool_timeout=0.5)
+    yield engine
+    engine.dispose()
+
+
+def test_waiting_for_a_busy_connection_is_recorded(engine):
+    """A checkout blocked behind another thread's connection counts its wait."""
+    held = engine.connect()
+    threading.Timer(0.2, held.close).start()
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+    metrics = engine.pool.metrics.snapshot()
+    assert metrics["checkouts"] == 2
+    assert metrics["wait_seconds_max"] >= 0.15
+
+
+def test_pool_timeouts_are_counted(engine):
+    """When no connection frees up within pool_timeout, the checkout fails and is counted."""
+    with engine.connect():
+        started = time.perf_counter()
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        assert time.perf_counter() - started < 2
+
+    assert engine.pool.metrics.snapshot()["timeouts"] == 1
+
+
+def test_metrics_survive_dispose(engine):
+    """engine.dispose() replaces the pool but keeps its counts."""
+    with engine.connect():
+        pass
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    assert engine.pool.metrics.snapshot()["checkouts"] == 2
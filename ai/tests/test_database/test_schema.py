@@ -0,0 +1,63 @@
+"""
+Tests for the cached schema text of the SQL generation prompt, on a SQLite database.
+The schema version query is PostgreSQL-specific, so version() is patched where needed.
+"""
+from unittest.mock import patch
+
+import pytest
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import create_engine
+
+from src.database.schema import SchemaCache
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'argo.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE floats (platform_number INTEGER PRIMARY KEY, project_name TEXT)")
+        conn.exec_driver_sql("INSERT INTO floats VALUES (2902746, 'INCOIS')")
+    yield engine
+    engine.dispose()
+
+
+def test_schema_is_introspected_once(engine):
+    """Repeated prompts are served from memory without touching the database."""
+    cache = SchemaCache(engine, ["floats", "profile_summary"])
+
+    with patch.object(SQLDatabase, "get_table_info", autospec=True,
+                      side_effect=SQLDatabase.get_table_info) as get_table_info:
+        texts = {cache.prompt() for _ in range(5)}
+
+    assert get_table_info.call_count == 1
+    (schema,) = texts
+    assert "CREATE TABLE floats" in schema and "2902746" in schema
+    assert "profile_summary" not in schema
+
+
+def test_refresh_picks_up_new_tables_and_columns(engine):
+    """A refresh sees DDL made after the first build, including tables that didn't exist."""
+    cache = SchemaCache(engine, ["floats", "profile_summary"])
+    cache.prompt()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE floats ADD COLUMN wmo_inst_type TEXT")
+        conn.exec_driver_sql("CREATE TABLE profile_summary (profile_id INTEGER, surface_temp REAL)")
+
+    assert "wmo_inst_type" not in cache.prompt()
+    schema = cache.refresh()
+
+    assert "wmo_inst_type" in schema and "CREATE TABLE profile_summary" in schema
+    assert cache.prompt() == schema
+
+
+def test_rebuilds_only_when_the_version_changes(engine):
+    """The periodic check leaves the cached text alone until the schema version moves."""
+    cache = SchemaCache(engine, ["floats"])
+    with patch.object(cache, "version", side_effect=["v1", "v1", "v2", "v2"]):
+        cache.prompt()
+        with patch.object(cache, "_build", wraps=cache._build) as build:
+            assert cache.refresh_if_changed() is False
+            assert cache.refresh_if_changed() is True
+
+    assert build.call_count == 1
+    assert cache.version_seen == "v2"
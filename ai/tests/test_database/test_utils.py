@@ -0,0 +1,44 @@
+"""
+Tests for the thread offload of aexecute_sql_to_df, with the blocking query
+replaced so no database is needed.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from src.core.config import settings
+from src.database import utils
+
+
+def test_queries_run_on_their_own_executor_sized_to_the_pool():
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def slow_query(query, statement_timeout_ms, read_only):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return threading.current_thread().name
+
+    async def run():
+        # The only default executor thread stays busy; queries must not wait for it
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+        release = threading.Event()
+        blocked = asyncio.create_task(asyncio.to_thread(release.wait))
+        names = await asyncio.wait_for(
+            asyncio.gather(*(utils.aexecute_sql_to_df("SELECT 1") for _ in range(25))), timeout=5)
+        release.set()
+        await blocked
+        return names
+
+    with patch.object(utils, "execute_sql_to_df", slow_query):
+        names = asyncio.run(run())
+
+    assert all(name.startswith("sql") for name in names)
+    assert peak == settings.DB_POOL_SIZE + settings.DB_POOL_MAX_OVERFLOW
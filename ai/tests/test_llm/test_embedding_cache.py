@@ -0,0 +1,69 @@
+"""
+Tests for the on-disk embedding cache shared by the index build and the retriever.
+A counting fake stands in for the sentence-transformer model.
+"""
+from pathlib import Path
+
+import numpy as np
+
+from src.llm import embedding_cache
+from src.llm.embedding_cache import EmbeddingCache
+
+
+class CountingModel:
+    """Encodes a text as [len(text), 0, 0, 1] and records what it was asked to encode."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), 0, 0, 1] for t in texts], dtype=np.float32)
+
+
+def test_repeated_texts_skip_the_model(tmp_path):
+    """Texts already cached, including whitespace variants, are not encoded again."""
+    model = CountingModel()
+    cache = EmbeddingCache("test-model", 4, tmp_path)
+
+    first = cache.embed(["float 1 near Chennai", "float 2"], model)
+    second = cache.embed(["float  1 near Chennai ", "float 2", "float 3"], model)
+
+    assert model.calls == [["float 1 near Chennai", "float 2"], ["float 3"]]
+    np.testing.assert_array_equal(first, second[:2])
+    assert cache.stats["hits"] == 2
+
+
+def test_cache_persists_across_instances(tmp_path):
+    """A second process opening the same directory sees the vectors of the first."""
+    model = CountingModel()
+    EmbeddingCache("test-model", 4, tmp_path).embed(["salinity in the Arabian Sea"], model)
+
+    reopened = EmbeddingCache("test-model", 4, tmp_path)
+    assert reopened.get_many(["salinity in the Arabian Sea"])[0][0] == len("salinity in the Arabian Sea")
+    assert EmbeddingCache("other-model", 4, tmp_path).get_many(["salinity in the Arabian Sea"])[0] is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    """Once the cache is full, new vectors replace the entries used longest ago."""
+    model = CountingModel()
+    cache = EmbeddingCache("test-model", 4, tmp_path, capacity=3)
+    cache.embed(["a", "bb", "ccc"], model)
+    cache.get_many(["a"])
+
+    cache.embed(["dddd"], model)
+
+    hits = [v is not None for v in cache.get_many(["a", "bb", "ccc", "dddd"])]
+    assert hits == [True, False, True, True]
+    assert len(cache) == 3
+    assert cache.stats["evicted"] == 1
+
+
+def test_default_directory_does_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    """The index build runs from data_processing/ and defaults to the same ai/data/embedding_cache."""
+    monkeypatch.delenv("EMBEDDING_CACHE_DIR", raising=False)
+    monkeypatch.chdir(tmp_path)
+    from src.core.config import Settings
+
+    ai_dir = Path(embedding_cache.__file__).resolve().parents[2]
+    assert Settings(_env_file=None).EMBEDDING_CACHE_DIR == str(ai_dir / "data" / "embedding_cache")
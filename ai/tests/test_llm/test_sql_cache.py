@@ -0,0 +1,106 @@
+"""
+Tests for the semantic cache of generated SQL, with hand-made question vectors
+in place of all-MiniLM-L6-v2 embeddings and a fake clock.
+"""
+import numpy as np
+
+from src.llm.sql_cache import SemanticSQLCache, read_only_select
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def vec(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def test_similar_question_reuses_sql():
+    """A question above the similarity threshold gets the stored SQL; a dissimilar one misses."""
+    cache = SemanticSQLCache(max_entries=10, ttl=60, threshold=0.9)
+    cache.store("BGC floats near Chennai", vec(1, 0.1, 0), "SELECT 1")
+
+    hit = cache.lookup("Show me BGC floats near Chennai", vec(1, 0.2, 0))
+    assert hit["sql"] == "SELECT 1" and hit["similarity"] > 0.9
+    assert cache.lookup("salinity in the Arabian Sea", vec(0, 1, 0)) is None
+    assert cache.metrics()["hits"] == 1 and cache.metrics()["misses"] == 1
+
+
+def test_numbers_and_schema_version_must_match():
+    """Close wording is not enough when the questions name different numbers or the schema changed."""
+    cache = SemanticSQLCache(max_entries=10, ttl=60, threshold=0.9)
+    cache.store("salinity profiles of float 2902746", vec(1, 0, 0), "SELECT 1", schema_version="v1")
+
+    assert cache.lookup("salinity profiles of float 2902747", vec(1, 0, 0), "v1") is None
+    assert cache.lookup("salinity profiles of float 2902746", vec(1, 0, 0), "v2") is None
+    assert cache.lookup("salinity profile for float 2902746", vec(1, 0.05, 0), "v1")["sql"] == "SELECT 1"
+
+
+def test_places_and_parameters_must_match():
+    """Questions worded alike but about another place, parameter or month get their own SQL."""
+    cache = SemanticSQLCache(max_entries=10, ttl=60, threshold=0.9)
+    cache.store("salinity near Chennai in March", vec(1, 0, 0), "SELECT 1")
+
+    assert cache.lookup("salinity near Mumbai in March", vec(1, 0, 0)) is None
+    assert cache.lookup("temperature near Chennai in March", vec(1, 0, 0)) is None
+    assert cache.lookup("salinity near Chennai in April", vec(1, 0, 0)) is None
+    assert cache.lookup("salinity near Chennai in the Bay of Bengal in March", vec(1, 0, 0)) is None
+    # Synonyms of a parameter count as the same term
+    assert cache.lookup("Salt (psu) near chennai in march", vec(1, 0, 0))["sql"] == "SELECT 1"
+
+
+def test_entries_expire_and_least_recently_used_are_evicted():
+    clock = Clock()
+    cache = SemanticSQLCache(max_entries=2, ttl=60, threshold=0.9, clock=clock)
+    cache.store("a", vec(1, 0, 0), "SELECT 'a'")
+    clock.now = 10
+    cache.store("b", vec(0, 1, 0), "SELECT 'b'")
+    clock.now = 20
+    cache.lookup("a", vec(1, 0, 0))
+
+    cache.store("c", vec(0, 0, 1), "SELECT 'c'")
+    assert cache.lookup("b", vec(0, 1, 0)) is None
+    assert cache.metrics()["evicted"] == 1
+
+    clock.now = 65
+    assert cache.lookup("a", vec(1, 0, 0)) is None
+    assert cache.lookup("c", vec(0, 0, 1))["sql"] == "SELECT 'c'"
+    assert cache.metrics()["expired"] == 1
+
+
+def test_pinned_entries_are_kept():
+    """Pinned entries survive the TTL, eviction and discard(), but not schema changes."""
+    clock = Clock()
+    cache = SemanticSQLCache(max_entries=2, ttl=60, threshold=0.9, clock=clock)
+    cache.pin("BGC floats near Chennai", vec(1, 0, 0), "SELECT 'pinned'", schema_version="v1")
+    for i, question in enumerate(["x", "y", "z"]):
+        cache.store(question, vec(0, 1, i), f"SELECT {i}")
+    clock.now = 1000
+
+    hit = cache.lookup("BGC floats near Chennai", vec(1, 0, 0), "v1")
+    assert hit["sql"] == "SELECT 'pinned'"
+    cache.discard(hit)
+    assert not cache.store("BGC floats near Chennai", vec(1, 0, 0), "SELECT 'generated'", schema_version="v1")
+    assert cache.lookup("BGC floats near Chennai", vec(1, 0, 0), "v1")["sql"] == "SELECT 'pinned'"
+    assert cache.lookup("BGC floats near Chennai", vec(1, 0, 0), "v2") is None
+    assert cache.metrics()["pinned"] == 1
+
+
+def test_only_single_read_only_selects_can_be_pinned():
+    assert read_only_select("SELECT * FROM floats WHERE project_name = 'a; b';") == \
+        "SELECT * FROM floats WHERE project_name = 'a; b'"
+    assert read_only_select("WITH p AS (SELECT 1 AS n) SELECT n FROM p") is not None
+    for sql in ["SELECT 1; DROP TABLE floats", "DELETE FROM floats", "SELECT * INTO copy FROM floats",
+                "WITH d AS (DELETE FROM floats RETURNING *) SELECT * FROM d", "SELECT 1 -- note",
+                "SELECT pg_sleep(60)", "SELECT E'\\'; DROP TABLE floats; --'", "SELECT 'unterminated"]:
+        assert read_only_select(sql) is None, sql
+
+
+def test_disabled_cache():
+    cache = SemanticSQLCache(max_entries=0, ttl=60, threshold=0.9)
+    assert not cache.store("a", vec(1, 0, 0), "SELECT 1")
+    assert cache.lookup("a", vec(1, 0, 0)) is None
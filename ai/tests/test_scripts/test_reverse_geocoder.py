@@ -0,0 +1,49 @@
+"""
+Tests for the offline reverse geocoder that names profile locations in
+populate_vectordb.py from the bundled ocean region and coastal place datasets.
+"""
+import math
+
+import numpy as np
+
+from scripts.reverse_geocoder import OfflineGeocoder, UNKNOWN_LOCATION
+
+geocoder = OfflineGeocoder()
+
+
+def test_names_seas_places_and_basins():
+    """Positions get the sea they are in, the nearest coastal place and the ocean basin."""
+    names = geocoder.lookup([13.0, -30.0, 60.0, 8.0], [81.0, 80.0, -175.0, 78.5])
+
+    assert names == [
+        "Bay of Bengal, near Chennai, India, Indian Ocean",
+        "Indian Ocean",
+        "Bering Sea, North Pacific Ocean",
+        "Gulf of Mannar, near Thoothukudi, India, Indian Ocean",
+    ]
+
+
+def test_water_body_comes_first():
+    """populate_vectordb.py describes a profile by the first component of its location name."""
+    names = geocoder.lookup([35.0, -5.0, 40.0], [-75.0, -120.0, -140.0])
+
+    assert [n.split(",")[0] for n in names] == ["North Atlantic Ocean", "South Pacific Ocean", "North Pacific Ocean"]
+
+
+def test_regions_across_the_antimeridian():
+    """Outlines that continue past 180 degrees east also cover the western longitudes."""
+    assert geocoder.lookup([-77.0, 57.0], [-170.0, -178.0]) == ["Ross Sea, Southern Ocean",
+                                                          "Bering Sea, North Pacific Ocean"]
+
+
+def test_invalid_positions():
+    """Missing or out-of-range coordinates fall back to the generic name."""
+    assert geocoder.lookup([math.nan, 95.0], [10.0, 10.0]) == [UNKNOWN_LOCATION, UNKNOWN_LOCATION]
+
+
+def test_batch_lookup_matches_single_lookups():
+    """One batch call returns the same names as looking positions up one by one."""
+    rng = np.random.default_rng(0)
+    lats, lons = rng.uniform(-80, 80, 200), rng.uniform(-180, 180, 200)
+
+    assert geocoder.lookup(lats, lons) == [geocoder.lookup([a], [o])[0] for a, o in zip(lats, lons)]
@@ -0,0 +1,20 @@
+"""
+Benchmarks for the ARGO download and ingestion scripts in data_processing/.
+
+The scripts there are standalone files with hyphenated names, so they are
+loaded by path instead of imported.
+"""
+import importlib.util
+from pathlib import Path
+
+DATA_PROCESSING_DIR = Path(__file__).resolve().parents[1] / "data_processing"
+
+
+def load_script(filename: str):
+    """Load a data_processing script (e.g. 'netcdf-to-postgres.py') as a module."""
+    path = DATA_PROCESSING_DIR / filename
+    name = path.stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,110 @@
+"""
+Compares the threaded and asyncio download modes of scrape-argo-data.py against
+a local fake mirror with per-request latency, and checks both fetch the same files.
+Then re-syncs each download after a few upstream updates and interrupted
+transfers, and checks that only the changed and missing bytes are transferred,
+and that a sync with nothing changed only fetches the root listing.
+
+Usage: python -m benchmarks.bench_download [--floats N] [--latency SECONDS] [--workers N]
+"""
+import argparse
+import asyncio
+import contextlib
+import filecmp
+import io
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks import load_script
+from benchmarks.fake_mirror import FakeMirror, touch_file, write_mirror
+
+
+def downloaded(root: Path):
+    return sorted(p.relative_to(root) for p in root.rglob("*.nc"))
+
+
+def run(scraper, mode, url, target, workers, per_host):
+    downloader = scraper.ArgoDownloader(url, target, delay=0, max_retries=1,
+                                        start_date="2025-09-01", end_date="2025-09-15",
+                                        workers=workers, per_host=per_host)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "async":
+            asyncio.run(downloader.download_all_async())
+        else:
+            downloader.download_all()
+    return time.perf_counter() - start
+
+
+def check_same(mirror: Path, target: Path, expected, label):
+    got = downloaded(target)
+    assert got == expected, f"{label}: fetched {len(got)} files, expected {len(expected)}"
+    assert all(filecmp.cmp(mirror / rel, target / rel, shallow=False) for rel in got), label
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ARGO download modes")
+    parser.add_argument("--floats", type=int, default=20)
+    parser.add_argument("--files", type=int, default=4, help="Files per float directory")
+    parser.add_argument("--size", type=int, default=256 * 1024, help="File size in bytes")
+    parser.add_argument("--latency", type=float, default=0.05, help="Server delay per request (s)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=8)
+    args = parser.parse_args()
+
+    scraper = load_script("scrape-argo-data.py")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        mirror = write_mirror(tmp / "mirror", args.floats, args.files, args.size)
+        expected = sorted(p.relative_to(mirror) for p in mirror.glob("*/*.nc"))
+
+        with FakeMirror(mirror, latency=args.latency) as server:
+            timings = {}
+            for mode in ("threads", "async"):
+                target = tmp / mode
+                timings[mode] = run(scraper, mode, server.url + "?C=M;O=A", target, args.workers, args.per_host)
+                check_same(mirror, target, expected, mode)
+
+            # Re-sync: every float gets a new _prof.nc upstream, whose transfer is cut
+            # off once halfway through, and a quarter of them a new Sprof too.
+            updated = [mirror / f"{p.name}/{p.name}_Sprof.nc" for p in sorted(mirror.iterdir())[::4]]
+            rewritten = sorted(mirror.glob("*/*_prof.nc"))
+            for path in updated + rewritten:
+                touch_file(path, os.urandom(args.size), datetime(2025, 9, 12, 8, 0))
+            resync, unchanged = {}, {}
+            for mode in ("threads", "async"):
+                target = tmp / mode
+                server.interrupt = {f"/{p.relative_to(mirror)}": True for p in rewritten}
+                server.reset_stats()
+                seconds = run(scraper, mode, server.url + "?C=M;O=A", target, args.workers, args.per_host)
+                check_same(mirror, target, expected, f"{mode} re-sync")
+                assert not list(target.rglob("*.part")), f"{mode}: .part files left behind"
+                resync[mode] = (seconds, dict(server.stats))
+
+                server.reset_stats()
+                run(scraper, mode, server.url + "?C=M;O=A", target, args.workers, args.per_host)
+                assert server.stats["requests"] == 1, f"{mode}: {server.stats['requests']} requests with nothing changed"
+                unchanged[mode] = dict(server.stats)
+
+    delta = (len(updated) + len(rewritten)) * args.size
+
+    files = len(expected)
+    print(f"{args.floats} floats, {files} files of {args.size // 1024} KiB, {args.latency * 1000:.0f} ms latency")
+    for mode, seconds in timings.items():
+        print(f"  {mode:<8} {seconds:7.2f}s  {files / seconds:8.1f} files/s")
+    print(f"  speedup  {timings['threads'] / timings['async']:.1f}x")
+    print(f"re-sync: {len(updated) + len(rewritten)} updated files, {len(rewritten)} of them interrupted once "
+          f"({delta // 1024} KiB of file data changed)")
+    for mode, (seconds, stats) in resync.items():
+        print(f"  {mode:<8} {seconds:7.2f}s  {stats['requests']:5d} requests  {stats['bytes'] // 1024:8d} KiB sent")
+    print("unchanged sync:")
+    for mode, stats in unchanged.items():
+        print(f"  {mode:<8} {stats['requests']:5d} requests  {stats['bytes'] // 1024:8d} KiB sent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares ProfileProcessor.calculate_metrics_batch in create-vector-database.py
+with the per-profile calculate_metrics on synthetic rows shaped like the
+aggregated profile query, and checks they agree within a tolerance.
+
+Usage: python -m benchmarks.bench_features [--profiles N] [--levels N]
+"""
+import argparse
+import math
+
+import numpy as np
+
+from benchmarks import load_script
+from benchmarks.bench_extract import best_of
+
+METRICS = ["max_pressure", "sea_surface_temp", "thermocline_depth", "mean_salinity", "mean_oxygen"]
+
+
+def synthetic_rows(n_profiles: int, max_levels: int, seed: int = 0):
+    """
+    Rows with profiles of varying depth, missing values, and a few empty or core-only
+    profiles; every 7th has its pressures rounded to whole dbar, so levels repeat.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for profile_id in range(n_profiles):
+        n = int(rng.integers(0, max_levels + 1)) if profile_id % 10 else int(rng.integers(0, 3))
+        pressures = np.sort(rng.uniform(0, 2000, n))
+        if profile_id % 7 == 0:
+            pressures = np.round(pressures)
+        temps = 28 - 20 * np.tanh(pressures / 300) + rng.normal(0, 0.05, n)
+        sal = 35 + rng.normal(0, 0.2, n)
+        doxy = 200 + rng.normal(0, 10, n)
+
+        def with_gaps(values, fraction):
+            return [None if rng.random() < fraction else float(v) for v in values]
+
+        rows.append({
+            "profile_id": profile_id,
+            "pressures": with_gaps(pressures, 0.02),
+            "temperatures": with_gaps(temps, 0.05),
+            "salinities": with_gaps(sal, 0.05),
+            "doxys": with_gaps(doxy, 0.1) if profile_id % 3 else [None] * n,
+        })
+    return rows
+
+
+def same(a, b, rtol=1e-9, atol=1e-9):
+    if a is None or b is None:
+        return a is None and b is None
+    return math.isclose(a, b, rel_tol=rtol, abs_tol=atol)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched profile metrics")
+    parser.add_argument("--profiles", type=int, default=128, help="Profiles per batch (BATCH_SIZE)")
+    parser.add_argument("--levels", type=int, default=1000, help="Max levels per profile")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    vectors = load_script("create-vector-database.py")
+    processor = vectors.ProfileProcessor()
+    rows = synthetic_rows(args.profiles, args.levels)
+
+    scalar_time, expected = best_of(lambda: [processor.calculate_metrics(row) for row in rows], args.repeat)
+    batch_time, got = best_of(lambda: processor.calculate_metrics_batch(rows), args.repeat)
+
+    for row, want, have in zip(rows, expected, got):
+        for name in METRICS:
+            assert same(want.get(name), have[name]), \
+                f"profile {row['profile_id']} {name}: scalar {want.get(name)}, batch {have[name]}"
+
+    print(f"{len(rows)} profiles, up to {args.levels} levels")
+    print(f"  scalar  {scalar_time * 1000:8.1f} ms")
+    print(f"  batch   {batch_time * 1000:8.1f} ms")
+    print(f"  speedup {scalar_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Ingest throughput benchmark for netcdf-to-postgres.py.
+
+Generates synthetic floats of increasing size, ingests each one into a scratch
+schema of a local Postgres and reports profiles/sec, rows/sec and peak memory
+as JSON, so runs can be compared with --compare.
+
+The connection uses the standard libpq settings (PGHOST, PGDATABASE, PGUSER, ...)
+unless --dsn is given.
+
+Usage: python -m benchmarks.bench_ingest --profiles 10,100,1000,10000 --output run.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import BGC_MIXES, write_float
+
+SCHEMA = "ingest_bench"
+FLOAT_ID = 1900001
+
+# Same tables as create_tables in ai/scripts/populate_vectordb.py, with only the
+# unique key the ingestion's ON CONFLICT relies on.
+SCHEMA_DDL = f"""
+    CREATE SCHEMA IF NOT EXISTS {SCHEMA};
+    SET search_path TO {SCHEMA}, public;
+    CREATE TABLE IF NOT EXISTS floats (
+        platform_id INTEGER PRIMARY KEY,
+        project_name VARCHAR(100),
+        launch_date TIMESTAMP WITH TIME ZONE,
+        launch_latitude DOUBLE PRECISION,
+        launch_longitude DOUBLE PRECISION,
+        float_type VARCHAR(10)
+    );
+    CREATE TABLE IF NOT EXISTS profiles (
+        profile_id BIGSERIAL PRIMARY KEY,
+        platform_id INTEGER NOT NULL REFERENCES floats(platform_id) ON DELETE CASCADE,
+        cycle_number INTEGER NOT NULL,
+        profile_date TIMESTAMP WITH TIME ZONE NOT NULL,
+        latitude DOUBLE PRECISION NOT NULL,
+        longitude DOUBLE PRECISION NOT NULL,
+        location GEOGRAPHY(Point, 4326)
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS profiles_platform_cycle_key ON profiles (platform_id, cycle_number);
+    CREATE TABLE IF NOT EXISTS measurements (
+        measurement_id BIGSERIAL PRIMARY KEY,
+        profile_id BIGINT NOT NULL REFERENCES profiles(profile_id) ON DELETE CASCADE,
+        pressure DOUBLE PRECISION NOT NULL,
+        temperature DOUBLE PRECISION,
+        salinity DOUBLE PRECISION,
+        doxy DOUBLE PRECISION,
+        chla DOUBLE PRECISION,
+        nitrate DOUBLE PRECISION,
+        ph_in_situ_total DOUBLE PRECISION,
+        bbp700 DOUBLE PRECISION
+    );
+"""
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process; ru_maxrss is bytes on macOS, KB elsewhere."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_case(dsn, meta_file, sprof_file, mode, copy_format, chunk_profiles):
+    """Ingest one synthetic float in a fresh process and measure it."""
+    import psycopg2
+    from netCDF4 import Dataset
+    from benchmarks import load_script
+
+    ingest = load_script("netcdf-to-postgres.py")
+    baseline_rss = _peak_rss_mb()
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_DDL)
+        cur.execute("TRUNCATE floats, profiles, measurements")
+    conn.commit()
+
+    start = time.perf_counter()
+    with Dataset(meta_file, "r") as ds:
+        ingest.insert_float(conn, FLOAT_ID, ds)
+    insert_float_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if mode == "bulk":
+        ok = (ingest.stage_float(conn, FLOAT_ID, sprof_file, meta_file, copy_format,
+                                 chunk_profiles=chunk_profiles)
+              and ingest.merge_staging(conn))
+    else:
+        ok = ingest.process_float(conn, FLOAT_ID, sprof_file, meta_file, chunk_profiles=chunk_profiles)
+    process_float_s = time.perf_counter() - start
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM profiles")
+        n_profiles = cur.fetchone()[0]
+        cur.execute("SELECT count(*) FROM measurements")
+        n_rows = cur.fetchone()[0]
+    conn.close()
+
+    return {
+        "ok": bool(ok),
+        "insert_float_s": round(insert_float_s, 4),
+        "process_float_s": round(process_float_s, 4),
+        "profiles": n_profiles,
+        "rows": n_rows,
+        "profiles_per_s": round(n_profiles / process_float_s, 1),
+        "rows_per_s": round(n_rows / process_float_s, 1),
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def compare(results, baseline_path):
+    """Print rows/sec of this run against a previous JSON report."""
+    with open(baseline_path) as f:
+        baseline = {_case_key(r): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(_case_key(result))
+        if before is None or not before["rows_per_s"]:
+            continue
+        ratio = result["rows_per_s"] / before["rows_per_s"]
+        print(f"  {result['mode']:5} {result['mix']:6} {result['n_prof']:>6} profiles: "
+              f"{before['rows_per_s']:>12.0f} -> {result['rows_per_s']:>12.0f} rows/s ({ratio:.2f}x)")
+
+
+def _case_key(result):
+    return result["mode"], result["mix"], result["n_prof"], result["n_levels"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ARGO NetCDF ingestion into PostgreSQL")
+    parser.add_argument("--dsn", default="", help="libpq connection string (default: PG* environment)")
+    parser.add_argument("--profiles", default="10,100,1000,10000",
+                        help="Comma-separated float sizes in profiles (default: 10,100,1000,10000)")
+    parser.add_argument("--levels", type=int, default=500, help="N_LEVELS of the Sprof files (default: 500)")
+    parser.add_argument("--mix", choices=sorted(BGC_MIXES), default="bgc", help="BGC variable mix (default: bgc)")
+    parser.add_argument("--modes", default="rows,bulk", help="Ingestion modes to time (default: rows,bulk)")
+    parser.add_argument("--copy-format", choices=["text", "binary"], default="binary")
+    parser.add_argument("--chunk-profiles", type=int, default=256)
+    parser.add_argument("-o", "--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Previous JSON report to compare rows/sec against")
+    args = parser.parse_args()
+
+    # Every case runs in a freshly spawned interpreter so peak RSS is its own
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_prof in map(int, args.profiles.split(",")):
+            meta_file, sprof_file = write_float(os.path.join(tmp, str(n_prof)), FLOAT_ID,
+                                                n_prof, args.levels, args.mix)
+            for mode in args.modes.split(","):
+                with ctx.Pool(1) as pool:
+                    measured = pool.apply(_run_case, (args.dsn, meta_file, sprof_file, mode,
+                                                      args.copy_format, args.chunk_profiles))
+                result = {"mode": mode, "mix": args.mix, "n_prof": n_prof, "n_levels": args.levels,
+                          "file_mb": round(os.path.getsize(sprof_file) / (1 << 20), 2), **measured}
+                results.append(result)
+                print(f"[{mode}] {n_prof} profiles: {result['rows_per_s']:.0f} rows/s, "
+                      f"peak {result['peak_rss_mb']} MB", file=sys.stderr)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "copy_format": args.copy_format,
+        "chunk_profiles": args.chunk_profiles,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Compares the row-pattern listing parser in scrape-argo-data.py with the
+BeautifulSoup one on a root index page the size of a large DAC.
+
+Usage: python -m benchmarks.bench_listing [--rows N]
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks import load_script
+from benchmarks.bench_extract import best_of
+from benchmarks.fake_mirror import index_page
+
+URL = "https://data-argo.ifremer.fr/dac/coriolis/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark index page parsing")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    scraper = load_script("scrape-argo-data.py")
+    start = 1.7e9
+    entries = [(str(1900000 + i), True, start + 3600 * i, 0) for i in range(args.rows)]
+    entries.append(("a&b_meta.nc", False, start, 4096))
+    page = index_page("/dac/coriolis/", entries)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = scraper.ArgoDownloader(URL, tmp)
+        soup_time, expected = best_of(lambda: downloader.parse_listing_soup(page, URL), args.repeat)
+        fast_time, rows = best_of(lambda: downloader.parse_listing(page, URL), args.repeat)
+        downloader.index.close()
+
+    assert rows == expected, "listing parsers disagree"
+    print(f"{len(rows)} rows ({len(page) // 1024} KiB page)")
+    print(f"  soup     {soup_time * 1000:8.1f} ms")
+    print(f"  pattern  {fast_time * 1000:8.1f} ms")
+    print(f"  speedup  {soup_time / fast_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
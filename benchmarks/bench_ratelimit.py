@@ -0,0 +1,57 @@
+"""
+Downloads from a local fake mirror that answers 429 above a fixed request rate,
+once with a static per-file delay tuned to stay under it and once with the
+adaptive rate limiter of scrape-argo-data.py, and reports wall time and 429s.
+
+Usage: python -m benchmarks.bench_ratelimit [--floats N] [--mirror-rps N]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import load_script
+from benchmarks.bench_download import check_same
+from benchmarks.fake_mirror import FakeMirror, write_mirror
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark download rate limiting")
+    parser.add_argument("--floats", type=int, default=30)
+    parser.add_argument("--size", type=int, default=32 * 1024, help="File size in bytes")
+    parser.add_argument("--mirror-rps", type=float, default=40, help="Requests/sec the mirror tolerates")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    scraper = load_script("scrape-argo-data.py")
+    # A static delay that keeps all workers under the mirror's limit
+    static_delay = args.workers / args.mirror_rps
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        mirror = write_mirror(tmp / "mirror", args.floats, 4, args.size)
+        expected = sorted(p.relative_to(mirror) for p in mirror.glob("*/*.nc"))
+
+        results = {}
+        for label, delay in (("static", static_delay), ("adaptive", 0.0)):
+            with FakeMirror(mirror, max_rps=args.mirror_rps) as server:
+                downloader = scraper.ArgoDownloader(server.url, tmp / label, delay=delay, max_retries=8,
+                                                    start_date="2025-09-01", end_date="2025-09-15",
+                                                    workers=args.workers, per_host=args.workers)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    asyncio.run(downloader.download_all_async())
+                results[label] = (time.perf_counter() - start, dict(server.stats))
+                downloader.index.close()
+            check_same(mirror, tmp / label, expected, label)
+
+    print(f"{len(expected)} files, mirror limit {args.mirror_rps:.0f} req/s, {args.workers} workers")
+    for label, (seconds, stats) in results.items():
+        print(f"  {label:<9} {seconds:6.2f}s  {stats['requests'] / seconds:6.1f} req/s  {stats['throttled']:4d} x 429")
+
+
+if __name__ == "__main__":
+    main()
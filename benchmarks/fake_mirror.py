@@ -0,0 +1,241 @@
+"""
+A local stand-in for the ARGO DAC mirror: a directory tree served over HTTP with
+Apache-style index pages, for exercising scrape-argo-data.py without the network.
+"""
+import email.utils
+import html
+import io
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+INDEX_ROW = ('<tr><td valign="top"><img src="/icons/{icon}.gif" alt="[{alt}]"></td>'
+             '<td><a href="{href}">{name}</a></td><td align="right">{lastmod}  </td>'
+             '<td align="right">{size}</td><td>&nbsp;</td></tr>\n')
+
+
+def apache_index(path: Path, url_path: str) -> str:
+    """An index page shaped like the one Apache's mod_autoindex serves on data-argo.ifremer.fr."""
+    entries = []
+    for entry in sorted(path.iterdir()):
+        stat = entry.stat()
+        entries.append((entry.name, entry.is_dir(), stat.st_mtime, stat.st_size))
+    return index_page(url_path, entries)
+
+
+def index_page(url_path: str, entries) -> str:
+    """apache_index for (name, is_dir, mtime, size) entries."""
+    rows = [INDEX_ROW.format(icon="back", alt="PARENTDIR", href="../", name="Parent Directory",
+                             lastmod="", size="-")]
+    for name, is_dir, mtime, size in entries:
+        name += "/" if is_dir else ""
+        rows.append(INDEX_ROW.format(
+            icon="folder" if is_dir else "unknown",
+            alt="DIR" if is_dir else "   ",
+            href=html.escape(name), name=html.escape(name),
+            lastmod=datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M"),
+            size="-" if is_dir else size,
+        ))
+    return (f"<!DOCTYPE HTML PUBLIC \"-//W3C//DTD HTML 3.2 Final//EN\">\n<html>\n<head>\n"
+            f"<title>Index of {html.escape(url_path)}</title>\n</head>\n<body>\n"
+            f"<h1>Index of {html.escape(url_path)}</h1>\n<table>\n"
+            f"<tr><th valign=\"top\"><img src=\"/icons/blank.gif\" alt=\"[ICO]\"></th>"
+            f"<th><a href=\"?C=N;O=D\">Name</a></th><th><a href=\"?C=M;O=A\">Last modified</a></th>"
+            f"<th><a href=\"?C=S;O=A\">Size</a></th><th><a href=\"?C=D;O=A\">Description</a></th></tr>\n"
+            f"<tr><th colspan=\"5\"><hr></th></tr>\n"
+            + "".join(rows) +
+            "<tr><th colspan=\"5\"><hr></th></tr>\n</table>\n</body></html>\n")
+
+
+def etag(stat) -> str:
+    """An Apache-style strong ETag from size and mtime."""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns // 1000:x}"'
+
+
+class MirrorHandler(SimpleHTTPRequestHandler):
+    """
+    Serves files and Apache index pages over keep-alive connections, with optional
+    latency, ETag/If-Modified-Since revalidation and open-ended Range requests.
+    Paths in `mirror.interrupt` are cut off halfway through their next full response,
+    and requests beyond `mirror.max_rps` in any one second get a 429 with Retry-After.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, *args, mirror=None, **kwargs):
+        self.mirror = mirror
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.mirror.latency:
+            time.sleep(self.mirror.latency)
+        self.mirror.count(requests=1)
+        if not self.mirror.admit():
+            self.mirror.count(throttled=1)
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        super().do_GET()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            return super().send_head()
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        stat = os.fstat(f.fileno())
+        tag = etag(stat)
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        if self._not_modified(stat, tag):
+            f.close()
+            self.send_response(304)
+            self.send_header("ETag", tag)
+            self.end_headers()
+            return None
+
+        offset = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range") in (tag, last_modified, None):
+            offset = int(match.group(1))
+            if offset >= stat.st_size:
+                f.close()
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{stat.st_size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            f.seek(offset)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {offset}-{stat.st_size - 1}/{stat.st_size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/x-netcdf")
+        self.send_header("Content-Length", str(stat.st_size - offset))
+        self.send_header("ETag", tag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+
+        if offset == 0 and self.mirror.interrupt.pop(self.path, None):
+            data = f.read(stat.st_size // 2)
+            f.close()
+            self.wfile.write(data)
+            self.mirror.count(bytes=len(data))
+            self.close_connection = True
+            return None
+        return f
+
+    def _not_modified(self, stat, tag) -> bool:
+        if "If-None-Match" in self.headers:
+            return tag in [t.strip() for t in self.headers["If-None-Match"].split(",")]
+        if "If-Modified-Since" in self.headers:
+            try:
+                since = email.utils.parsedate_to_datetime(self.headers["If-Modified-Since"])
+            except (TypeError, ValueError):
+                return False
+            modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+            return modified <= since
+        return False
+
+    def copyfile(self, source, outputfile):
+        before = source.tell()
+        shutil.copyfileobj(source, outputfile)
+        self.mirror.count(bytes=source.tell() - before)
+
+    def list_directory(self, path):
+        body = apache_index(Path(path), self.path.split("?")[0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html;charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_mirror(root, n_floats: int = 20, files_per_float: int = 4, file_size: int = 256 * 1024,
+                 lastmod: datetime = datetime(2025, 9, 10, 12, 0)):
+    """Writes a dac/<dac>/ style tree: numbered float directories with .nc files and a profiles/ subdirectory."""
+    root = Path(root)
+    stamp = lastmod.timestamp()
+    for i in range(n_floats):
+        float_dir = root / str(2900000 + i)
+        (float_dir / "profiles").mkdir(parents=True, exist_ok=True)
+        names = [f"{float_dir.name}_meta.nc", f"{float_dir.name}_Sprof.nc", f"{float_dir.name}_prof.nc",
+                 f"{float_dir.name}_tech.nc"][:files_per_float]
+        for name in names:
+            (float_dir / name).write_bytes(os.urandom(16) + bytes(file_size - 16))
+            os.utime(float_dir / name, (stamp, stamp))
+        (float_dir / "profiles" / f"R{float_dir.name}_001.nc").write_bytes(b"\0" * 1024)
+        os.utime(float_dir / "profiles", (stamp, stamp))
+        os.utime(float_dir, (stamp, stamp))
+    return root
+
+
+def touch_file(path, content: bytes, when: datetime):
+    """Replaces a mirrored file, as an upstream update would; that also bumps its directory's mtime."""
+    path = Path(path)
+    path.write_bytes(content)
+    for target in (path, path.parent):
+        os.utime(target, (when.timestamp(), when.timestamp()))
+
+
+class FakeMirror:
+    """
+    Context manager running a MirrorHandler server on a free localhost port in a
+    background thread. Counts requests, throttled requests and body bytes sent in `stats`.
+    """
+
+    def __init__(self, root, latency: float = 0.0, max_rps: float = None):
+        self.latency = latency
+        self.interrupt = {}
+        self.max_rps = max_rps
+        self.stats = {"requests": 0, "bytes": 0, "throttled": 0}
+        self._window = deque()
+        self._lock = threading.Lock()
+        handler = partial(MirrorHandler, directory=str(root), mirror=self)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": 0, "bytes": 0, "throttled": 0}
+
+    def admit(self) -> bool:
+        """Whether a request fits in max_rps over the last second."""
+        if not self.max_rps:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            while self._window and self._window[0] <= now - 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.max_rps:
+                return False
+            self._window.append(now)
+            return True
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
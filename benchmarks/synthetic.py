@@ -0,0 +1,97 @@
+"""
+Synthetic ARGO NetCDF files with the same layout as the GDAC *_meta.nc and
+*_Sprof.nc files.
+"""
+import os
+
+import numpy as np
+from netCDF4 import Dataset
+
+FILL_VALUE = 99999.0
+JULD_UNITS = "days since 1950-01-01 00:00:00 UTC"
+
+# Per-level variables written for each kind of float, with the fraction of
+# levels left masked (BGC sensors sample more sparsely than the CTD).
+CORE_VARS = {"PRES": 0.0, "TEMP": 0.0, "PSAL": 0.0}
+BGC_MIXES = {
+    "core": {},
+    "oxygen": {"DOXY": 0.2},
+    "bgc": {"DOXY": 0.2, "CHLA": 0.5, "NITRATE": 0.5, "PH_IN_SITU_TOTAL": 0.5, "BBP700": 0.5},
+}
+
+
+def _profile_data(name, pres):
+    """Plausible values for a variable, given the pressure levels."""
+    if name == "PRES":
+        return pres
+    if name == "TEMP":
+        return 28.0 - 24.0 * (1 - np.exp(-pres / 300.0))
+    if name == "PSAL":
+        return 35.0 + 0.5 * np.exp(-pres / 500.0)
+    if name == "DOXY":
+        return 200.0 - 0.05 * pres
+    if name == "CHLA":
+        return 0.5 * np.exp(-pres / 50.0)
+    if name == "NITRATE":
+        return 0.01 * pres
+    if name == "PH_IN_SITU_TOTAL":
+        return 8.1 - 0.0002 * pres
+    return 0.001 * np.exp(-pres / 100.0)
+
+
+def _write_chars(ds, name, dim, text):
+    var = ds.createVariable(name, "S1", (dim,))
+    var[:] = np.array(list(text.ljust(len(ds.dimensions[dim]))), dtype="S1")
+
+
+def write_meta(path, launch_date: str = "20200101000000", lat: float = 12.0, lon: float = 85.0):
+    """Write a synthetic *_meta.nc with the fields insert_float reads."""
+    with Dataset(path, "w") as ds:
+        ds.createDimension("STRING64", 64)
+        ds.createDimension("DATE_TIME", 14)
+        _write_chars(ds, "PROJECT_NAME", "STRING64", "SYNTHETIC BENCHMARK")
+        _write_chars(ds, "LAUNCH_DATE", "DATE_TIME", launch_date)
+        ds.createVariable("LAUNCH_LATITUDE", "f8")[:] = lat
+        ds.createVariable("LAUNCH_LONGITUDE", "f8")[:] = lon
+    return path
+
+
+def write_sprof(path, n_prof: int = 200, n_levels: int = 1000, seed: int = 0, mix: str = "bgc"):
+    """
+    Write a synthetic Sprof file. Profiles stop at random depths, so the tail of
+    every (N_PROF, N_LEVELS) variable is fill values, and the BGC variables of
+    `mix` are masked more sparsely than the core ones, like on real floats.
+    """
+    rng = np.random.default_rng(seed)
+    depth = rng.integers(n_levels // 4, n_levels + 1, size=n_prof)
+    below_bottom = np.arange(n_levels)[None, :] >= depth[:, None]
+
+    with Dataset(path, "w") as ds:
+        ds.createDimension("N_PROF", n_prof)
+        ds.createDimension("N_LEVELS", n_levels)
+
+        juld = ds.createVariable("JULD", "f8", ("N_PROF",), fill_value=999999.0)
+        juld.units = JULD_UNITS
+        juld[:] = 25000.0 + 10.0 * np.arange(n_prof)
+        ds.createVariable("LATITUDE", "f8", ("N_PROF",), fill_value=FILL_VALUE)[:] = rng.uniform(-30, 25, n_prof)
+        ds.createVariable("LONGITUDE", "f8", ("N_PROF",), fill_value=FILL_VALUE)[:] = rng.uniform(40, 100, n_prof)
+        ds.createVariable("CYCLE_NUMBER", "i4", ("N_PROF",), fill_value=99999)[:] = np.arange(1, n_prof + 1)
+
+        pres = np.linspace(0, 2000, n_levels, dtype=np.float32)[None, :].repeat(n_prof, axis=0)
+        for name, missing_rate in {**CORE_VARS, **BGC_MIXES[mix]}.items():
+            var = ds.createVariable(name, "f4", ("N_PROF", "N_LEVELS"), fill_value=FILL_VALUE)
+            mask = below_bottom | (rng.random(pres.shape) < missing_rate)
+            var[:] = np.ma.masked_array(_profile_data(name, pres).astype(np.float32), mask=mask)
+    return path
+
+
+def write_float(root, float_id: int, n_prof: int, n_levels: int = 500, mix: str = "bgc", seed: int = 0):
+    """
+    Write <root>/<float_id>/{float_id}_meta.nc and _Sprof.nc, laid out like the
+    scraper's download directory. Returns (meta_file, sprof_file).
+    """
+    float_dir = os.path.join(root, str(float_id))
+    os.makedirs(float_dir, exist_ok=True)
+    meta_file = write_meta(os.path.join(float_dir, f"{float_id}_meta.nc"))
+    sprof_file = write_sprof(os.path.join(float_dir, f"{float_id}_Sprof.nc"), n_prof, n_levels, seed, mix)
+    return meta_file, sprof_file
@@ -0,0 +1,202 @@
+"""
+Streaming ARGO sync: download float directories with scrape-argo-data.py and
+ingest each one with netcdf-to-postgres.py as soon as all its files are on disk,
+instead of running the two scripts one after the other.
+
+Completed directories go through a bounded queue to a pool of ingestion threads,
+each with its own database connection. When the queue is full the downloader
+waits, so at most --queue-size floats are ever waiting on disk. With
+--delete-after-ingest the NetCDF files of a float are removed once ingested.
+"""
+
+import os
+import sys
+import time
+import queue
+import asyncio
+import argparse
+import threading
+import importlib.util
+from pathlib import Path
+
+
+def load_script(filename: str):
+    """Load a sibling script with a hyphenated name (e.g. 'netcdf-to-postgres.py') as a module."""
+    path = Path(__file__).resolve().parent / filename
+    spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+scraper = load_script("scrape-argo-data.py")
+ingest = load_script("netcdf-to-postgres.py")
+
+
+class IngestWorkers:
+    """Threads ingesting the float directories put on a bounded queue."""
+
+    def __init__(self, workers: int = 2, queue_size: int = 4, delete_after: bool = False,
+                 full: bool = False, chunk_profiles: int = ingest.CHUNK_PROFILES):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.delete_after = delete_after
+        self.full = full
+        self.chunk_profiles = chunk_profiles
+        self.failed = []
+        self.counts = {"done": 0, "unchanged": 0, "failed": 0}
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+        # Directories queued so far, so leftovers fetched again by the crawl aren't queued twice
+        self.submitted = set()
+        # Never ingest one float on two threads at once, should it still be queued twice
+        self._in_progress = set()
+        self._idle = threading.Condition(self._lock)
+        self.threads = [threading.Thread(target=self._run, name=f"ingest-{i}", daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, float_dir: Path):
+        """Queue a downloaded float directory; blocks while the queue is full."""
+        float_dir = Path(float_dir)
+        with self._lock:
+            self.submitted.add(float_dir.resolve())
+        self.queue.put(float_dir)
+        with self._lock:
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def close(self):
+        """Wait for the queued floats to be ingested and stop the threads."""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def _run(self):
+        conn = ingest.connect_db()
+        layout = ingest.measurements_layout(conn)
+        try:
+            while (float_dir := self.queue.get()) is not None:
+                task = ingest.float_files(str(float_dir))
+                if task:
+                    self._ingest(conn, layout, float_dir, task)
+                else:
+                    # float_files has printed what is missing
+                    self._record(int(float_dir.name), "failed", 0.0)
+        finally:
+            conn.close()
+
+    def _ingest(self, conn, layout, float_dir: Path, task):
+        float_id = task[0]
+        with self._idle:
+            self._idle.wait_for(lambda: float_id not in self._in_progress)
+            self._in_progress.add(float_id)
+
+        start = time.perf_counter()
+        try:
+            status = ingest.ingest_float(conn, *task, full=self.full, chunk_profiles=self.chunk_profiles,
+                                         layout=layout)
+        except Exception as e:
+            conn.rollback()
+            print(f"[X] CRITICAL error on float {float_id}: {e}")
+            status = "failed"
+        elapsed = time.perf_counter() - start
+
+        if status != "failed" and self.delete_after:
+            remove_netcdf(float_dir)
+        with self._idle:
+            self._in_progress.discard(float_id)
+            self._idle.notify_all()
+        self._record(float_id, status, elapsed)
+
+    def _record(self, float_id: int, status: str, elapsed: float):
+        with self._lock:
+            self.counts[status] += 1
+            self.busy_seconds += elapsed
+            if status == "failed":
+                self.failed.append(float_id)
+        print(f"[i] float {float_id} {status} in {elapsed:.1f}s (queue depth {self.queue.qsize()})")
+
+
+def remove_netcdf(float_dir: Path):
+    """Delete a float directory's .nc files and their download sidecars."""
+    for path in float_dir.glob("*.nc"):
+        path.unlink(missing_ok=True)
+        scraper.meta_path(path).unlink(missing_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download ARGO float directories and ingest each as it completes")
+    parser.add_argument("url", help="Base URL of the DAC directory")
+    parser.add_argument("-d", "--dir", default="argo_data", help="Local directory (default: argo_data)")
+    parser.add_argument("--start", type=str, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=str, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--retries", type=int, default=3, help="Max retries per file (default: 3)")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="Parallel downloads (default: 8)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Download through one shared asyncio connection pool")
+    parser.add_argument("--per-host", type=int, default=8,
+                        help="Max connections per host in --async mode (default: 8)")
+    parser.add_argument("--max-rps", type=float,
+                        help="Requests/sec across all downloads; adapts to HTTP 429/503 (default: none)")
+    parser.add_argument("--max-bps", type=float, help="Download bytes/sec across all downloads (default: none)")
+    parser.add_argument("--ingest-workers", type=int, default=2,
+                        help="Ingestion threads, each with its own database connection (default: 2)")
+    parser.add_argument("--queue-size", type=int, default=4,
+                        help="Downloaded floats waiting for ingestion before downloads pause (default: 4)")
+    parser.add_argument("--delete-after-ingest", action="store_true",
+                        help="Delete a float's NetCDF files once it has been ingested")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the ingest manifest and parse every profile of every file")
+    parser.add_argument("--chunk-profiles", type=int, default=ingest.CHUNK_PROFILES,
+                        help=f"Profiles read and written per chunk (default: {ingest.CHUNK_PROFILES})")
+    args = parser.parse_args()
+
+    conn = ingest.connect_db()
+    ingest.ensure_manifest(conn)
+    layout = ingest.measurements_layout(conn)
+    ingest.create_indexes(conn, layout)
+
+    start = time.perf_counter()
+    workers = IngestWorkers(args.ingest_workers, args.queue_size, args.delete_after_ingest,
+                            args.full, args.chunk_profiles)
+    downloader = scraper.ArgoDownloader(args.url, args.dir, delay=0, max_retries=args.retries,
+                                        start_date=args.start, end_date=args.end,
+                                        workers=args.workers, per_host=args.per_host,
+                                        on_dir_done=workers.submit, max_rps=args.max_rps,
+                                        max_bps=args.max_bps)
+
+    # Floats left on disk by an earlier run (e.g. whose ingest failed) are retried once the
+    # download is over, unless the crawl fetched and queued them again: queued during the crawl,
+    # --delete-after-ingest could remove their files while they are being re-downloaded.
+    # The manifest skips the ones that are already in the database.
+    leftovers = []
+    if os.path.isdir(args.dir):
+        leftovers = [float_dir for float_dir in sorted(Path(args.dir).iterdir())
+                     if float_dir.name.isdigit() and any(float_dir.glob("*.nc"))]
+
+    if args.use_async:
+        asyncio.run(downloader.download_all_async())
+    else:
+        downloader.download_all()
+    downloaded = time.perf_counter() - start
+    for float_dir in leftovers:
+        if float_dir.resolve() not in workers.submitted:
+            workers.submit(float_dir)
+    workers.close()
+    downloader.index.close()
+    total = time.perf_counter() - start
+
+    print(f"\n[i] Downloads finished after {downloaded:.1f}s, ingestion after {total:.1f}s "
+          f"({workers.busy_seconds:.1f}s of ingest work, max queue depth {workers.max_depth})")
+    print(f"[i] floats: {workers.counts['done']} ingested, {workers.counts['unchanged']} unchanged, "
+          f"{workers.counts['failed']} failed")
+    if workers.failed:
+        print(f"[!] Failed floats: {', '.join(map(str, sorted(workers.failed)))}")
+    ingest.finish_ingest(conn, layout, loaded=workers.counts["done"] > 0)
+    sys.exit(1 if workers.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
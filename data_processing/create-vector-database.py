@@ -8,16 +8,25 @@ and upserts the embeddings and rich metadata into a ChromaDB collection.
 """
 
 import os
+import json
+import math
+import time
+import queue
+import hashlib
 import logging
+import argparse
+import threading
+import importlib.util
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from itertools import chain
+from typing import Dict, Iterator, List, Tuple, Optional
 
 import numpy as np
 import psycopg2
 import chromadb
 from tqdm import tqdm
 from sentence_transformers import SentenceTransformer
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 
 # --------------------------
 # Logging Setup
@@ -39,52 +48,276 @@ DB_CONFIG = {
 CHROMA_DIR = "./argo_chroma_db"
 COLLECTION_NAME = "argo_float_profiles"
 BATCH_SIZE = 128
+# Documents encoded per model.encode call, gathered across fetched batches
+EMBED_BATCH = 256
+# Batches buffered between two pipeline stages
+QUEUE_DEPTH = 4
 EMBED_MODEL = "all-MiniLM-L6-v2"
+EMBED_DIM = 384
 # Use a sentinel value for missing numeric metadata, as it's easier to filter than NaN or None
 MISSING_VALUE = -999.0
+SUMMARY_METRICS = ["max_pressure", "sea_surface_temp", "thermocline_depth", "mean_salinity", "mean_oxygen"]
+
+
+def load_embedding_cache():
+    """The chat backend's embedding cache module (ai/src/llm/embedding_cache.py), loaded by path."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai", "src", "llm", "embedding_cache.py")
+    spec = importlib.util.spec_from_file_location("embedding_cache", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+embedding_cache = load_embedding_cache()
+# Same defaults as EMBEDDING_CACHE_DIR/EMBEDDING_CACHE_SIZE in ai/src/core/config.py, so the
+# index build and the chat backend share one cache. Only the environment is read, not ai/.env.
+EMBEDDING_CACHE_DIR = os.path.abspath(os.environ.get("EMBEDDING_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "ai", "data", "embedding_cache"))
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", embedding_cache.DEFAULT_CAPACITY))
 
 # --------------------------
 # Database Operations
 # --------------------------
-def fetch_aggregated_profiles() -> List[Dict]:
-    """
-    Fetches one row per profile, joining with the floats table to get float_type
-    and aggregating all measurement data into arrays.
+# With the array storage layout, levels are already stored per profile, sorted by pressure
+ARRAY_LAYOUT_QUERY = """
+    SELECT
+      p.profile_id,
+      p.platform_id,
+      p.cycle_number,
+      p.profile_date,
+      p.latitude,
+      p.longitude,
+      f.float_type,
+      l.pressure AS pressures,
+      l.temperature AS temperatures,
+      l.salinity AS salinities,
+      l.doxy AS doxys
+    FROM profiles p
+    LEFT JOIN profile_levels l ON p.profile_id = l.profile_id
+    LEFT JOIN floats f ON p.platform_id = f.platform_id
+    {where}
+    ORDER BY p.profile_id;
+"""
+
+# Aggregates each profile's levels in a LATERAL subquery rather than one GROUP BY
+# over the whole join, so rows come out in profile_id order straight from the
+# indexes and the first batch streams without the whole archive being aggregated.
+AGGREGATE_QUERY = """
+    SELECT
+      p.profile_id,
+      p.platform_id,
+      p.cycle_number,
+      p.profile_date,
+      p.latitude,
+      p.longitude,
+      f.float_type,
+      m.pressures,
+      m.temperatures,
+      m.salinities,
+      m.doxys
+    FROM profiles p
+    LEFT JOIN floats f ON p.platform_id = f.platform_id
+    LEFT JOIN LATERAL (
+      SELECT
+        array_agg(pressure ORDER BY pressure) AS pressures,
+        array_agg(temperature ORDER BY pressure) AS temperatures,
+        array_agg(salinity ORDER BY pressure) AS salinities,
+        array_agg(doxy ORDER BY pressure) AS doxys
+      FROM measurements
+      WHERE profile_id = p.profile_id
+    ) m ON true
+    {where}
+    ORDER BY p.profile_id;
+"""
+
+WHERE_SUMMARY_MISSING = "NOT EXISTS (SELECT 1 FROM profile_summary s WHERE s.profile_id = p.profile_id)"
+# Profiles added since the last vector build, plus those of floats re-ingested since.
+# Ingests record the manifest in the same transaction as the profiles, at its start time,
+# so the second condition also catches rows with lower ids committed after the last build.
+WHERE_CHANGED_SINCE = "p.profile_id > %(high_water_mark)s"
+WHERE_REINGESTED_SINCE = """p.platform_id IN (
+    SELECT platform_id FROM ingest_manifest WHERE ingested_at >= %(built_at)s)"""
+
+
+def _profile_filter(conn, missing_summary_only: bool = False,
+                    changed_since: Optional[Dict] = None) -> Tuple[str, Dict]:
+    """WHERE clause and parameters selecting the profiles to fetch."""
+    conditions, params = [], {}
+    if missing_summary_only:
+        conditions.append(WHERE_SUMMARY_MISSING)
+    if changed_since:
+        changed = [WHERE_CHANGED_SINCE]
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('ingest_manifest') IS NOT NULL")
+            if cur.fetchone()[0]:
+                changed.append(WHERE_REINGESTED_SINCE)
+        conditions.append("(" + " OR ".join(changed) + ")")
+        params.update(changed_since)
+    return ("WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+def _profiles_query(conn, where: str) -> str:
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('profile_levels') IS NOT NULL")
+        query = ARRAY_LAYOUT_QUERY if cur.fetchone()[0] else AGGREGATE_QUERY
+    return query.format(where=where)
+
+
+def count_profiles(missing_summary_only: bool = False, changed_since: Optional[Dict] = None) -> int:
+    """Number of profiles stream_aggregated_profiles will yield, for progress reporting."""
+    with psycopg2.connect(**DB_CONFIG) as conn:
+        where, params = _profile_filter(conn, missing_summary_only, changed_since)
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM profiles p {where}", params)
+            return cur.fetchone()[0]
+
+
+def stream_aggregated_profiles(missing_summary_only: bool = False, changed_since: Optional[Dict] = None,
+                               batch_size: int = BATCH_SIZE) -> Iterator[List[Dict]]:
     """
-    logger.info("Connecting to PostgreSQL and fetching data...")
-    query = """
-        SELECT
-          p.profile_id,
-          p.platform_id,
-          p.cycle_number,
-          p.profile_date,
-          p.latitude,
-          p.longitude,
-          f.float_type,
-          array_agg(m.pressure ORDER BY m.pressure) AS pressures,
-          array_agg(m.temperature ORDER BY m.pressure) AS temperatures,
-          array_agg(m.salinity ORDER BY m.pressure) AS salinities,
-          array_agg(m.doxy ORDER BY m.pressure) AS doxys
-        FROM profiles p
-        LEFT JOIN measurements m ON p.profile_id = m.profile_id
-        LEFT JOIN floats f ON p.platform_id = f.platform_id
-        GROUP BY p.profile_id, f.float_type
-        ORDER BY p.profile_id;
+    Yields batches of `batch_size` rows of fetch_aggregated_profiles from a named
+    (server-side) cursor, so only one batch of profile arrays is in memory at a time.
+    `changed_since` ({"high_water_mark": profile_id, "built_at": timestamp}) limits
+    them to profiles added or re-ingested since a previous build.
     """
+    logger.info("Connecting to PostgreSQL and streaming profiles...")
+    fetched = 0
+    conn = psycopg2.connect(**DB_CONFIG)
     try:
-        with psycopg2.connect(**DB_CONFIG) as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query)
-                rows = cur.fetchall()
-        logger.info(f"Fetched {len(rows)} aggregated profiles from Postgres.")
-        return rows
+        where, params = _profile_filter(conn, missing_summary_only, changed_since)
+        query = _profiles_query(conn, where)
+        with conn.cursor(name="argo_profiles", cursor_factory=RealDictCursor) as cur:
+            cur.itersize = batch_size
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                fetched += len(rows)
+                yield rows
+        logger.info(f"Streamed {fetched} aggregated profiles from Postgres.")
     except psycopg2.Error as e:
-        logger.error(f"Database query failed: {e}")
+        logger.error(f"Database query failed after {fetched} profiles: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def fetch_aggregated_profiles(missing_summary_only: bool = False) -> List[Dict]:
+    """
+    Fetches one row per profile, joining with the floats table to get float_type
+    and aggregating all measurement data into arrays. With `missing_summary_only`,
+    only profiles without a profile_summary row are fetched.
+    """
+    try:
+        return [row for rows in stream_aggregated_profiles(missing_summary_only) for row in rows]
+    except psycopg2.Error:
         return []
 
+# --------------------------
+# Incremental Builds
+# --------------------------
+# The collection's metadata records how far the last complete build got: the highest
+# profile_id it embedded and the database time before which every transaction had
+# committed when it started (see build_start_time). Each document's metadata carries a
+# fingerprint of its text and metadata, so unchanged ones are not re-embedded.
+
+def content_hash(summary: str, metadata: Dict) -> str:
+    """Fingerprint of what gets embedded and stored for a profile."""
+    payload = json.dumps({"model": EMBED_MODEL, "document": summary, "metadata": metadata},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def read_build_state(collection) -> Optional[Dict]:
+    meta = collection.metadata or {}
+    if "high_water_mark" not in meta:
+        return None
+    return {"high_water_mark": meta["high_water_mark"], "built_at": datetime.fromisoformat(meta["built_at"])}
+
+
+def write_build_state(collection, high_water_mark: int, built_at: datetime) -> None:
+    # hnsw:* settings are fixed at creation and can't be passed to modify()
+    meta = {k: v for k, v in (collection.metadata or {}).items() if not k.startswith("hnsw:")}
+    meta.update(high_water_mark=int(high_water_mark), built_at=built_at.isoformat())
+    collection.modify(metadata=meta)
+
+
+# The start of the oldest transaction still open in this database, if earlier than now:
+# an ingest in progress has reserved profile_ids and stamped ingested_at at its start, and
+# may commit after this build has read past its ids. Other users' transactions are only
+# visible with the pg_read_all_stats role.
+BUILD_START_TIME = """
+    SELECT LEAST(now(), (SELECT min(xact_start) FROM pg_stat_activity
+                         WHERE datname = current_database() AND pid <> pg_backend_pid()))
+"""
+
+
+def build_start_time() -> datetime:
+    """The built_at of a build starting now, held back to the oldest open transaction."""
+    with psycopg2.connect(**DB_CONFIG) as conn:
+        with conn.cursor() as cur:
+            cur.execute(BUILD_START_TIME)
+            return cur.fetchone()[0]
+
+
+def unchanged_ids(collection, ids: List[str], hashes: List[str]) -> set:
+    """The ids whose stored document already has the given content hash."""
+    stored = collection.get(ids=ids, include=["metadatas"])
+    known = {doc_id: (meta or {}).get("content_hash") for doc_id, meta in zip(stored["ids"], stored["metadatas"])}
+    return {doc_id for doc_id, h in zip(ids, hashes) if known.get(doc_id) == h}
+
+# Per-profile metrics from ProfileProcessor.calculate_metrics, queryable by the chat
+# SQL without aggregating measurements. Also created by ai/scripts/populate_vectordb.py.
+SUMMARY_TABLE = """
+    CREATE TABLE IF NOT EXISTS profile_summary (
+        profile_id BIGINT PRIMARY KEY REFERENCES profiles(profile_id) ON DELETE CASCADE,
+        max_pressure DOUBLE PRECISION,
+        sea_surface_temp DOUBLE PRECISION,
+        thermocline_depth DOUBLE PRECISION,
+        mean_salinity DOUBLE PRECISION,
+        mean_oxygen DOUBLE PRECISION,
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+    );
+"""
+
+
+def ensure_summary_table() -> None:
+    """Creates profile_summary if missing; run once at startup, before any batch is written."""
+    with psycopg2.connect(**DB_CONFIG) as conn:
+        with conn.cursor() as cur:
+            cur.execute(SUMMARY_TABLE)
+        conn.commit()
+
+
+def _metric_value(value) -> Optional[float]:
+    """Converts a metric to a float for Postgres, with NULL for missing or non-finite values."""
+    if value is None or not math.isfinite(value):
+        return None
+    return float(value)
+
+
+def upsert_profile_summaries(conn, profile_ids: List[int], metrics: List[Dict]) -> None:
+    """Writes the metrics of a batch of profiles to profile_summary."""
+    rows = [[profile_id] + [_metric_value(m.get(name)) for name in SUMMARY_METRICS]
+            for profile_id, m in zip(profile_ids, metrics)]
+    with conn.cursor() as cur:
+        execute_values(cur, f"""
+            INSERT INTO profile_summary (profile_id, {", ".join(SUMMARY_METRICS)})
+            VALUES %s
+            ON CONFLICT (profile_id) DO UPDATE SET
+                {", ".join(f"{name} = EXCLUDED.{name}" for name in SUMMARY_METRICS)},
+                updated_at = now()
+        """, rows)
+    conn.commit()
+
 # --------------------------
 # Data Processing and Feature Engineering
 # --------------------------
+def _present(value) -> bool:
+    """A measured value: neither NULL nor NaN (the batch path reads both as NaN)."""
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
 class ProfileProcessor:
     """Encapsulates all logic for transforming a DB row into a document and metadata."""
 
@@ -93,7 +326,7 @@ class ProfileProcessor:
         if arr1 is None or arr2 is None:
             return np.array([]), np.array([])
         
-        pairs = [(p, t) for p, t in zip(arr1, arr2) if p is not None and t is not None]
+        pairs = [(p, t) for p, t in zip(arr1, arr2) if _present(p) and _present(t)]
         if not pairs:
             return np.array([]), np.array([])
             
@@ -112,8 +345,8 @@ class ProfileProcessor:
         metrics = {"thermocline_depth": None, "sea_surface_temp": None, "max_pressure": None}
         
         pressures, temps = self._clean_and_pair(row.get("pressures"), row.get("temperatures"))
-        salinities = np.array([s for s in row.get("salinities") or [] if s is not None])
-        doxys = np.array([d for d in row.get("doxys") or [] if d is not None])
+        salinities = np.array([s for s in row.get("salinities") or [] if _present(s)])
+        doxys = np.array([d for d in row.get("doxys") or [] if _present(d)])
 
         if pressures.size > 0:
             metrics["max_pressure"] = np.max(pressures)
@@ -122,11 +355,13 @@ class ProfileProcessor:
             if np.any(surface_mask):
                 metrics["sea_surface_temp"] = np.mean(temps[surface_mask])
 
-        if pressures.size >= 3:
-            # Sort by pressure for gradient calculation
-            sort_idx = np.argsort(pressures)
-            sorted_p, sorted_t = pressures[sort_idx], temps[sort_idx]
-            
+        # Sort by pressure for gradient calculation; of repeated pressure levels, which would
+        # divide by zero, only the first (in the row's order) is kept
+        sort_idx = np.argsort(pressures, kind="stable")
+        sorted_p, sorted_t = pressures[sort_idx], temps[sort_idx]
+        distinct = np.diff(sorted_p, prepend=-np.inf) > 0
+        sorted_p, sorted_t = sorted_p[distinct], sorted_t[distinct]
+        if sorted_p.size >= 3:
             # Thermocline detection
             temp_gradient = np.gradient(sorted_t, sorted_p)
             metrics["thermocline_depth"] = sorted_p[np.argmin(temp_gradient)]
@@ -135,6 +370,97 @@ class ProfileProcessor:
         metrics["mean_oxygen"] = np.mean(doxys) if doxys.size > 0 else None
         return metrics
 
+    @staticmethod
+    def _padded(rows: List[Dict], key: str, width: int) -> np.ndarray:
+        """One row per profile of the `key` arrays, with NaN for missing values and padding."""
+        columns = [row.get(key) or [] for row in rows]
+        lengths = np.array([len(values) for values in columns])
+        out = np.full((len(rows), width), np.nan)
+        # One conversion for the whole batch; None becomes NaN
+        out[np.arange(width) < lengths[:, None]] = np.array(list(chain.from_iterable(columns)), dtype=float)
+        return out
+
+    def calculate_metrics_batch(self, rows: List[Dict]) -> List[Dict]:
+        """calculate_metrics for a whole batch of rows at once, on NaN-padded 2D arrays."""
+        if not rows:
+            return []
+        width = max(max(len(row.get(key) or []) for row in rows)
+                    for key in ("pressures", "temperatures", "salinities", "doxys"))
+        width = max(width, 1)
+        pres = self._padded(rows, "pressures", width)
+        temp = self._padded(rows, "temperatures", width)
+        sal = self._padded(rows, "salinities", width)
+        doxy = self._padded(rows, "doxys", width)
+
+        # Move each profile's (pressure, temperature) pairs to the front, then sort them by
+        # pressure; the query already returns levels in pressure order, so that is rarely needed
+        paired = ~np.isnan(pres) & ~np.isnan(temp)
+        count = paired.sum(axis=1)
+        p, t = np.where(paired, pres, np.nan), np.where(paired, temp, np.nan)
+        gaps = (paired != (np.arange(width) < count[:, None])).any(axis=1)
+        if gaps.any():
+            order = np.argsort(~paired[gaps], axis=1, kind="stable")
+            p[gaps] = np.take_along_axis(p[gaps], order, axis=1)
+            t[gaps] = np.take_along_axis(t[gaps], order, axis=1)
+        unsorted = (np.diff(p, axis=1) < 0).any(axis=1)
+        if unsorted.any():
+            order = np.argsort(np.where(np.isnan(p[unsorted]), np.inf, p[unsorted]), axis=1, kind="stable")
+            p[unsorted] = np.take_along_axis(p[unsorted], order, axis=1)
+            t[unsorted] = np.take_along_axis(t[unsorted], order, axis=1)
+        has_pairs = count > 0
+
+        # As in calculate_metrics, the gradient only sees the first of repeated pressure levels
+        repeated = np.zeros_like(paired)
+        repeated[:, 1:] = p[:, 1:] == p[:, :-1]
+        dups = repeated.any(axis=1)
+        levels = count
+        if dups.any():
+            p[repeated], t[repeated] = np.nan, np.nan
+            order = np.argsort(np.isnan(p[dups]), axis=1, kind="stable")
+            p[dups] = np.take_along_axis(p[dups], order, axis=1)
+            t[dups] = np.take_along_axis(t[dups], order, axis=1)
+            levels = count - repeated.sum(axis=1)
+
+        max_pressure = np.where(has_pairs, np.where(paired, pres, -np.inf).max(axis=1), np.nan)
+        surface = paired & (pres <= 10)
+        n_surface = surface.sum(axis=1)
+        sea_surface_temp = np.where(surface, temp, 0).sum(axis=1) / np.maximum(n_surface, 1)
+
+        # np.gradient(t, p) row by row, with its coefficients so both paths pick the same minimum:
+        # second-order central differences inside, one-sided at both ends
+        thermocline_depth = np.full(len(rows), np.nan)
+        deep = levels >= 3
+        if deep.any():
+            p, t, n = p[deep], t[deep], levels[deep]
+            grad = np.full(p.shape, np.inf)
+            if width > 2:
+                dx1, dx2 = p[:, 1:-1] - p[:, :-2], p[:, 2:] - p[:, 1:-1]
+                grad[:, 1:-1] = (-dx2 / (dx1 * (dx1 + dx2)) * t[:, :-2]
+                                 + (dx2 - dx1) / (dx1 * dx2) * t[:, 1:-1]
+                                 + dx1 / (dx2 * (dx1 + dx2)) * t[:, 2:])
+            grad[:, 0] = (t[:, 1] - t[:, 0]) / (p[:, 1] - p[:, 0])
+            rows_idx = np.arange(len(n))
+            last = n - 1
+            grad[rows_idx, last] = ((t[rows_idx, last] - t[rows_idx, last - 1])
+                                    / (p[rows_idx, last] - p[rows_idx, last - 1]))
+            grad[np.arange(width) > last[:, None]] = np.inf
+            thermocline_depth[deep] = p[rows_idx, np.argmin(grad, axis=1)]
+
+        def nanmean(values):
+            valid = ~np.isnan(values)
+            n_valid = valid.sum(axis=1)
+            return np.where(n_valid > 0, np.where(valid, values, 0).sum(axis=1) / np.maximum(n_valid, 1), np.nan)
+
+        columns = {
+            "thermocline_depth": thermocline_depth,
+            "sea_surface_temp": np.where(n_surface > 0, sea_surface_temp, np.nan),
+            "max_pressure": max_pressure,
+            "mean_salinity": nanmean(sal),
+            "mean_oxygen": nanmean(doxy),
+        }
+        return [{name: (None if np.isnan(values[i]) else float(values[i])) for name, values in columns.items()}
+                for i in range(len(rows))]
+
     def create_summary_and_meta(self, row: Dict, metrics: Dict) -> Tuple[str, Dict]:
         """Creates the final text document and metadata dictionary."""
         # Create a rich, natural language summary for embedding
@@ -175,54 +501,292 @@ class ProfileProcessor:
         }
         return summary, metadata
 
+# --------------------------
+# Build Pipeline
+# --------------------------
+# fetch (main thread) -> featurize workers -> embed -> upsert, connected by bounded
+# queues so Postgres reads, feature engineering, model.encode and Chroma writes
+# overlap. A stage that fails keeps draining its queue so the others can finish.
+
+_DONE = object()
+
+
+class StageCounter:
+    """Items handled by one pipeline stage, and its time spent working vs. waiting on its queues."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int, busy: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy += busy
+
+    def get(self, q: queue.Queue):
+        start = time.perf_counter()
+        item = q.get()
+        with self._lock:
+            self.waiting += time.perf_counter() - start
+        return item
+
+    def put(self, q: queue.Queue, item) -> None:
+        start = time.perf_counter()
+        q.put(item)
+        with self._lock:
+            self.waiting += time.perf_counter() - start
+
+    def summary(self) -> str:
+        rate = self.items / self.busy if self.busy else 0.0
+        return (f"{self.name:<10} {self.items:8d} items {self.busy:8.1f}s busy {self.waiting:8.1f}s waiting "
+                f"{rate:10.1f} items/s while busy")
+
+
+def _drain(inbox: queue.Queue, senders: int) -> None:
+    """Consume and drop the rest of a failed stage's input until every sender is done."""
+    while senders:
+        if inbox.get() is _DONE:
+            senders -= 1
+
+
+def featurize_batch(processor: ProfileProcessor, collection, conn, batch_rows: List[Dict]):
+    """
+    Metrics, profile_summary rows, summaries and content hashes for one fetched batch.
+    Returns the (ids, documents, metadatas) that changed since they were last embedded,
+    and how many were unchanged.
+    """
+    batch_ids, batch_documents, batch_metadatas = [], [], []
+    batch_metrics = processor.calculate_metrics_batch(batch_rows)
+
+    for row, metrics in zip(batch_rows, batch_metrics):
+        # Skip profiles with no location data
+        if row.get('latitude') is None or row.get('longitude') is None:
+            continue
+
+        summary, metadata = processor.create_summary_and_meta(row, metrics)
+        metadata["content_hash"] = content_hash(summary, metadata)
+
+        batch_ids.append(str(row['profile_id']))
+        batch_documents.append(summary)
+        batch_metadatas.append(metadata)
+
+    upsert_profile_summaries(conn, [row['profile_id'] for row in batch_rows], batch_metrics)
+
+    if not batch_ids:
+        return ([], [], []), 0
+    unchanged = unchanged_ids(collection, batch_ids, [m["content_hash"] for m in batch_metadatas])
+    changed = [i for i, doc_id in enumerate(batch_ids) if doc_id not in unchanged]
+    return ([batch_ids[i] for i in changed], [batch_documents[i] for i in changed],
+            [batch_metadatas[i] for i in changed]), len(unchanged)
+
+
+def run_build_pipeline(processor: ProfileProcessor, collection, changed_since: Optional[Dict], total: int,
+                       featurize_workers: int = 2, embed_batch: int = EMBED_BATCH,
+                       cache=None) -> Tuple[int, int, int]:
+    """
+    Streams the profiles to (re-)embed through the build stages. Summaries found in
+    the embedding cache, if given, are not encoded again. Returns the highest
+    profile_id fetched, the number of documents embedded and the number skipped as
+    unchanged; raises the first stage error after all stages have stopped.
+    """
+    rows_q = queue.Queue(maxsize=QUEUE_DEPTH)
+    docs_q = queue.Queue(maxsize=QUEUE_DEPTH)
+    upsert_q = queue.Queue(maxsize=QUEUE_DEPTH)
+    counters = {name: StageCounter(name) for name in ("fetch", "featurize", "embed", "upsert")}
+    errors = []
+    totals = {"skipped": 0}
+    totals_lock = threading.Lock()
+    progress = tqdm(total=total, desc="Processing Profiles")
+
+    def featurize():
+        counter = counters["featurize"]
+        conn = None
+        try:
+            conn = psycopg2.connect(**DB_CONFIG)
+            while (batch_rows := counter.get(rows_q)) is not _DONE:
+                start = time.perf_counter()
+                docs, skipped = featurize_batch(processor, collection, conn, batch_rows)
+                counter.add(len(batch_rows), time.perf_counter() - start)
+                with totals_lock:
+                    totals["skipped"] += skipped
+                progress.update(len(batch_rows))
+                if docs[0]:
+                    counter.put(docs_q, docs)
+        except Exception as e:
+            errors.append(e)
+            _drain(rows_q, 1)
+        finally:
+            if conn is not None:
+                conn.close()
+            docs_q.put(_DONE)
+
+    def embed():
+        counter = counters["embed"]
+        model, pending = None, ([], [], [])
+        senders = featurize_workers
+
+        def encode(documents):
+            nonlocal model
+            if model is None:
+                logger.info(f"Loading sentence-transformer model: {EMBED_MODEL}")
+                model = SentenceTransformer(EMBED_MODEL)
+            return model.encode(documents, show_progress_bar=False)
+
+        def flush():
+            nonlocal pending
+            start = time.perf_counter()
+            ids, documents, metadatas = pending
+            if cache is not None:
+                embeddings = cache.embed(documents, encode).tolist()
+            else:
+                embeddings = encode(documents).tolist()
+            counter.add(len(ids), time.perf_counter() - start)
+            counter.put(upsert_q, (ids, embeddings, documents, metadatas))
+            pending = ([], [], [])
+
+        try:
+            while senders:
+                docs = counter.get(docs_q)
+                if docs is _DONE:
+                    senders -= 1
+                    continue
+                for acc, values in zip(pending, docs):
+                    acc.extend(values)
+                if len(pending[0]) >= embed_batch:
+                    flush()
+            if pending[0]:
+                flush()
+        except Exception as e:
+            errors.append(e)
+            _drain(docs_q, senders)
+        finally:
+            upsert_q.put(_DONE)
+
+    def upsert():
+        counter = counters["upsert"]
+        try:
+            while (item := counter.get(upsert_q)) is not _DONE:
+                ids, embeddings, documents, metadatas = item
+                start = time.perf_counter()
+                collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+                counter.add(len(ids), time.perf_counter() - start)
+        except Exception as e:
+            errors.append(e)
+            _drain(upsert_q, 1)
+
+    threads = [threading.Thread(target=featurize, name=f"featurize-{i}") for i in range(featurize_workers)]
+    threads += [threading.Thread(target=embed, name="embed"), threading.Thread(target=upsert, name="upsert")]
+    for thread in threads:
+        thread.start()
+
+    logger.info(f"Starting to process profiles with {featurize_workers} featurize workers...")
+    counter = counters["fetch"]
+    high_water_mark = 0
+    try:
+        start = time.perf_counter()
+        for batch_rows in stream_aggregated_profiles(changed_since=changed_since):
+            counter.add(len(batch_rows), time.perf_counter() - start)
+            high_water_mark = max(high_water_mark, max(row['profile_id'] for row in batch_rows))
+            if errors:
+                break
+            counter.put(rows_q, batch_rows)
+            start = time.perf_counter()
+    except Exception as e:
+        errors.append(e)
+    finally:
+        for _ in range(featurize_workers):
+            rows_q.put(_DONE)
+        for thread in threads:
+            thread.join()
+        progress.close()
+
+    for counter in counters.values():
+        logger.info(counter.summary())
+    if errors:
+        raise errors[0]
+    return high_water_mark, counters["upsert"].items, totals["skipped"]
+
+
 # --------------------------
 # Main Execution
 # --------------------------
+def refresh_summaries(processor: ProfileProcessor) -> None:
+    """Computes profile_summary rows for the profiles that don't have one yet."""
+    total = count_profiles(missing_summary_only=True)
+    if not total:
+        logger.info("profile_summary is up to date.")
+        return
+
+    with psycopg2.connect(**DB_CONFIG) as conn, tqdm(total=total, desc="Refreshing Summaries") as progress:
+        for batch_rows in stream_aggregated_profiles(missing_summary_only=True):
+            upsert_profile_summaries(conn, [row["profile_id"] for row in batch_rows],
+                                     processor.calculate_metrics_batch(batch_rows))
+            progress.update(len(batch_rows))
+    logger.info(f"Refreshed profile_summary for {total} profiles.")
+
+
 def main():
-    rows = fetch_aggregated_profiles()
-    if not rows:
+    parser = argparse.ArgumentParser(description="Build the ChromaDB collection of ARGO profile summaries")
+    parser.add_argument("--summaries-only", action="store_true",
+                        help="Only fill profile_summary for profiles that don't have a row yet, without embedding")
+    parser.add_argument("--full", action="store_true",
+                        help="Fetch every profile instead of only those new or re-ingested since the last build "
+                             "(unchanged documents are still not re-embedded)")
+    parser.add_argument("--featurize-workers", type=int, default=2,
+                        help="Threads computing metrics and summaries (default: 2)")
+    parser.add_argument("--embed-batch", type=int, default=EMBED_BATCH,
+                        help=f"Documents per model.encode call (default: {EMBED_BATCH})")
+    parser.add_argument("--embedding-cache", default=EMBEDDING_CACHE_DIR,
+                        help="Embedding cache directory, shared with the chat backend through EMBEDDING_CACHE_DIR "
+                             f"(default: {EMBEDDING_CACHE_DIR})")
+    parser.add_argument("--embedding-cache-size", type=int, default=EMBEDDING_CACHE_SIZE,
+                        help="Vectors kept in a new embedding cache before least recently used ones are evicted "
+                             f"(default: {EMBEDDING_CACHE_SIZE})")
+    parser.add_argument("--no-embedding-cache", action="store_true",
+                        help="Encode every new or changed summary without consulting the embedding cache")
+    args = parser.parse_args()
+
+    processor = ProfileProcessor()
+    ensure_summary_table()
+    if args.summaries_only:
+        refresh_summaries(processor)
         return
 
     logger.info(f"Initializing ChromaDB client at: {CHROMA_DIR}")
     chroma_client = chromadb.PersistentClient(path=CHROMA_DIR)
     collection = chroma_client.get_or_create_collection(COLLECTION_NAME)
-    
-    logger.info(f"Loading sentence-transformer model: {EMBED_MODEL}")
-    model = SentenceTransformer(EMBED_MODEL)
-
-    processor = ProfileProcessor()
-
-    logger.info("Starting to process profiles, generate summaries, and create embeddings...")
-    for i in tqdm(range(0, len(rows), BATCH_SIZE), desc="Processing Batches"):
-        batch_rows = rows[i : i + BATCH_SIZE]
-        
-        batch_ids, batch_documents, batch_metadatas = [], [], []
 
-        for row in batch_rows:
-            # Skip profiles with no location data
-            if row.get('latitude') is None or row.get('longitude') is None:
-                continue
-
-            metrics = processor.calculate_metrics(row)
-            summary, metadata = processor.create_summary_and_meta(row, metrics)
-            
-            batch_ids.append(str(row['profile_id']))
-            batch_documents.append(summary)
-            batch_metadatas.append(metadata)
+    changed_since = None if args.full else read_build_state(collection)
+    built_at = build_start_time()
+    if changed_since:
+        logger.info(f"Fetching profiles after profile_id {changed_since['high_water_mark']} "
+                    f"or re-ingested since {changed_since['built_at']:%Y-%m-%d %H:%M:%S}")
+    total = count_profiles(changed_since=changed_since)
+    if not total:
+        logger.info("No new or changed profiles to index.")
+        if changed_since:
+            write_build_state(collection, changed_since["high_water_mark"], built_at)
+        return
 
-        if not batch_ids:
-            continue
-            
-        batch_embeddings = model.encode(batch_documents, show_progress_bar=False).tolist()
-
-        collection.upsert(
-            ids=batch_ids,
-            embeddings=batch_embeddings,
-            documents=batch_documents,
-            metadatas=batch_metadatas
-        )
-        
-    logger.info("Successfully upserted all profiles to ChromaDB.")
+    cache = None
+    if not args.no_embedding_cache:
+        cache = embedding_cache.EmbeddingCache(EMBED_MODEL, EMBED_DIM, args.embedding_cache, args.embedding_cache_size)
+    try:
+        high_water_mark, embedded, skipped = run_build_pipeline(
+            processor, collection, changed_since, total, args.featurize_workers, args.embed_batch, cache)
+    finally:
+        if cache is not None:
+            logger.info(f"Embedding cache: {cache.stats['hits']} hits, {cache.stats['misses']} misses, "
+                        f"{cache.stats['evicted']} evicted")
+            cache.close()
+    if changed_since:
+        high_water_mark = max(high_water_mark, changed_since["high_water_mark"])
+    write_build_state(collection, high_water_mark, built_at)
+    logger.info(f"Embedded {embedded} new or changed profiles, skipped {skipped} unchanged ones; "
+                f"upserted profile_summary for all {total} fetched.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,15 @@
+import io
 import os
+import hashlib
+import struct
+import time
+import argparse
 import psycopg2
 import numpy as np
 from psycopg2 import extras
-from netCDF4 import Dataset, num2date
-from datetime import datetime
+from netCDF4 import Dataset, num2date, date2num
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # === Database connection ===
 DB_CONFIG = {
@@ -15,6 +21,8 @@ DB_CONFIG = {
 }
 
 ARGO_DIR = "/Users/saksham/Desktop/python-scrape/argo_data"
+# Profiles whose levels are read, converted and written at once; bounds peak memory
+CHUNK_PROFILES = 256
 
 
 def connect_db():
@@ -46,6 +54,134 @@ def parse_launch_date(date_str):
         return None
 
 
+# Per-level variables in the order of the measurements table columns (PRES first)
+MEASUREMENT_VARS = ["PRES", "TEMP", "PSAL", "DOXY", "CHLA", "NITRATE", "PH_IN_SITU_TOTAL", "BBP700"]
+
+
+def get_shaped_var(ds, var_name, start=0, stop=None):
+    """
+    Read profiles [start, stop) of a (N_PROF, N_LEVELS) variable, or None if the
+    file doesn't have it.
+    """
+    if var_name in ds.variables:
+        return np.atleast_2d(ds.variables[var_name][start:stop])
+    return None
+
+
+def iter_measurement_chunks(ds, start, stop, chunk_profiles=CHUNK_PROFILES):
+    """
+    Yield (offset, arrays) for consecutive slices of at most `chunk_profiles`
+    profiles between `start` and `stop`, `offset` being relative to `start`.
+    Variables keep their on-disk dtype (float32 for ARGO files).
+    """
+    present = [name for name in MEASUREMENT_VARS if name in ds.variables]
+    for lo in range(start, stop, chunk_profiles):
+        hi = min(lo + chunk_profiles, stop)
+        yield lo - start, [get_shaped_var(ds, name, lo, hi) if name in present else None
+                           for name in MEASUREMENT_VARS]
+
+
+def extract_measurements(arrays):
+    """
+    Flatten the per-level arrays of a file into one columnar batch.
+
+    `arrays` holds one (N_PROF, N_LEVELS) masked array per MEASUREMENT_VARS entry,
+    or None for variables missing from the file. Only levels with an unmasked
+    pressure are kept. Returns (prof_idx, values, valid): the profile index of each
+    kept level, a (rows, 8) matrix in the arrays' own dtype and a matching
+    "not masked" matrix.
+    """
+    shape = arrays[0].shape
+    dtype = np.result_type(*[arr.dtype for arr in arrays if arr is not None])
+    values = np.zeros((len(arrays),) + shape, dtype=dtype)
+    masked = np.ones((len(arrays),) + shape, dtype=bool)
+    for k, arr in enumerate(arrays):
+        if arr is None:
+            continue
+        values[k] = np.ma.getdata(arr)
+        masked[k] = np.ma.getmaskarray(arr)
+
+    keep = ~masked[0]
+    prof_idx = np.nonzero(keep)[0]
+    return prof_idx, values[:, keep].T, ~masked[:, keep].T
+
+
+def measurement_rows(profile_ids, prof_idx, values, valid, profile_dates=None):
+    """
+    Build measurements rows from an extracted batch. `profile_ids` maps each
+    profile index to its database id; negative ids drop that profile's levels.
+    With `profile_dates` (one per profile), each row also carries its profile's
+    date right after the profile_id, for the partitioned layout.
+    """
+    ids = profile_ids[prof_idx]
+    sel = ids >= 0
+    first = 1 if profile_dates is None else 2
+    rows = np.empty((int(sel.sum()), values.shape[1] + first), dtype=object)
+    rows[:, 0] = ids[sel].tolist()
+    if profile_dates is not None:
+        rows[:, 1] = np.asarray(profile_dates, dtype=object)[prof_idx[sel]]
+    rows[:, first:] = values[sel].astype(object)
+    rows[:, first:][~valid[sel]] = None
+    return rows.tolist()
+
+
+def level_arrays(profile_ids, prof_idx, values, valid):
+    """
+    Group an extracted batch into one profile_levels row per profile:
+    [profile_id, pressure[], temperature[], ...], levels sorted by pressure.
+    Variables with no value in a profile are stored as NULL, not as an array of
+    NULLs. Negative profile ids drop that profile.
+    """
+    keep = profile_ids[prof_idx] >= 0
+    prof_idx, values, valid = prof_idx[keep], values[keep], valid[keep]
+    order = np.lexsort((values[:, 0], prof_idx))
+    prof_idx, values, valid = prof_idx[order], values[order], valid[order]
+
+    cells = values.astype(object)
+    cells[~valid] = None
+    bounds = np.flatnonzero(np.diff(prof_idx)) + 1
+    rows = []
+    for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(prof_idx)]):
+        if lo == hi:
+            continue
+        present = valid[lo:hi].any(axis=0)
+        rows.append([int(profile_ids[prof_idx[lo]])] +
+                    [cells[lo:hi, k].tolist() if present[k] else None for k in range(values.shape[1])])
+    return rows
+
+
+def measurements_layout(conn):
+    """
+    How levels are stored (see create_tables in ai/scripts/populate_vectordb.py):
+    "arrays" when measurements is a view over profile_levels, "partitioned" when it
+    is range-partitioned on profile_date, "plain" otherwise.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('measurements')")
+        row = cur.fetchone()
+    return {"v": "arrays", "p": "partitioned"}.get(row[0] if row else None, "plain")
+
+
+def ensure_partitions(conn, dates):
+    """
+    Create the measurements partitions covering `dates`, in a transaction of its
+    own so the parent table isn't locked while the float is loaded.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT ensure_measurements_partition(ts) FROM (SELECT DISTINCT unnest(%s::timestamptz[]) AS ts) t",
+                    ([d for d in dates if d is not None],))
+    conn.commit()
+
+
+def usable_profiles(times, lats, lons, cycles) -> np.ndarray:
+    """
+    Profiles with a date, a position and a cycle number. Both ingest paths skip the
+    others (profiles.profile_date is NOT NULL), so they load the same profiles.
+    """
+    return ~(np.ma.getmaskarray(times) | np.ma.getmaskarray(lats) |
+             np.ma.getmaskarray(lons) | np.ma.getmaskarray(cycles))
+
+
 def get_attr_or_var(ds, name):
     """Try to read from global attributes first, then variables."""
     if name in ds.__dict__:
@@ -54,6 +190,100 @@ def get_attr_or_var(ds, name):
         return ds.variables[name][:]
     return None
 
+# === Ingest manifest ===
+# One row per profile file: re-runs skip files whose size and mtime (or, failing
+# that, content hash) are unchanged, and only parse cycles after max_cycle.
+MANIFEST_TABLE = """
+    CREATE TABLE IF NOT EXISTS ingest_manifest (
+        path TEXT PRIMARY KEY,
+        platform_id INTEGER NOT NULL,
+        size BIGINT NOT NULL,
+        mtime DOUBLE PRECISION NOT NULL,
+        content_hash TEXT NOT NULL,
+        max_cycle INTEGER,
+        ingested_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+    );
+"""
+
+
+def ensure_manifest(conn):
+    with conn.cursor() as cur:
+        cur.execute(MANIFEST_TABLE)
+    conn.commit()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def record_manifest(cur, entry):
+    cur.execute("""
+        INSERT INTO ingest_manifest (path, platform_id, size, mtime, content_hash, max_cycle, ingested_at)
+        VALUES (%(path)s, %(platform_id)s, %(size)s, %(mtime)s, %(content_hash)s, %(max_cycle)s, now())
+        ON CONFLICT (path) DO UPDATE SET
+            platform_id = EXCLUDED.platform_id,
+            size = EXCLUDED.size,
+            mtime = EXCLUDED.mtime,
+            content_hash = EXCLUDED.content_hash,
+            max_cycle = EXCLUDED.max_cycle,
+            ingested_at = EXCLUDED.ingested_at
+    """, entry)
+
+
+def plan_ingest(conn, float_id, nc_path, full=False):
+    """
+    Compare a profile file with its manifest row.
+
+    Returns None when the file is unchanged, otherwise (entry, after_cycle): the
+    manifest entry to record together with the ingested profiles, and the highest
+    cycle already ingested (None to parse every profile). With `full`, every file
+    is parsed from the start.
+    """
+    path = os.path.abspath(nc_path)
+    stat = os.stat(path)
+    with conn.cursor() as cur:
+        cur.execute("SELECT size, mtime, content_hash, max_cycle FROM ingest_manifest WHERE path = %s", (path,))
+        previous = cur.fetchone()
+
+    if previous and not full and (previous[0], previous[1]) == (stat.st_size, stat.st_mtime):
+        return None
+
+    entry = {"path": path, "platform_id": float_id, "size": stat.st_size, "mtime": stat.st_mtime,
+             "content_hash": file_hash(path), "max_cycle": None}
+    if previous is None or full:
+        return entry, None
+
+    if previous[2] == entry["content_hash"]:
+        # Touched but identical: remember the new mtime and move on
+        entry["max_cycle"] = previous[3]
+        with conn.cursor() as cur:
+            record_manifest(cur, entry)
+        conn.commit()
+        return None
+    return entry, previous[3]
+
+
+def first_new_profile(cycles, after_cycle):
+    """Index of the first profile with a cycle after `after_cycle`, len(cycles) if none."""
+    if after_cycle is None:
+        return 0
+    new = ~np.ma.getmaskarray(cycles) & (np.ma.getdata(cycles) > after_cycle)
+    return int(np.argmax(new)) if new.any() else len(cycles)
+
+
+def latest_cycle(cycles, after_cycle):
+    """Highest unmasked cycle in a file, falling back to `after_cycle`."""
+    if np.ma.getmaskarray(cycles).all():
+        return after_cycle
+    latest = int(np.ma.max(cycles))
+    return latest if after_cycle is None else max(latest, after_cycle)
+
+
 # CORRECTED FUNCTION: Handles data types and returns a success/fail boolean
 def insert_float(conn, float_id, ds):
     """Insert float metadata if not already present. Returns True on success, False on failure."""
@@ -99,12 +329,21 @@ def insert_float(conn, float_id, ds):
         return False # Signal failure
 
 
-def process_float(conn, float_id, nc_path, meta_file):
+LEVEL_ARRAYS_TEMPLATE = "(%s" + ", %s::real[]" * (len(MEASUREMENT_VARS)) + ")"
+
+
+def process_float(conn, float_id, nc_path, meta_file, manifest_entry=None, after_cycle=None,
+                  chunk_profiles=CHUNK_PROFILES, layout="plain"):
+    """
+    Ingest one float row by row, starting at the first cycle after `after_cycle`.
+    `manifest_entry` is recorded in the same transaction. `layout` is the
+    measurements_layout() of the database. Returns True if the float was committed.
+    """
     try:
         with Dataset(meta_file, "r") as dsM, Dataset(nc_path, "r") as ds:
             if not insert_float(conn, float_id, dsM):
                 print(f"[!] Skipping profiles for float {float_id} due to insertion failure.")
-                return
+                return False
 
             # --- CORRECTED VARIABLE HANDLING ---
             # Ensure 1D variables are always at least 1-dimensional
@@ -115,28 +354,29 @@ def process_float(conn, float_id, nc_path, meta_file):
             
             ref_time = ds.variables["JULD"].units
 
-            # Ensure 2D measurement variables are always at least 2-dimensional
-            pres = np.atleast_2d(ds.variables["PRES"][:])
-            
-            # Helper to safely get and shape variables
-            def get_shaped_var(dataset, var_name):
-                if var_name in dataset.variables:
-                    return np.atleast_2d(dataset.variables[var_name][:])
-                return None
-
-            temps = get_shaped_var(ds, "TEMP")
-            salts = get_shaped_var(ds, "PSAL")
-            doxy = get_shaped_var(ds, "DOXY")
-            chla = get_shaped_var(ds, "CHLA")
-            nitrate = get_shaped_var(ds, "NITRATE")
-            ph = get_shaped_var(ds, "PH_IN_SITU_TOTAL")
-            bbp700 = get_shaped_var(ds, "BBP700")
+            # Only profiles appended since the last run are parsed
+            start = first_new_profile(cycles, after_cycle)
+            if manifest_entry is not None:
+                manifest_entry["max_cycle"] = latest_cycle(cycles, after_cycle)
+            times, lats, lons, cycles = times[start:], lats[start:], lons[start:], cycles[start:]
+
+            profile_ids = np.full(len(times), -1, dtype=np.int64)
+            # UTC like the COPY path's to_timestamp(); a naive value would be read in the session TimeZone
+            profile_dates = [num2date(t, units=ref_time, only_use_cftime_datetimes=False,
+                                      only_use_python_datetimes=True).replace(tzinfo=timezone.utc).isoformat()
+                             if not np.ma.is_masked(t) else None
+                             for t in times]
+            if layout == "partitioned":
+                ensure_partitions(conn, profile_dates)
+
+            usable = usable_profiles(times, lats, lons, cycles)
+            if not usable.all():
+                print(f"[!] Skipping {int((~usable).sum())} profiles for float {float_id} due to masked core data.")
 
             for i in range(len(times)):
-                profile_date = num2date(times[i], units=ref_time).isoformat() if not np.ma.is_masked(times[i]) else None
-                
-                if np.ma.is_masked(lats[i]) or np.ma.is_masked(lons[i]) or np.ma.is_masked(cycles[i]):
-                    print(f"[!] Skipping profile {i} for float {float_id} due to masked core data.")
+                profile_date = profile_dates[i]
+
+                if not usable[i]:
                     continue
 
                 lat = float(lats[i])
@@ -145,87 +385,620 @@ def process_float(conn, float_id, nc_path, meta_file):
 
                 with conn.cursor() as cur:
                     cur.execute("""
-                        INSERT INTO profiles (platform_id, cycle_number, profile_date, latitude, longitude)
-                        VALUES (%s, %s, %s, %s, %s)
+                        INSERT INTO profiles (platform_id, cycle_number, profile_date, latitude, longitude, location)
+                        VALUES (%s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography)
                         ON CONFLICT (platform_id, cycle_number) DO NOTHING
                         RETURNING profile_id
-                    """, (float_id, cycle_number, profile_date, lat, lon))
+                    """, (float_id, cycle_number, profile_date, lat, lon, lon, lat))
                     
                     result = cur.fetchone()
                     if result is None:
                         continue
-                    profile_id = result[0]
-
-                measurements = []
-                # pres.shape[1] is the number of depth levels
-                for j in range(pres.shape[1]):
-                    # Check if the pressure at this level is masked
-                    if np.ma.is_masked(pres[i, j]):
-                        continue 
-
-                    measurements.append((
-                        profile_id,
-                        float(pres[i, j]),
-                        float(temps[i, j]) if temps is not None and not np.ma.is_masked(temps[i, j]) else None,
-                        float(salts[i, j]) if salts is not None and not np.ma.is_masked(salts[i, j]) else None,
-                        float(doxy[i, j]) if doxy is not None and not np.ma.is_masked(doxy[i, j]) else None,
-                        float(chla[i, j]) if chla is not None and not np.ma.is_masked(chla[i, j]) else None,
-                        float(nitrate[i, j]) if nitrate is not None and not np.ma.is_masked(nitrate[i, j]) else None,
-                        float(ph[i, j]) if ph is not None and not np.ma.is_masked(ph[i, j]) else None,
-                        float(bbp700[i, j]) if bbp700 is not None and not np.ma.is_masked(bbp700[i, j]) else None,
-                    ))
-                
+                    profile_ids[i] = result[0]
+
+            # Levels are read and written one chunk of profiles at a time
+            for offset, arrays in iter_measurement_chunks(ds, start, start + len(times), chunk_profiles):
+                prof_idx, values, valid = extract_measurements(arrays)
+                chunk_ids = profile_ids[offset:offset + chunk_profiles]
+                if layout == "arrays":
+                    levels = level_arrays(chunk_ids, prof_idx, values, valid)
+                    if levels:
+                        with conn.cursor() as cur:
+                            extras.execute_values(cur, """
+                                INSERT INTO profile_levels (profile_id, pressure, temperature, salinity, doxy, chla, nitrate, ph_in_situ_total, bbp700)
+                                VALUES %s
+                            """, levels, template=LEVEL_ARRAYS_TEMPLATE, page_size=100)
+                    continue
+                if layout == "partitioned":
+                    chunk_dates = profile_dates[offset:offset + chunk_profiles]
+                    measurements = measurement_rows(chunk_ids, prof_idx, values, valid, chunk_dates)
+                    columns = "profile_id, profile_date, "
+                else:
+                    measurements = measurement_rows(chunk_ids, prof_idx, values, valid)
+                    columns = "profile_id, "
                 if measurements:
                     with conn.cursor() as cur:
-                        extras.execute_values(cur, """
-                            INSERT INTO measurements (profile_id, pressure, temperature, salinity, doxy, chla, nitrate, ph_in_situ_total, bbp700)
+                        extras.execute_values(cur, f"""
+                            INSERT INTO measurements ({columns}pressure, temperature, salinity, doxy, chla, nitrate, ph_in_situ_total, bbp700)
                             VALUES %s
-                        """, measurements)
+                        """, measurements, page_size=1000)
 
+            if manifest_entry is not None:
+                with conn.cursor() as cur:
+                    record_manifest(cur, manifest_entry)
             conn.commit()
             print(f"[✓] Ingested float {float_id} with {len(times)} profiles")
+            return True
 
     except Exception as e:
         conn.rollback()
         print(f"[X] CRITICAL error on float {float_id}: {e}")
         import traceback
         traceback.print_exc()
+        return False
+
+
+# === Bulk loading through COPY ===
+# Staged rows are keyed by (platform_id, prof_index), the position of the profile in
+# its file, because profile_ids are only assigned when the batch is merged.
+STAGING_TABLES = """
+    CREATE TEMP TABLE IF NOT EXISTS staging_profiles (
+        platform_id INTEGER,
+        prof_index INTEGER,
+        cycle_number INTEGER,
+        profile_epoch DOUBLE PRECISION,
+        latitude DOUBLE PRECISION,
+        longitude DOUBLE PRECISION
+    );
+    CREATE TEMP TABLE IF NOT EXISTS staging_measurements (
+        platform_id INTEGER,
+        prof_index INTEGER,
+        pressure DOUBLE PRECISION,
+        temperature DOUBLE PRECISION,
+        salinity DOUBLE PRECISION,
+        doxy DOUBLE PRECISION,
+        chla DOUBLE PRECISION,
+        nitrate DOUBLE PRECISION,
+        ph_in_situ_total DOUBLE PRECISION,
+        bbp700 DOUBLE PRECISION
+    );
+"""
+
+STAGING_PROFILE_COLUMNS = "platform_id, prof_index, cycle_number, profile_epoch, latitude, longitude"
+STAGING_MEASUREMENT_COLUMNS = ("platform_id, prof_index, pressure, temperature, salinity, doxy, chla, "
+                               "nitrate, ph_in_situ_total, bbp700")
+
+# Only the first profile of a (platform_id, cycle_number) is kept, like the
+# ON CONFLICT DO NOTHING of the row-by-row path, and levels are only loaded for
+# profiles that were actually inserted. {insert_levels} returns one row per
+# profile or level with its level count as n.
+MERGE_STAGING = """
+    WITH firsts AS (
+        SELECT DISTINCT ON (platform_id, cycle_number) *
+        FROM staging_profiles
+        ORDER BY platform_id, cycle_number, prof_index
+    ),
+    new_profiles AS (
+        INSERT INTO profiles (platform_id, cycle_number, profile_date, latitude, longitude, location)
+        SELECT platform_id, cycle_number, to_timestamp(profile_epoch), latitude, longitude,
+               ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography
+        FROM firsts
+        ORDER BY platform_id, cycle_number
+        ON CONFLICT (platform_id, cycle_number) DO NOTHING
+        RETURNING profile_id, platform_id, cycle_number
+    ),
+    new_levels AS ({insert_levels})
+    SELECT (SELECT count(*) FROM new_profiles), (SELECT coalesce(sum(n), 0) FROM new_levels)
+"""
+
+STAGED_LEVELS = """
+    FROM new_profiles n
+    JOIN firsts f USING (platform_id, cycle_number)
+    JOIN staging_measurements m ON m.platform_id = f.platform_id AND m.prof_index = f.prof_index
+"""
+
+INSERT_LEVEL_ROWS = """
+    INSERT INTO measurements (profile_id{date_column}, pressure, temperature, salinity, doxy, chla, nitrate, ph_in_situ_total, bbp700)
+    SELECT n.profile_id{date_value}, m.pressure, m.temperature, m.salinity, m.doxy, m.chla, m.nitrate, m.ph_in_situ_total, m.bbp700
+""" + STAGED_LEVELS + """
+    RETURNING 1 AS n
+"""
+
+INSERT_LEVEL_ARRAYS = ("""
+    INSERT INTO profile_levels (profile_id, pressure, temperature, salinity, doxy, chla, nitrate, ph_in_situ_total, bbp700)
+    SELECT n.profile_id,
+           array_agg(m.pressure::real ORDER BY m.pressure),
+           {variable_arrays}
+""" + STAGED_LEVELS + """
+    GROUP BY n.profile_id
+    RETURNING cardinality(pressure) AS n
+""").format(variable_arrays=",\n           ".join(
+    f"CASE WHEN count(m.{column}) > 0 THEN array_agg(m.{column}::real ORDER BY m.pressure) END"
+    for column in ("temperature", "salinity", "doxy", "chla", "nitrate", "ph_in_situ_total", "bbp700")))
+
+
+def merge_sql(layout):
+    """The staging merge statement for a measurements_layout()."""
+    if layout == "arrays":
+        return MERGE_STAGING.format(insert_levels=INSERT_LEVEL_ARRAYS)
+    if layout == "partitioned":
+        return MERGE_STAGING.format(insert_levels=INSERT_LEVEL_ROWS.format(
+            date_column=", profile_date", date_value=", to_timestamp(f.profile_epoch)"))
+    return MERGE_STAGING.format(insert_levels=INSERT_LEVEL_ROWS.format(date_column="", date_value=""))
+
+
+ENSURE_STAGED_PARTITIONS = """
+    SELECT ensure_measurements_partition(ts)
+    FROM (SELECT DISTINCT to_timestamp(profile_epoch) AS ts FROM staging_profiles) t
+"""
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+
+
+def encode_copy_text(columns):
+    """
+    Encode columns as COPY text format. Each column is (values, valid), where
+    `valid` may be None when nothing is missing.
+    """
+    fields = []
+    for values, valid in columns:
+        if values.dtype.kind == "f":
+            values = values.astype(np.float64)
+        text = values.astype(str)
+        if valid is not None:
+            text = np.where(valid, text, "\\N")
+        fields.append(text)
+    if len(fields[0]) == 0:
+        return b""
+    lines = ["\t".join(row) for row in np.stack(fields, axis=1).tolist()]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def encode_copy_binary(columns):
+    """
+    Encode integer (int4) and float (float8) columns as COPY binary format.
+    NULL fields carry no data bytes, so every field is laid out at full width
+    and the data bytes of missing values are dropped with one boolean mask.
+    """
+    n = len(columns[0][0])
+    parts = [np.full(n, len(columns), dtype=">i2").view(np.uint8).reshape(n, 2)]
+    keep = [np.ones((n, 2), dtype=bool)]
+    for values, valid in columns:
+        dtype = np.dtype(">i4") if values.dtype.kind in "iu" else np.dtype(">f8")
+        if valid is None:
+            valid = np.ones(n, dtype=bool)
+        lengths = np.where(valid, dtype.itemsize, -1).astype(">i4")
+        parts.append(lengths.view(np.uint8).reshape(n, 4))
+        parts.append(values.astype(dtype).view(np.uint8).reshape(n, dtype.itemsize))
+        keep.append(np.ones((n, 4), dtype=bool))
+        keep.append(np.repeat(valid[:, None], dtype.itemsize, axis=1))
+    body = np.concatenate(parts, axis=1)[np.concatenate(keep, axis=1)]
+    return PGCOPY_HEADER + body.tobytes() + PGCOPY_TRAILER
+
+
+def copy_columns(cur, table, column_names, columns, copy_format):
+    """Stream columns into a staging table with COPY FROM STDIN."""
+    if copy_format == "binary":
+        data = encode_copy_binary(columns)
+    else:
+        data = encode_copy_text(columns)
+    cur.copy_expert(f"COPY {table} ({column_names}) FROM STDIN WITH (FORMAT {copy_format})", io.BytesIO(data))
+
+
+def stage_float(conn, float_id, nc_path, meta_file, copy_format="binary", manifest_entry=None, after_cycle=None,
+                chunk_profiles=CHUNK_PROFILES):
+    """
+    COPY one float's profiles and measurements, from the first cycle after
+    `after_cycle`, into the staging tables and commit them. `manifest_entry`
+    gets its max_cycle filled in, to be recorded by merge_staging. Returns True
+    if the float was staged.
+    """
+    try:
+        with Dataset(meta_file, "r") as dsM, Dataset(nc_path, "r") as ds:
+            if not insert_float(conn, float_id, dsM):
+                print(f"[!] Skipping profiles for float {float_id} due to insertion failure.")
+                return False
+
+            times = np.ma.atleast_1d(ds.variables["JULD"][:])
+            lats = np.ma.atleast_1d(ds.variables["LATITUDE"][:])
+            lons = np.ma.atleast_1d(ds.variables["LONGITUDE"][:])
+            cycles = np.ma.atleast_1d(ds.variables["CYCLE_NUMBER"][:])
+
+            start = first_new_profile(cycles, after_cycle)
+            if manifest_entry is not None:
+                manifest_entry["max_cycle"] = latest_cycle(cycles, after_cycle)
+            times, lats, lons, cycles = times[start:], lats[start:], lons[start:], cycles[start:]
+
+            # Seconds since the Unix epoch, so the merge can use to_timestamp()
+            dates = num2date(times, ds.variables["JULD"].units,
+                             only_use_cftime_datetimes=False, only_use_python_datetimes=True)
+            epoch = np.ma.asarray(date2num(dates, "seconds since 1970-01-01 00:00:00"))
+
+            usable = usable_profiles(epoch, lats, lons, cycles)
+            if not usable.all():
+                print(f"[!] Skipping {int((~usable).sum())} profiles for float {float_id} due to masked core data.")
+
+            prof_index = np.nonzero(usable)[0] + start
+            platform = np.full(len(prof_index), float_id, dtype=np.int64)
+            n_levels = 0
+
+            with conn.cursor() as cur:
+                cur.execute(STAGING_TABLES)
+                copy_columns(cur, "staging_profiles", STAGING_PROFILE_COLUMNS, [
+                    (platform, None),
+                    (prof_index, None),
+                    (np.ma.getdata(cycles)[usable].astype(np.int64), None),
+                    (np.ma.getdata(epoch)[usable].astype(np.float64), None),
+                    (np.ma.getdata(lats)[usable].astype(np.float64), None),
+                    (np.ma.getdata(lons)[usable].astype(np.float64), None),
+                ], copy_format)
+                # Levels are read and streamed one chunk of profiles at a time
+                for offset, arrays in iter_measurement_chunks(ds, start, start + len(times), chunk_profiles):
+                    prof_idx, values, valid = extract_measurements(arrays)
+                    levels = usable[offset:offset + chunk_profiles][prof_idx]
+                    n_levels += int(levels.sum())
+                    copy_columns(cur, "staging_measurements", STAGING_MEASUREMENT_COLUMNS,
+                                 [(np.full(int(levels.sum()), float_id, dtype=np.int64), None),
+                                  (prof_idx[levels] + start + offset, None)] +
+                                 [(values[levels, k], valid[levels, k]) for k in range(values.shape[1])],
+                                 copy_format)
+            conn.commit()
+            print(f"[✓] Staged float {float_id}: {len(prof_index)} profiles, {n_levels} levels")
+            return True
 
+    except Exception as e:
+        conn.rollback()
+        print(f"[X] CRITICAL error staging float {float_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
 
-def main():
-    print("Starting ARGO data ingestion...")
-    conn = connect_db()
-    # Required for execute_values helper
-    extras.register_uuid()
 
-    for float_dir in os.listdir(ARGO_DIR):
+def merge_staging(conn, manifest_entries=(), layout="plain"):
+    """
+    Resolve staged floats into profiles/measurements in one set-based statement,
+    recording their manifest entries in the same transaction. Returns True if
+    the merge was committed.
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute(STAGING_TABLES)
+            if layout == "partitioned":
+                cur.execute(ENSURE_STAGED_PARTITIONS)
+                conn.commit()
+            cur.execute(merge_sql(layout))
+            n_profiles, n_levels = cur.fetchone()
+            cur.execute("TRUNCATE staging_profiles, staging_measurements")
+            for entry in manifest_entries:
+                record_manifest(cur, entry)
+        conn.commit()
+        print(f"[✓] Merged {n_profiles} new profiles and {n_levels} levels")
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"[X] CRITICAL error merging staged floats: {e}")
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE staging_profiles, staging_measurements")
+        conn.commit()
+        return False
+
+
+# === Indexes ===
+# Kept in sync with create_tables in ai/scripts/populate_vectordb.py. The unique
+# key is never deferred: ON CONFLICT (platform_id, cycle_number) depends on it.
+UNIQUE_INDEX = ("profiles_platform_cycle_key",
+                "CREATE UNIQUE INDEX IF NOT EXISTS profiles_platform_cycle_key ON profiles (platform_id, cycle_number)")
+DEFERRABLE_INDEXES = [
+    ("profiles_location_gist", "CREATE INDEX IF NOT EXISTS profiles_location_gist ON profiles USING GIST (location)"),
+    ("profiles_profile_date_idx", "CREATE INDEX IF NOT EXISTS profiles_profile_date_idx ON profiles (profile_date)"),
+    ("measurements_profile_id_idx",
+     "CREATE INDEX IF NOT EXISTS measurements_profile_id_idx ON measurements (profile_id)"),
+]
+# With the array layout, measurements is a view and profile_levels' primary key
+# plays the role of the measurements index.
+ARRAY_LAYOUT_INDEXES = {"measurements_profile_id_idx": "profile_levels_pkey"}
+
+
+def layout_indexes(layout):
+    """DEFERRABLE_INDEXES that exist for a measurements_layout()."""
+    if layout == "arrays":
+        return [(name, ddl) for name, ddl in DEFERRABLE_INDEXES if name not in ARRAY_LAYOUT_INDEXES]
+    return DEFERRABLE_INDEXES
+
+# Query shapes the SQL prompt in ai/src/llm/rag_pipeline.py asks the LLM for, and
+# the indexes each of them should be able to use.
+CANONICAL_QUERIES = [
+    ("spatial", """
+        SELECT p.profile_id FROM profiles p
+        WHERE ST_DWithin(p.location, ST_GeographyFromText('SRID=4326;POINT(80.27 13.08)'), 100000)
+     """, ["profiles_location_gist"]),
+    ("time range", """
+        SELECT p.profile_id FROM profiles p
+        WHERE p.profile_date >= now() - interval '30 days'
+     """, ["profiles_profile_date_idx"]),
+    ("profile levels", """
+        SELECT m.pressure, m.temperature FROM floats f
+        JOIN profiles p ON f.platform_id = p.platform_id
+        JOIN measurements m ON p.profile_id = m.profile_id
+        WHERE p.platform_id = 2902238 AND p.cycle_number = 1
+     """, ["profiles_platform_cycle_key", "measurements_profile_id_idx"]),
+]
+
+
+def drop_deferred_indexes(conn):
+    """Drop the secondary indexes before a bulk load; create_indexes rebuilds them."""
+    with conn.cursor() as cur:
+        for name, _ in DEFERRABLE_INDEXES:
+            cur.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+    print(f"[i] Dropped {len(DEFERRABLE_INDEXES)} secondary indexes for the bulk load.")
+
+
+def create_indexes(conn, layout="plain", loaded=False):
+    """
+    Create the indexes that are missing. After a load (`loaded`), also backfill
+    profiles.location for rows loaded without it and refresh the planner
+    statistics of the tables the load wrote to; both scan whole tables, so a
+    run that loaded nothing skips them.
+    """
+    with conn.cursor() as cur:
+        cur.execute(UNIQUE_INDEX[1])
+        if loaded:
+            cur.execute("""
+                UPDATE profiles
+                SET location = ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography
+                WHERE location IS NULL
+            """)
+            if cur.rowcount:
+                print(f"[i] Backfilled location for {cur.rowcount} profiles.")
+        for name, ddl in layout_indexes(layout):
+            cur.execute(ddl)
+    conn.commit()
+    if not loaded:
+        print("[✓] Indexes in place.")
+        return
+
+    # ANALYZE can't run inside the transaction block psycopg2 opens
+    conn.autocommit = True
+    try:
+        levels_table = "profile_levels" if layout == "arrays" else "measurements"
+        with conn.cursor() as cur:
+            for table in ("floats", "profiles", levels_table):
+                cur.execute(f"ANALYZE {table}")
+    finally:
+        conn.autocommit = False
+    print("[✓] Indexes in place and statistics refreshed.")
+
+
+def _plan_index_names(plan):
+    names = set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= _plan_index_names(child)
+    return names
+
+
+# An index and, on a partitioned table, the indexes of its partitions, which
+# are the ones plans name
+INDEX_TREE = """
+    WITH RECURSIVE tree AS (
+        SELECT to_regclass(%s) AS oid
+        UNION ALL
+        SELECT i.inhrelid FROM pg_inherits i JOIN tree ON i.inhparent = tree.oid
+    )
+    SELECT c.relname FROM tree JOIN pg_class c ON c.oid = tree.oid
+"""
+
+
+def check_index_usage(conn, layout="plain"):
+    """
+    EXPLAIN the canonical chat queries and report any expected index the plan
+    doesn't use, counting a scan of a partition's index as a use of its parent.
+    Sequential scans are disabled for the check, so small tables still show
+    whether an index is usable. Returns True if all are used.
+    """
+    all_used = True
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL enable_seqscan = off")
+        for label, query, expected in CANONICAL_QUERIES:
+            if layout == "arrays":
+                expected = [ARRAY_LAYOUT_INDEXES.get(name, name) for name in expected]
+            cur.execute(f"EXPLAIN (FORMAT JSON) {query}")
+            used = _plan_index_names(cur.fetchone()[0][0]["Plan"])
+            missing = []
+            for name in expected:
+                cur.execute(INDEX_TREE, (name,))
+                if not used & {row[0] for row in cur.fetchall()}:
+                    missing.append(name)
+            if missing:
+                all_used = False
+                print(f"[!] {label} query does not use {', '.join(missing)}")
+            else:
+                print(f"[✓] {label} query uses {', '.join(expected)}")
+    conn.rollback()
+    return all_used
+
+
+def float_files(base_path):
+    """(float_id, nc_path, meta_file) of one float directory, or None if it is not ready to ingest."""
+    float_id = int(os.path.basename(os.path.normpath(base_path)))
+    meta_file = os.path.join(base_path, f"{float_id}_meta.nc")
+    sprof_file = os.path.join(base_path, f"{float_id}_Sprof.nc")
+    prof_file = os.path.join(base_path, f"{float_id}_prof.nc")
+
+    # Check that meta file exists
+    if not os.path.exists(meta_file):
+        print(f"[!] Meta file not found for float {float_id}, skipping.")
+        return None
+
+    if os.path.exists(sprof_file):
+        nc_path = sprof_file
+    elif os.path.exists(prof_file):
+        nc_path = prof_file
+    else:
+        print(f"[!] Profile data file not found for float {float_id}, skipping.")
+        return None
+
+    return float_id, nc_path, meta_file
+
+
+def find_floats(argo_dir):
+    """Yield (float_id, nc_path, meta_file) for every float directory ready to ingest."""
+    for float_dir in os.listdir(argo_dir):
         if not float_dir.isdigit():
             continue  # skip .DS_Store etc.
 
-        float_id = int(float_dir)
-        base_path = os.path.join(ARGO_DIR, float_dir)
-        meta_file = os.path.join(base_path, f"{float_id}_meta.nc")
-        sprof_file = os.path.join(base_path, f"{float_id}_Sprof.nc")
-        prof_file = os.path.join(base_path, f"{float_id}_prof.nc")
+        task = float_files(os.path.join(argo_dir, float_dir))
+        if task:
+            yield task
 
-        # Check that meta file exists
-        if not os.path.exists(meta_file):
-            print(f"[!] Meta file not found for float {float_id}, skipping.")
-            continue
 
-        if os.path.exists(sprof_file):
-            nc_path = sprof_file
-        elif os.path.exists(prof_file):
-            nc_path = prof_file
-        else:
-            print(f"[!] Profile data file not found for float {float_id}, skipping.")
-            continue
+# === Parallel ingestion ===
+# Each pool process keeps its own connection for its whole lifetime.
+_worker_conn = None
+_worker_options = {}
+
+
+def _init_worker(bulk, copy_format, full, chunk_profiles):
+    global _worker_conn, _worker_options
+    _worker_conn = connect_db()
+    _worker_options = {"bulk": bulk, "copy_format": copy_format, "full": full, "chunk_profiles": chunk_profiles,
+                       "layout": measurements_layout(_worker_conn)}
 
-        process_float(conn, float_id, nc_path, meta_file)
 
+def ingest_float(conn, float_id, nc_path, meta_file, bulk=False, copy_format="binary", full=False,
+                 chunk_profiles=CHUNK_PROFILES, layout="plain"):
+    """
+    Ingest one float in its own transaction(s), skipping it if the manifest says
+    its profile file is unchanged. Returns "done", "unchanged" or "failed".
+    """
+    plan = plan_ingest(conn, float_id, nc_path, full)
+    if plan is None:
+        print(f"[SKIP] Float {float_id} unchanged since last ingest")
+        return "unchanged"
+    entry, after_cycle = plan
+
+    if bulk:
+        ok = (stage_float(conn, float_id, nc_path, meta_file, copy_format, entry, after_cycle, chunk_profiles)
+              and merge_staging(conn, [entry], layout))
+    else:
+        ok = process_float(conn, float_id, nc_path, meta_file, entry, after_cycle, chunk_profiles, layout)
+    return "done" if ok else "failed"
+
+
+def _ingest_in_worker(float_id, nc_path, meta_file):
+    """Ingest one float; runs inside a pool process."""
+    start = time.perf_counter()
+    try:
+        status = ingest_float(_worker_conn, float_id, nc_path, meta_file, **_worker_options)
+    except Exception as e:
+        _worker_conn.rollback()
+        print(f"[X] CRITICAL error on float {float_id}: {e}")
+        status = "failed"
+    return float_id, status, time.perf_counter() - start
+
+
+def ingest_parallel(floats, workers, bulk=False, copy_format="binary", full=False,
+                    chunk_profiles=CHUNK_PROFILES):
+    """
+    Hand float directories to a pool of `workers` processes, each with its own
+    database connection. Returns the ids of the floats that failed and the
+    number of floats that were ingested.
+    """
+    failed = []
+    done_count = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(bulk, copy_format, full, chunk_profiles)) as executor:
+        futures = {executor.submit(_ingest_in_worker, *task): task[0] for task in floats}
+        for done, future in enumerate(as_completed(futures), start=1):
+            float_id = futures[future]
+            try:
+                _, status, elapsed = future.result()
+            except Exception as e:
+                status, elapsed = "failed", 0.0
+                print(f"[X] Worker crashed on float {float_id}: {e}")
+            if status == "failed":
+                failed.append(float_id)
+            done_count += status == "done"
+            print(f"[{done}/{len(futures)}] float {float_id} {status} in {elapsed:.1f}s")
+    return failed, done_count
+
+
+def finish_ingest(conn, layout="plain", loaded=True):
+    """Rebuild/refresh the indexes after loading, check them and close the connection."""
+    create_indexes(conn, layout, loaded)
+    check_index_usage(conn, layout)
     conn.close()
     print("Database connection closed.")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Ingest ARGO NetCDF files into PostgreSQL")
+    parser.add_argument("-d", "--dir", default=ARGO_DIR, help=f"ARGO data directory (default: {ARGO_DIR})")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Load through COPY into staging tables and merge set-based")
+    parser.add_argument("--copy-format", choices=["text", "binary"], default="binary",
+                        help="COPY format used by --bulk (default: binary)")
+    parser.add_argument("--batch-floats", type=int, default=50,
+                        help="Floats staged per merge in --bulk mode (default: 50)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Parallel ingestion processes, one float per transaction (default: 1)")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the ingest manifest and parse every profile of every file")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="Drop secondary indexes before loading and rebuild them afterwards")
+    parser.add_argument("--chunk-profiles", type=int, default=CHUNK_PROFILES,
+                        help=f"Profiles read and written per chunk, bounds memory (default: {CHUNK_PROFILES})")
+    args = parser.parse_args()
+
+    print("Starting ARGO data ingestion...")
+    conn = connect_db()
+    # Required for execute_values helper
+    extras.register_uuid()
+    ensure_manifest(conn)
+    layout = measurements_layout(conn)
+    print(f"[i] measurements layout: {layout}")
+    if args.defer_indexes:
+        drop_deferred_indexes(conn)
+    else:
+        create_indexes(conn, layout)
+
+    if args.workers > 1:
+        failed, ingested = ingest_parallel(list(find_floats(args.dir)), args.workers, args.bulk,
+                                           args.copy_format, args.full, args.chunk_profiles)
+        if failed:
+            print(f"[!] {len(failed)} floats failed: {', '.join(map(str, sorted(failed)))}")
+        finish_ingest(conn, layout, args.defer_indexes or ingested > 0)
+        return
+
+    pending = []
+    ingested = 0
+    for float_id, nc_path, meta_file in find_floats(args.dir):
+        if not args.bulk:
+            status = ingest_float(conn, float_id, nc_path, meta_file, full=args.full,
+                                  chunk_profiles=args.chunk_profiles, layout=layout)
+            ingested += status == "done"
+            continue
+
+        plan = plan_ingest(conn, float_id, nc_path, args.full)
+        if plan is None:
+            print(f"[SKIP] Float {float_id} unchanged since last ingest")
+            continue
+        entry, after_cycle = plan
+        if stage_float(conn, float_id, nc_path, meta_file, args.copy_format, entry, after_cycle,
+                       args.chunk_profiles):
+            pending.append(entry)
+        if len(pending) >= args.batch_floats:
+            ingested += len(pending) if merge_staging(conn, pending, layout) else 0
+            pending = []
+
+    if pending:
+        ingested += len(pending) if merge_staging(conn, pending, layout) else 0
+
+    finish_ingest(conn, layout, args.defer_indexes or ingested > 0)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -4,32 +4,271 @@ ARGO Float Data Download Script with Date Range Filter
 """
 
 import os
+import re
+import json
 import time
+import asyncio
 import argparse
+import aiohttp
 import requests
+import html
 import shutil
+import sqlite3
+import threading
+import itertools
+from collections import deque
 from urllib.parse import urljoin, urlparse
 from pathlib import Path
 from bs4 import BeautifulSoup
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+
+
+class IncompleteDownload(Exception):
+    """The transfer ended before the expected number of bytes; the .part file is kept to resume."""
+
+
+class Throttled(Exception):
+    """The mirror answered 429 or 503; carries its Retry-After delay in seconds, if any."""
+
+    def __init__(self, status: int, retry_after=None):
+        super().__init__(f"HTTP {status}" + (f", retry after {retry_after:.0f}s" if retry_after else ""))
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header, given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# === Rate limiting ===
+
+class TokenBucket:
+    """Tokens refill at `rate` per second up to one second's worth; reservations may go into debt."""
+
+    def __init__(self, rate: float, now: float = None):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic() if now is None else now
+
+    def reserve(self, amount: float, now: float, scale: float = 1.0) -> float:
+        """Take `amount` tokens at `scale` times the rate; returns the seconds to wait before using them."""
+        rate = self.rate * scale
+        self.tokens = min(rate, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        self.tokens -= amount
+        return max(0.0, -self.tokens / rate)
+
+
+class RateLimiter:
+    """
+    Token buckets for requests/sec and bytes/sec shared by all download workers,
+    threads or asyncio tasks alike. On 429/503 every worker pauses (for Retry-After
+    if given, else an exponential delay) and the rates are halved; each successful
+    response then ramps them back up by `ramp` of the configured rate. Throttles
+    arriving during a pause are the same burst and only count once. Without a
+    requests/sec limit, a throttle sets one at the rate observed just before it,
+    which is dropped again once the scale has ramped back to 1.
+    """
+
+    def __init__(self, max_rps: float = None, max_bps: float = None,
+                 min_scale: float = 1 / 16, ramp: float = 0.05, max_pause: float = 300.0,
+                 clock=time.monotonic):
+        self.clock = clock
+        self.requests = TokenBucket(max_rps, clock()) if max_rps else None
+        self.adaptive = not max_rps  # the requests bucket is only there while throttled
+        self.bytes = TokenBucket(max_bps, clock()) if max_bps else None
+        self.scale = 1.0
+        self.min_scale = min_scale
+        self.ramp = ramp
+        self.max_pause = max_pause
+        self.paused_until = 0.0
+        self.throttles = 0  # consecutive, reset by a success
+        self.recent = deque(maxlen=64)  # request start times, for the observed rate
+        self._lock = threading.Lock()
+
+    def _reserve(self, requests: int = 0, nbytes: int = 0) -> float:
+        with self._lock:
+            now = self.clock()
+            wait = max(0.0, self.paused_until - now)
+            if requests:
+                self.recent.append(now)
+                if self.requests:
+                    wait = max(wait, self.requests.reserve(requests, now, self.scale))
+            if nbytes and self.bytes:
+                wait = max(wait, self.bytes.reserve(nbytes, now, self.scale))
+            return wait
+
+    def wait(self, requests: int = 0, nbytes: int = 0):
+        """Block the calling thread until the request or bytes may go ahead."""
+        delay = self._reserve(requests, nbytes)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, requests: int = 0, nbytes: int = 0):
+        """wait() for asyncio tasks."""
+        delay = self._reserve(requests, nbytes)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def observed_rps(self, now: float) -> float:
+        if len(self.recent) < 2:
+            return 1.0
+        return len(self.recent) / max(now - self.recent[0], 1e-3)
+
+    def throttled(self, retry_after=None):
+        """Back off globally after a 429/503 response."""
+        with self._lock:
+            now = self.clock()
+            if now < self.paused_until:
+                # Another response of the burst we are already pausing for; only a
+                # longer Retry-After is honoured
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, now + min(retry_after, self.max_pause))
+                return
+            self.throttles += 1
+            pause = retry_after if retry_after is not None else min(2 ** self.throttles, self.max_pause)
+            self.paused_until = now + min(pause, self.max_pause)
+            if self.requests is None:
+                self.requests = TokenBucket(self.observed_rps(now), now)
+            self.scale = max(self.min_scale, self.scale / 2)
+            print(f"[THROTTLE] pausing {pause:.1f}s, rate scaled to {self.scale:.0%}")
+
+    def succeeded(self):
+        """Ramp the rates back up after a successful response."""
+        with self._lock:
+            self.throttles = 0
+            self.scale = min(1.0, self.scale + self.ramp)
+            if self.adaptive and self.scale == 1.0:
+                self.requests = None
+
+
+# === Download state on disk ===
+# A file is downloaded to "<name>.part" and renamed into place once complete.
+# "<name>.meta" and "<name>.part.meta" hold the ETag/Last-Modified validators of
+# the complete file and of the partial one, for conditional and Range requests.
+
+def part_path(local_path: Path) -> Path:
+    return local_path.with_name(local_path.name + ".part")
+
+
+def meta_path(path: Path) -> Path:
+    return path.with_name(path.name + ".meta")
+
+
+def read_meta(path: Path) -> dict:
+    try:
+        return json.loads(meta_path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def write_meta(path: Path, url: str, headers) -> None:
+    meta = {"url": url, "etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+    meta_path(path).write_text(json.dumps(meta))
+
+
+def range_validator(meta: dict):
+    """If-Range value for a partial file; weak ETags are not allowed there."""
+    etag = meta.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return meta.get("last_modified")
+
+
+# === Listing parser ===
+# Apache's table rows, matched directly instead of building a soup of the whole
+# page: <td><a href="...">...</a></td><td align="right">2025-09-13 12:45  </td><td align="right">1.2M</td>
+LISTING_ROW = re.compile(
+    r'<tr>\s*(?:<td[^>]*>(?:(?!</td>).)*</td>\s*)?<td[^>]*>\s*<a href="([^"]*)"[^>]*>.*?</a>\s*</td>'
+    r'(?:\s*<td[^>]*>([^<]*)</td>)?(?:\s*<td[^>]*>([^<]*)</td>)?', re.IGNORECASE | re.DOTALL)
+
+
+# === Crawl index ===
+
+CRAWL_INDEX_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS dirs (
+        url TEXT PRIMARY KEY,
+        last_modified TEXT NOT NULL,
+        crawled_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS files (
+        dir_url TEXT NOT NULL,
+        url TEXT NOT NULL,
+        last_modified TEXT NOT NULL,
+        size TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (dir_url, url)
+    );
+"""
+
+
+class CrawlIndex:
+    """
+    The listings of previous runs in a local SQLite file: each float directory's
+    Last-Modified and the .nc files it held, with their Last-Modified and size.
+    A directory is recorded only once all its files were fetched, so failed ones
+    are crawled again on the next run.
+    """
+
+    def __init__(self, path: Path):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(CRAWL_INDEX_SCHEMA)
+        # Indexes written before sizes were recorded; their files are fetched (revalidated) once more
+        if "size" not in [row[1] for row in self.conn.execute("PRAGMA table_info(files)")]:
+            self.conn.execute("ALTER TABLE files ADD COLUMN size TEXT NOT NULL DEFAULT ''")
+
+    def dir_modified(self, url: str):
+        row = self.conn.execute("SELECT last_modified FROM dirs WHERE url = ?", (url,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def files(self, dir_url: str) -> dict:
+        """{url: (last_modified, size)} of a directory's files."""
+        rows = self.conn.execute("SELECT url, last_modified, size FROM files WHERE dir_url = ?", (dir_url,))
+        return {url: (modified, size) for url, modified, size in rows}
+
+    def record_dir(self, url: str, modified: datetime, files) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM files WHERE dir_url = ?", (url,))
+            self.conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?)",
+                                  [(url, f, m, size) for f, m, size in files])
+            self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+                              (url, modified.isoformat(), datetime.now().isoformat(timespec="seconds")))
+
+    def close(self):
+        self.conn.close()
 
 
 class ArgoDownloader:
     def __init__(self, base_url: str, download_dir: str = "downloads",
                  delay: float = 0.5, max_retries: int = 3,
                  start_date: str = None, end_date: str = None,
-                 workers: int = 8):
+                 workers: int = 8, per_host: int = 8,
+                 index_path: str = None, full_crawl: bool = False, on_dir_done=None,
+                 max_rps: float = None, max_bps: float = None):
         self.base_url = base_url.rstrip("/") + "/"
         self.download_dir = Path(download_dir)
         self.delay = delay
         self.max_retries = max_retries
         self.workers = workers
+        self.per_host = per_host
 
         # parse start and end date
         self.start_date = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
         self.end_date = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
 
+        # Shared by every worker thread or task, including directory listings
+        self.limiter = RateLimiter(max_rps, max_bps)
+
         self.session = requests.Session()
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (compatible; ArgoDownloader/1.0)"
@@ -37,30 +276,77 @@ class ArgoDownloader:
 
         self.download_dir.mkdir(parents=True, exist_ok=True)
 
+        # Listing state of previous runs; full_crawl still refreshes it but descends everywhere
+        self.index = CrawlIndex(Path(index_path) if index_path else self.download_dir / "crawl-index.sqlite")
+        self.full_crawl = full_crawl
+        # Called with the local directory of each float directory once all its files are fetched
+        self.on_dir_done = on_dir_done
+
+    def check_throttle(self, status: int, headers):
+        """Raise Throttled for a 429/503 response, or count a success towards ramping back up."""
+        if status in (429, 503):
+            raise Throttled(status, retry_after_seconds(headers.get("Retry-After")))
+        if status < 400:
+            self.limiter.succeeded()
+
+    def retry_delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to sleep before retrying; throttling pauses every worker through the limiter instead."""
+        if isinstance(error, Throttled):
+            self.limiter.throttled(error.retry_after)
+            return 0.0
+        return 2 ** attempt
+
     def get_links_with_dates(self, url: str):
-        """Fetch links and their 'Last Modified' timestamps from Apache index page."""
-        try:
-            resp = self.session.get(url, timeout=30)
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            results = []
-            rows = soup.find_all("tr")
-            for row in rows:
-                cols = row.find_all("td")
-                if len(cols) >= 2:
-                    a = cols[1].find("a") or cols[0].find("a")
-                    if not a or "href" not in a.attrs:
-                        continue
-                    href = a["href"]
-                    if href in ("../", "./") or href.startswith("#"):
-                        continue
-                    lastmod = cols[2].get_text(strip=True) if len(cols) > 2 else ""
-                    results.append((urljoin(url, href), lastmod))
+        """Fetch links with their 'Last Modified' timestamps and sizes from an Apache index page."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.limiter.wait(requests=1)
+                resp = self.session.get(url, timeout=30)
+                self.check_throttle(resp.status_code, resp.headers)
+                resp.raise_for_status()
+                return self.parse_listing(resp.text, url)
+            except Throttled as e:
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay(e, attempt))
+                else:
+                    print(f"[ERROR] Could not fetch {url}: {e}")
+                    return []
+            except requests.RequestException as e:
+                print(f"[ERROR] Could not fetch {url}: {e}")
+                return []
+
+    def parse_listing(self, page: str, url: str):
+        """Parse (link, 'Last Modified', 'Size') rows out of an Apache index page."""
+        results = []
+        for href, lastmod, size in LISTING_ROW.findall(page):
+            href = html.unescape(href)
+            if href in ("../", "./") or href.startswith("#"):
+                continue
+            results.append((urljoin(url, href), html.unescape(lastmod).strip(), html.unescape(size).strip()))
+        if results or "<tr" not in page:
             return results
-        except requests.RequestException as e:
-            print(f"[ERROR] Could not fetch {url}: {e}")
-            return []
+        # Not the usual Apache table layout; fall back to a full parse
+        return self.parse_listing_soup(page, url)
+
+    def parse_listing_soup(self, page: str, url: str):
+        """parse_listing with BeautifulSoup, for pages the row pattern does not match."""
+        soup = BeautifulSoup(page, "html.parser")
+
+        results = []
+        rows = soup.find_all("tr")
+        for row in rows:
+            cols = row.find_all("td")
+            if len(cols) >= 2:
+                a = cols[1].find("a") or cols[0].find("a")
+                if not a or "href" not in a.attrs:
+                    continue
+                href = a["href"]
+                if href in ("../", "./") or href.startswith("#"):
+                    continue
+                lastmod = cols[2].get_text(strip=True) if len(cols) > 2 else ""
+                size = cols[3].get_text(strip=True) if len(cols) > 3 else ""
+                results.append((urljoin(url, href), lastmod, size))
+        return results
 
     def parse_date(self, lastmod: str):
         """Extract datetime from 'Last Modified' string like '2025-09-13 12:45'."""
@@ -69,52 +355,110 @@ class ArgoDownloader:
         except Exception:
             return None
 
+    def request_headers(self, local_path: Path) -> dict:
+        """Headers that resume a .part file with Range, or revalidate a complete file."""
+        part = part_path(local_path)
+        if part.exists() and part.stat().st_size > 0:
+            validator = range_validator(read_meta(part))
+            if validator:
+                return {"Range": f"bytes={part.stat().st_size}-", "If-Range": validator}
+
+        if local_path.exists():
+            meta = read_meta(local_path)
+            headers = {}
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            # Files from before the sidecar existed are revalidated against their mtime
+            headers["If-Modified-Since"] = meta.get("last_modified") or formatdate(
+                local_path.stat().st_mtime, usegmt=True)
+            return headers
+        return {}
+
+    def open_part(self, url: str, local_path: Path, status: int, headers):
+        """Opens the .part file for a 200 or 206 response, returning it and the bytes it already holds."""
+        part = part_path(local_path)
+        if status == 206:
+            offset = part.stat().st_size
+            match = re.match(r"bytes (\d+)-", headers.get("Content-Range", ""))
+            if match and int(match.group(1)) == offset:
+                return open(part, "ab"), offset
+            part.unlink()
+            raise IncompleteDownload(f"unexpected Content-Range {headers.get('Content-Range')!r}")
+
+        write_meta(part, url, headers)
+        return open(part, "wb"), 0
+
+    def finish_part(self, local_path: Path, headers, offset: int, written: int):
+        """Checks the transfer length and atomically moves the .part file (and its sidecar) into place."""
+        length = headers.get("Content-Length")
+        if length is not None and not headers.get("Content-Encoding") and written != int(length):
+            raise IncompleteDownload(f"got {written} of {length} bytes")
+
+        part = part_path(local_path)
+        os.replace(meta_path(part), meta_path(local_path))
+        os.replace(part, local_path)
+        return f"[OK] {local_path}" + (f" (resumed at {offset} bytes)" if offset else "")
+
+    def discard_part(self, local_path: Path):
+        """Drops a .part file the server can no longer serve a range of (HTTP 416)."""
+        for path in (part_path(local_path), meta_path(part_path(local_path))):
+            path.unlink(missing_ok=True)
+
     def download_file(self, url: str, local_path: Path):
-        """Download a single file with retries."""
+        """Download a single file with retries, resuming partial files and skipping unchanged ones."""
         local_path.parent.mkdir(parents=True, exist_ok=True)
 
         for attempt in range(self.max_retries + 1):
             try:
-                if local_path.exists():
-                    return f"[SKIP] {local_path}"
-
-                with self.session.get(url, stream=True, timeout=60) as r:
-                    if r.status_code == 200:
-                        with open(local_path, "wb") as f:
-                            for chunk in r.iter_content(chunk_size=65536):  # 64KB chunks
-                                if chunk:
-                                    f.write(chunk)
-                        return f"[OK] {local_path}"
-                    else:
+                self.limiter.wait(requests=1)
+                with self.session.get(url, stream=True, timeout=60,
+                                      headers=self.request_headers(local_path)) as r:
+                    self.check_throttle(r.status_code, r.headers)
+                    if r.status_code == 304:
+                        return f"[SKIP] {local_path} (not modified)"
+                    if r.status_code == 416:
+                        self.discard_part(local_path)
+                        raise IncompleteDownload("requested range not satisfiable")
+                    if r.status_code not in (200, 206):
                         return f"[ERROR] HTTP {r.status_code} for {url}"
 
-            except requests.RequestException as e:
+                    f, offset = self.open_part(url, local_path, r.status_code, r.headers)
+                    written = 0
+                    with f:
+                        for chunk in r.iter_content(chunk_size=65536):  # 64KB chunks
+                            if chunk:
+                                f.write(chunk)
+                                written += len(chunk)
+                                self.limiter.wait(nbytes=len(chunk))
+                    return self.finish_part(local_path, r.headers, offset, written)
+
+            except (requests.RequestException, IncompleteDownload, Throttled) as e:
                 if attempt < self.max_retries:
-                    time.sleep(2 ** attempt)
+                    time.sleep(self.retry_delay(e, attempt))
                 else:
                     return f"[FAIL] Could not download {url}: {e}"
 
-    def save_nc(self, file_url: str):
-        """Helper: save .nc file preserving directory structure."""
+    def local_path(self, file_url: str) -> Path:
+        """Local path of a file, preserving the directory structure under base_url."""
         parsed = urlparse(file_url)
         rel_path = os.path.relpath(parsed.path, start=urlparse(self.base_url).path)
-        local_path = self.download_dir / rel_path
-        result = self.download_file(file_url, local_path)
+        return self.download_dir / rel_path
+
+    def save_nc(self, file_url: str):
+        """Helper: save .nc file preserving directory structure."""
+        result = self.download_file(file_url, self.local_path(file_url))
         if self.delay > 0:
             time.sleep(self.delay)
         return result
 
-    def download_all(self):
-        """Download root .nc files from float directories last modified in the specified date range."""
-        print(f"[START] {self.base_url}")
-        print(f"[SAVE TO] {self.download_dir.absolute()}")
-
-        num_dirs = [(link, self.parse_date(lastmod))
-                    for link, lastmod in self.get_links_with_dates(self.base_url)
-                    if link.rstrip("/").split("/")[-1].isdigit()]
-
-        for num_dir, dt in num_dirs:
-            folder_name = num_dir.rstrip("/").split("/")[-1]
+    def select_dirs(self, listing):
+        """Float directories of the root listing last modified in the specified date range."""
+        selected = []
+        for link, lastmod, _ in listing:
+            folder_name = link.rstrip("/").split("/")[-1]
+            if not folder_name.isdigit():
+                continue
+            dt = self.parse_date(lastmod)
 
             if not dt:
                 print(f"[SKIP] {folder_name} (no date)")
@@ -124,18 +468,178 @@ class ArgoDownloader:
                 print(f"[SKIP] {folder_name} (last modified {dt})")
                 continue
 
+            selected.append((link, dt))
+        return selected
+
+    def dirs_to_crawl(self, listing):
+        """select_dirs, minus directories not modified since the crawl index recorded them."""
+        changed = []
+        for num_dir, dt in self.select_dirs(listing):
+            known = self.index.dir_modified(num_dir)
+            if known and dt <= known and not self.full_crawl:
+                print(f"[SKIP] {num_dir.rstrip('/').split('/')[-1]} (unchanged since last crawl)")
+                continue
+            changed.append((num_dir, dt))
+        return changed
+
+    def files_to_fetch(self, num_dir: str, nc_files):
+        """The .nc files of a listing whose Last-Modified or size differs from the index, or missing locally."""
+        known = {} if self.full_crawl else self.index.files(num_dir)
+        todo = []
+        for url, lastmod, size in nc_files:
+            if known.get(url) == (lastmod, size) and self.local_path(url).exists():
+                print(f"[SKIP] {self.local_path(url)} (unchanged since last crawl)")
+            else:
+                todo.append(url)
+        return todo
+
+    def download_all(self):
+        """Download root .nc files from float directories last modified in the specified date range."""
+        print(f"[START] {self.base_url}")
+        print(f"[SAVE TO] {self.download_dir.absolute()}")
+
+        for num_dir, dt in self.dirs_to_crawl(self.get_links_with_dates(self.base_url)):
             print(f"\n[DIR] {num_dir} (last modified {dt})")
 
-            links = [l for l, _ in self.get_links_with_dates(num_dir)]
+            listing = self.get_links_with_dates(num_dir)
             
             # <<< MODIFICATION IS HERE >>>
             # Find only .nc files directly within this directory, ignoring subdirectories.
-            nc_files = [link for link in links if link.endswith(".nc")]
+            nc_files = [entry for entry in listing if entry[0].endswith(".nc")]
 
+            ok = bool(listing)
             with ThreadPoolExecutor(max_workers=self.workers) as executor:
-                futures = {executor.submit(self.save_nc, url): url for url in nc_files}
+                futures = {executor.submit(self.save_nc, url): url for url in self.files_to_fetch(num_dir, nc_files)}
                 for future in as_completed(futures):
-                    print(future.result())
+                    result = future.result()
+                    ok = ok and result.startswith(("[OK]", "[SKIP]"))
+                    print(result)
+
+            if ok:
+                self.index.record_dir(num_dir, dt, nc_files)
+                if self.on_dir_done:
+                    self.on_dir_done(self.local_path(num_dir))
+
+        print("\n[COMPLETE] All downloads finished.")
+
+    # === Asyncio mode ===
+    # One aiohttp session whose connector caps open keep-alive connections at
+    # `workers` in total and `per_host` per host. Listing and file jobs share one
+    # queue served by `workers` tasks; files sort ahead of listings, so directories
+    # finish one after another while the next listings keep the pipe full.
+    # `pending` tracks each listed directory's outstanding files until it is recorded.
+
+    LISTING, FILE = 1, 0
+
+    async def fetch_listing(self, session: aiohttp.ClientSession, url: str):
+        """Async get_links_with_dates."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.limiter.wait_async(requests=1)
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+                    self.check_throttle(resp.status, resp.headers)
+                    resp.raise_for_status()
+                    return self.parse_listing(await resp.text(), url)
+            except (aiohttp.ClientError, asyncio.TimeoutError, Throttled) as e:
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.retry_delay(e, attempt))
+                else:
+                    print(f"[ERROR] Could not fetch {url}: {e}")
+                    return []
+
+    async def download_file_async(self, session: aiohttp.ClientSession, url: str, local_path: Path):
+        """Async download_file."""
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.limiter.wait_async(requests=1)
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=60),
+                                       headers=self.request_headers(local_path)) as r:
+                    self.check_throttle(r.status, r.headers)
+                    if r.status == 304:
+                        return f"[SKIP] {local_path} (not modified)"
+                    if r.status == 416:
+                        self.discard_part(local_path)
+                        raise IncompleteDownload("requested range not satisfiable")
+                    if r.status not in (200, 206):
+                        return f"[ERROR] HTTP {r.status} for {url}"
+
+                    f, offset = self.open_part(url, local_path, r.status, r.headers)
+                    written = 0
+                    with f:
+                        async for chunk in r.content.iter_chunked(65536):  # 64KB chunks
+                            f.write(chunk)
+                            written += len(chunk)
+                            await self.limiter.wait_async(nbytes=len(chunk))
+                    return self.finish_part(local_path, r.headers, offset, written)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, IncompleteDownload, Throttled) as e:
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.retry_delay(e, attempt))
+                else:
+                    return f"[FAIL] Could not download {url}: {e}"
+
+    async def _file_done(self, pending: dict, num_dir: str, ok: bool):
+        state = pending[num_dir]
+        state["remaining"] -= 1
+        state["ok"] = state["ok"] and ok
+        if state["remaining"] == 0:
+            del pending[num_dir]
+            if state["ok"]:
+                self.index.record_dir(num_dir, state["dt"], state["files"])
+                if self.on_dir_done:
+                    # May block for backpressure; that holds up this worker only
+                    await asyncio.to_thread(self.on_dir_done, self.local_path(num_dir))
+
+    async def _crawl_worker(self, session: aiohttp.ClientSession, queue: asyncio.PriorityQueue, seq, pending):
+        while True:
+            kind, _, url, num_dir = await queue.get()
+            try:
+                if kind == self.LISTING:
+                    dt = pending[num_dir]["dt"]
+                    print(f"\n[DIR] {url} (last modified {dt})")
+                    listing = await self.fetch_listing(session, url)
+                    # Only .nc files directly within this directory, ignoring subdirectories.
+                    nc_files = [entry for entry in listing if entry[0].endswith(".nc")]
+                    todo = self.files_to_fetch(num_dir, nc_files)
+                    pending[num_dir].update(files=nc_files, ok=bool(listing), remaining=len(todo) + 1)
+                    for link in todo:
+                        queue.put_nowait((self.FILE, next(seq), link, num_dir))
+                    await self._file_done(pending, num_dir, True)
+                else:
+                    result = await self.download_file_async(session, url, self.local_path(url))
+                    print(result)
+                    await self._file_done(pending, num_dir, result.startswith(("[OK]", "[SKIP]")))
+                    if self.delay > 0:
+                        await asyncio.sleep(self.delay)
+            except Exception as e:
+                print(f"[FAIL] {url}: {e}")
+                if num_dir in pending:
+                    pending[num_dir]["ok"] = False
+            finally:
+                queue.task_done()
+
+    async def download_all_async(self):
+        """download_all over one bounded pool of keep-alive connections."""
+        print(f"[START] {self.base_url}")
+        print(f"[SAVE TO] {self.download_dir.absolute()}")
+
+        connector = aiohttp.TCPConnector(limit=self.workers, limit_per_host=self.per_host)
+        async with aiohttp.ClientSession(connector=connector, headers=dict(self.session.headers)) as session:
+            seq = itertools.count()
+            queue = asyncio.PriorityQueue()
+            pending = {}
+            for num_dir, dt in self.dirs_to_crawl(await self.fetch_listing(session, self.base_url)):
+                pending[num_dir] = {"dt": dt, "files": [], "ok": True, "remaining": 1}
+                queue.put_nowait((self.LISTING, next(seq), num_dir, num_dir))
+
+            workers = [asyncio.create_task(self._crawl_worker(session, queue, seq, pending))
+                       for _ in range(self.workers)]
+            await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
         print("\n[COMPLETE] All downloads finished.")
 
@@ -149,11 +653,26 @@ def main():
     parser.add_argument("--start", type=str, help="Start date (YYYY-MM-DD)")
     parser.add_argument("--end", type=str, help="End date (YYYY-MM-DD)")
     parser.add_argument("-w", "--workers", type=int, default=8, help="Number of parallel downloads (default: 8)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Crawl and download through one shared asyncio connection pool of --workers connections")
+    parser.add_argument("--per-host", type=int, default=8,
+                        help="Max connections per host in --async mode (default: 8)")
+    parser.add_argument("--index", help="Crawl index file (default: <dir>/crawl-index.sqlite)")
+    parser.add_argument("--full-crawl", action="store_true",
+                        help="Descend into every directory in the date range, even if unchanged since the last crawl")
+    parser.add_argument("--max-rps", type=float,
+                        help="Requests/sec across all workers; halved on HTTP 429/503 and ramped back up (default: none)")
+    parser.add_argument("--max-bps", type=float,
+                        help="Download bytes/sec across all workers (default: none)")
     args = parser.parse_args()
 
     downloader = ArgoDownloader(args.url, args.dir, args.delay, args.retries,
-                                args.start, args.end, args.workers)
-    downloader.download_all()
+                                args.start, args.end, args.workers, args.per_host,
+                                args.index, args.full_crawl, max_rps=args.max_rps, max_bps=args.max_bps)
+    if args.use_async:
+        asyncio.run(downloader.download_all_async())
+    else:
+        downloader.download_all()
 
 
 if __name__ == "__main__":
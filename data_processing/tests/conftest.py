@@ -0,0 +1,11 @@
+"""
+The data_processing scripts are standalone files with hyphenated names; tests load
+them by path with benchmarks.load_script and reuse the benchmark fixtures
+(synthetic NetCDF files, the fake mirror), so the repository root goes on sys.path.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,58 @@
+"""
+Tests for create-vector-database.py that need neither the database nor the
+embedding model: the batched profile metrics agree with the per-profile ones.
+"""
+import math
+
+import pytest
+
+for module in ("chromadb", "sentence_transformers", "tqdm"):
+    pytest.importorskip(module)
+
+from benchmarks import load_script  # noqa: E402
+
+vectors = load_script("create-vector-database.py")
+
+NAN = float("nan")
+
+
+def assert_same_metrics(rows):
+    processor = vectors.ProfileProcessor()
+    expected = [processor.calculate_metrics(row) for row in rows]
+    for i, (want, have) in enumerate(zip(expected, processor.calculate_metrics_batch(rows))):
+        for name, value in have.items():
+            other = want.get(name)
+            if value is None or other is None:
+                assert value is None and other is None, (i, name, other, value)
+            else:
+                assert math.isclose(other, value, rel_tol=1e-9, abs_tol=1e-9), (i, name, other, value)
+
+
+def row(pressures, temperatures, salinities=None, doxys=None):
+    return {"pressures": pressures, "temperatures": temperatures,
+            "salinities": salinities if salinities is not None else temperatures, "doxys": doxys or []}
+
+
+def test_batch_metrics_match_scalar_on_awkward_profiles():
+    """Repeated, unsorted, missing and NaN levels give the same metrics on both paths."""
+    rows = [
+        # Repeated pressure levels, sorted and not
+        row([0, 5, 5, 10, 10, 50, 100], [28, 27.9, 27.5, 27, 26.8, 20, 12]),
+        row([100, 5, 50, 5, 10, 0, 10], [12, 27.9, 20, 27.5, 27, 28, 26.8]),
+        # Only two distinct levels: no thermocline
+        row([10, 10, 20, 20], [25, 24, 23, 22]),
+        # Unsorted with gaps in either array
+        row([300, None, 20, 5, 1000, 80], [8, 27, 26, None, 4, 21], doxys=[200, None, 210]),
+        # All NaN or missing
+        row([NAN, NAN, NAN], [NAN, NAN, NAN], [NAN, NAN, NAN], [NAN]),
+        row([None, None], [None, None], [None, None]),
+        row([], []),
+        # NaN pressures mixed in with repeats
+        row([5, NAN, 5, 15, 25, NAN, 35], [27, 26, 26.5, 25, NAN, 22, 20]),
+    ]
+    assert_same_metrics(rows)
+
+
+def test_batch_metrics_match_scalar_on_synthetic_profiles():
+    bench_features = pytest.importorskip("benchmarks.bench_features")
+    assert_same_metrics(bench_features.synthetic_rows(64, 300, seed=3))
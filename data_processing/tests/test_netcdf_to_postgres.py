@@ -0,0 +1,196 @@
+"""
+Tests for netcdf-to-postgres.py. The row and COPY ingest paths decide which
+profiles to load with the same usable_profiles() check, and must load the same
+rows; the database tests run against ARGO_TEST_DSN (a libpq connection string
+for a database with PostGIS) and are skipped without it.
+"""
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+from datetime import timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+from netCDF4 import Dataset, num2date
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.bench_ingest import FLOAT_ID, SCHEMA_DDL  # noqa: E402
+from benchmarks.synthetic import write_float, write_sprof  # noqa: E402
+
+
+def load_script(filename: str):
+    path = ROOT / "data_processing" / filename
+    spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+ingest = load_script("netcdf-to-postgres.py")
+
+
+def test_first_new_profile():
+    cycles = np.ma.masked_array([1, 2, 3, 4, 5], mask=[False, False, False, True, False])
+    assert ingest.first_new_profile(cycles, None) == 0
+    assert ingest.first_new_profile(cycles, 2) == 2
+    # A masked cycle is never new, so the first new profile is the last one
+    assert ingest.first_new_profile(cycles, 3) == 4
+    assert ingest.first_new_profile(cycles, 5) == 5
+    assert ingest.latest_cycle(cycles, 2) == 5
+    assert ingest.latest_cycle(np.ma.masked_all(3, dtype=int), 2) == 2
+
+
+def test_profile_with_masked_juld_is_skipped(tmp_path):
+    """A profile without a date is left out, like one without a position."""
+    path = write_sprof(tmp_path / "2900001_Sprof.nc", n_prof=6, n_levels=10)
+    with Dataset(path, "r+") as ds:
+        ds.variables["JULD"][2] = np.ma.masked
+        ds.variables["LATITUDE"][4] = np.ma.masked
+
+    with Dataset(path, "r") as ds:
+        times = np.ma.atleast_1d(ds.variables["JULD"][:])
+        lats = np.ma.atleast_1d(ds.variables["LATITUDE"][:])
+        lons = np.ma.atleast_1d(ds.variables["LONGITUDE"][:])
+        cycles = np.ma.atleast_1d(ds.variables["CYCLE_NUMBER"][:])
+
+    usable = ingest.usable_profiles(times, lats, lons, cycles)
+    assert usable.tolist() == [True, True, False, True, False, True]
+
+
+@pytest.fixture
+def conn():
+    psycopg2 = pytest.importorskip("psycopg2")
+    dsn = os.environ.get("ARGO_TEST_DSN")
+    if not dsn:
+        pytest.skip("ARGO_TEST_DSN is not set")
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_DDL)
+        # Far from UTC, so a date read in the session time zone would show
+        cur.execute("SET TIME ZONE 'Asia/Kolkata'")
+    conn.commit()
+    ingest.ensure_manifest(conn)
+    yield conn
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE floats, profiles, measurements, ingest_manifest")
+    conn.commit()
+    conn.close()
+
+
+def load(conn, meta_file, sprof_file, mode, copy_format=None):
+    """Ingest a float into empty tables and return its profiles and measurements."""
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE floats, profiles, measurements")
+    conn.commit()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "rows":
+            ok = ingest.process_float(conn, FLOAT_ID, sprof_file, meta_file, chunk_profiles=4)
+        else:
+            ok = (ingest.stage_float(conn, FLOAT_ID, sprof_file, meta_file, copy_format, chunk_profiles=4)
+                  and ingest.merge_staging(conn))
+    assert ok
+    with conn.cursor() as cur:
+        cur.execute("SELECT cycle_number, profile_date, latitude, longitude FROM profiles ORDER BY cycle_number")
+        profiles = cur.fetchall()
+        cur.execute("""
+            SELECT p.cycle_number, m.pressure, m.temperature, m.salinity, m.doxy, m.chla, m.nitrate,
+                   m.ph_in_situ_total, m.bbp700
+            FROM measurements m JOIN profiles p USING (profile_id)
+            ORDER BY 1, 2, 3, 4, 5, 6, 7, 8, 9
+        """)
+        return profiles, cur.fetchall()
+
+
+@pytest.mark.parametrize("copy_format", ["text", "binary"])
+def test_row_and_copy_paths_load_the_same_rows(conn, tmp_path, copy_format):
+    meta_file, sprof_file = write_float(tmp_path, FLOAT_ID, n_prof=10, n_levels=20)
+    with Dataset(sprof_file, "r+") as ds:
+        ds.variables["JULD"][3] = np.ma.masked
+
+    rows = load(conn, meta_file, sprof_file, "rows")
+    assert rows == load(conn, meta_file, sprof_file, "bulk", copy_format)
+
+    profiles, measurements = rows
+    assert len(profiles) == 9 and measurements
+    with Dataset(sprof_file, "r") as ds:
+        juld = ds.variables["JULD"]
+        first = num2date(juld[0], juld.units, only_use_cftime_datetimes=False, only_use_python_datetimes=True)
+    assert profiles[0][1] == first.replace(tzinfo=timezone.utc)
+
+
+def ingest_quietly(conn, meta_file, sprof_file, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ingest.ingest_float(conn, FLOAT_ID, sprof_file, meta_file, **kwargs)
+
+
+def manifest_max_cycle(conn, sprof_file):
+    with conn.cursor() as cur:
+        cur.execute("SELECT max_cycle FROM ingest_manifest WHERE path = %s", (os.path.abspath(sprof_file),))
+        return cur.fetchone()[0]
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 60))
+
+
+def test_unchanged_file_is_skipped(conn, tmp_path):
+    meta_file, sprof_file = write_float(tmp_path, FLOAT_ID, n_prof=4, n_levels=10)
+    assert ingest_quietly(conn, meta_file, sprof_file) == "done"
+    assert manifest_max_cycle(conn, sprof_file) == 4
+    assert ingest.plan_ingest(conn, FLOAT_ID, sprof_file) is None
+    assert ingest_quietly(conn, meta_file, sprof_file) == "unchanged"
+
+    # Touched but identical: skipped, with the new mtime remembered
+    bump_mtime(sprof_file)
+    assert ingest.plan_ingest(conn, FLOAT_ID, sprof_file) is None
+    with conn.cursor() as cur:
+        cur.execute("SELECT mtime FROM ingest_manifest")
+        assert cur.fetchone()[0] == os.stat(sprof_file).st_mtime
+
+
+def test_appended_file_only_parses_new_cycles(conn, tmp_path):
+    meta_file, sprof_file = write_float(tmp_path, FLOAT_ID, n_prof=4, n_levels=10)
+    assert ingest_quietly(conn, meta_file, sprof_file) == "done"
+
+    write_sprof(sprof_file, n_prof=7, n_levels=10, seed=1)
+    entry, after_cycle = ingest.plan_ingest(conn, FLOAT_ID, sprof_file)
+    assert after_cycle == 4
+    with Dataset(sprof_file, "r") as ds:
+        assert ingest.first_new_profile(ds.variables["CYCLE_NUMBER"][:], after_cycle) == 4
+
+    assert ingest_quietly(conn, meta_file, sprof_file, bulk=True) == "done"
+    assert manifest_max_cycle(conn, sprof_file) == 7
+    with conn.cursor() as cur:
+        cur.execute("SELECT cycle_number FROM profiles ORDER BY 1")
+        assert [row[0] for row in cur.fetchall()] == list(range(1, 8))
+
+
+def test_full_parses_an_unchanged_file_again(conn, tmp_path):
+    meta_file, sprof_file = write_float(tmp_path, FLOAT_ID, n_prof=4, n_levels=10)
+    assert ingest_quietly(conn, meta_file, sprof_file) == "done"
+
+    entry, after_cycle = ingest.plan_ingest(conn, FLOAT_ID, sprof_file, full=True)
+    assert after_cycle is None and entry["path"] == os.path.abspath(sprof_file)
+    assert ingest_quietly(conn, meta_file, sprof_file, full=True) == "done"
+
+
+def test_changed_file_without_max_cycle_is_parsed_from_the_start(conn, tmp_path):
+    """A manifest row without max_cycle (no cycle was readable last time) gives no cycle to resume after."""
+    meta_file, sprof_file = write_float(tmp_path, FLOAT_ID, n_prof=4, n_levels=10)
+    assert ingest_quietly(conn, meta_file, sprof_file) == "done"
+    with conn.cursor() as cur:
+        cur.execute("UPDATE ingest_manifest SET max_cycle = NULL")
+    conn.commit()
+
+    write_sprof(sprof_file, n_prof=5, n_levels=10, seed=1)
+    entry, after_cycle = ingest.plan_ingest(conn, FLOAT_ID, sprof_file)
+    assert after_cycle is None
+    assert ingest_quietly(conn, meta_file, sprof_file) == "done"
+    assert manifest_max_cycle(conn, sprof_file) == 5
@@ -0,0 +1,209 @@
+"""
+Tests for scrape-argo-data.py against benchmarks/fake_mirror: a local HTTP server
+with Apache index pages, ETags, Range and If-Range support, and cut-off transfers.
+"""
+import contextlib
+import io
+import os
+from datetime import datetime
+
+import pytest
+
+from benchmarks import load_script
+from benchmarks.fake_mirror import FakeMirror, touch_file, write_mirror
+
+scraper = load_script("scrape-argo-data.py")
+
+FLOAT = "2900000"
+SPROF = f"{FLOAT}/{FLOAT}_Sprof.nc"
+# Cut-off transfers keep whole 64 KiB chunks, so the .part file is not empty
+SIZE = 256 * 1024
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    root = write_mirror(tmp_path / "mirror", n_floats=2, files_per_float=3, file_size=SIZE)
+    with FakeMirror(root) as server:
+        server.root = root
+        yield server
+
+
+@pytest.fixture
+def downloader(mirror, tmp_path):
+    # No retries: each call is one request, so the tests see every status on its own
+    downloader = scraper.ArgoDownloader(mirror.url, tmp_path / "argo", delay=0, max_retries=0)
+    yield downloader
+    downloader.index.close()
+
+
+def fetch(downloader, mirror, rel=SPROF):
+    mirror.reset_stats()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = downloader.download_file(mirror.url + rel, downloader.local_path(mirror.url + rel))
+    return result, dict(mirror.stats)
+
+
+def test_interrupted_download_resumes_from_the_part_file(downloader, mirror):
+    local = downloader.local_path(mirror.url + SPROF)
+    mirror.interrupt[f"/{SPROF}"] = True
+
+    result, _ = fetch(downloader, mirror)
+    assert result.startswith("[FAIL]")
+    assert not local.exists()
+    offset = scraper.part_path(local).stat().st_size
+    assert 0 < offset <= SIZE // 2
+
+    result, stats = fetch(downloader, mirror)
+    assert result == f"[OK] {local} (resumed at {offset} bytes)"
+    assert stats["bytes"] == SIZE - offset
+    assert local.read_bytes() == (mirror.root / SPROF).read_bytes()
+    assert not scraper.part_path(local).exists() and scraper.read_meta(local)["etag"]
+
+
+def test_changed_validator_restarts_the_download(downloader, mirror):
+    """If-Range no longer matches once the file changed upstream, so the whole new file is sent."""
+    local = downloader.local_path(mirror.url + SPROF)
+    mirror.interrupt[f"/{SPROF}"] = True
+    fetch(downloader, mirror)
+    assert scraper.part_path(local).stat().st_size > 0
+    new_content = os.urandom(SIZE + 100)
+    touch_file(mirror.root / SPROF, new_content, datetime(2025, 9, 12, 8, 0))
+
+    result, stats = fetch(downloader, mirror)
+    assert result == f"[OK] {local}"
+    assert stats["bytes"] == len(new_content)
+    assert local.read_bytes() == new_content
+
+
+def test_complete_part_file_gets_416_and_is_discarded(downloader, mirror):
+    local = downloader.local_path(mirror.url + SPROF)
+    mirror.interrupt[f"/{SPROF}"] = True
+    fetch(downloader, mirror)
+    part = scraper.part_path(local)
+    # The rest of the file arrived, but the rename never happened
+    part.write_bytes((mirror.root / SPROF).read_bytes())
+
+    result, _ = fetch(downloader, mirror)
+    assert result.startswith("[FAIL]") and "range not satisfiable" in result
+    assert not part.exists() and not scraper.meta_path(part).exists()
+
+    result, stats = fetch(downloader, mirror)
+    assert result == f"[OK] {local}" and stats["bytes"] == SIZE
+
+
+def test_unchanged_file_is_revalidated_with_304(downloader, mirror):
+    local = downloader.local_path(mirror.url + SPROF)
+    assert fetch(downloader, mirror)[0] == f"[OK] {local}"
+    before = local.stat().st_mtime_ns
+
+    result, stats = fetch(downloader, mirror)
+    assert result == f"[SKIP] {local} (not modified)"
+    assert stats == {"requests": 1, "bytes": 0, "throttled": 0}
+    assert local.stat().st_mtime_ns == before
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_throttles_of_one_burst_back_off_once():
+    clock = FakeClock()
+    limiter = scraper.RateLimiter(max_rps=10, clock=clock)
+    # Eight workers get a 429 for the same burst
+    for _ in range(8):
+        limiter.throttled()
+    assert limiter.scale == 0.5 and limiter.throttles == 1
+    assert limiter.paused_until == clock.now + 2
+
+    # A longer Retry-After during the pause still extends it, without another halving
+    limiter.throttled(retry_after=30)
+    assert limiter.paused_until == clock.now + 30 and limiter.scale == 0.5
+
+    clock.now += 30
+    limiter.throttled()
+    assert limiter.scale == 0.25 and limiter.paused_until == clock.now + 4
+
+
+def test_observed_rate_limit_is_dropped_once_ramped_back_up():
+    clock = FakeClock()
+    limiter = scraper.RateLimiter(clock=clock, ramp=0.25)
+    for _ in range(20):
+        limiter.wait(requests=1)
+        clock.now += 0.1
+    limiter.throttled()
+    assert limiter.requests.rate == pytest.approx(10, rel=0.1)
+
+    clock.now += 2
+    limiter.succeeded()
+    assert limiter.scale == 0.75 and limiter.requests is not None
+    limiter.succeeded()
+    assert limiter.scale == 1.0 and limiter.requests is None
+
+
+def test_configured_rate_limit_is_kept():
+    limiter = scraper.RateLimiter(max_rps=5, clock=FakeClock(), ramp=0.5)
+    limiter.throttled()
+    limiter.succeeded()
+    assert limiter.scale == 1.0 and limiter.requests.rate == 5
+
+
+def crawl(downloader, mirror):
+    """One download_all run; returns the mirror's stats and the files fetched or revalidated."""
+    mirror.reset_stats()
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        downloader.download_all()
+    fetched = sorted(line.split()[1] for line in out.getvalue().splitlines()
+                     if line.startswith(("[OK]", "[SKIP]")) and "last crawl" not in line)
+    return dict(mirror.stats), [os.path.relpath(path, downloader.download_dir) for path in fetched]
+
+
+def test_unchanged_listing_is_not_crawled_again(downloader, mirror):
+    stats, fetched = crawl(downloader, mirror)
+    assert len(fetched) == 6
+    stats, fetched = crawl(downloader, mirror)
+    # Only the root listing
+    assert stats["requests"] == 1 and fetched == []
+
+
+def test_changed_directory_mtime_crawls_it_again(downloader, mirror):
+    crawl(downloader, mirror)
+    touch_file(mirror.root / SPROF, os.urandom(SIZE), datetime(2025, 9, 12, 8, 0))
+
+    stats, fetched = crawl(downloader, mirror)
+    # Root and directory listings, then only the file whose Last-Modified changed
+    assert stats["requests"] == 3 and fetched == [SPROF]
+    assert (downloader.download_dir / SPROF).read_bytes() == (mirror.root / SPROF).read_bytes()
+
+
+def test_changed_size_fetches_the_file_again(downloader, mirror):
+    """A file rewritten within the same minute keeps its Last-Modified; its size still gives it away."""
+    crawl(downloader, mirror)
+    touch_file(mirror.root / SPROF, os.urandom(SIZE + 100), datetime(2025, 9, 10, 12, 0))
+    later = datetime(2025, 9, 12, 8, 0).timestamp()
+    os.utime(mirror.root / FLOAT, (later, later))
+
+    stats, fetched = crawl(downloader, mirror)
+    assert stats["requests"] == 3 and fetched == [SPROF]
+    assert (downloader.download_dir / SPROF).read_bytes() == (mirror.root / SPROF).read_bytes()
+
+
+def test_index_from_before_sizes_is_upgraded(tmp_path):
+    path = tmp_path / "crawl-index.sqlite"
+    conn = scraper.sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE files (dir_url TEXT NOT NULL, url TEXT NOT NULL, last_modified TEXT NOT NULL,
+                            PRIMARY KEY (dir_url, url));
+        INSERT INTO files VALUES ('d/', 'd/a.nc', '2025-09-10 12:00');
+    """)
+    conn.close()
+
+    index = scraper.CrawlIndex(path)
+    assert index.files("d/") == {"d/a.nc": ("2025-09-10 12:00", "")}
+    index.record_dir("d/", datetime(2025, 9, 10, 12, 0), [("d/a.nc", "2025-09-10 12:00", "4096")])
+    assert index.files("d/") == {"d/a.nc": ("2025-09-10 12:00", "4096")}
+    index.close()